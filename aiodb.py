@@ -0,0 +1,161 @@
+"""
+Async counterpart of the read operations in ``db.py`` and ``models/*``.
+
+Built on asyncpg with one connection pool per event loop, sized like the
+blocking pool by ``POSTGRES_POOL_MIN`` / ``POSTGRES_POOL_MAX``. The getters
+return the same tuples and dataclasses as their blocking versions, so an
+async front end can share code with the rest of the project:
+
+    import aiodb
+
+    teacher = await aiodb.get_teacher(4)
+    await aiodb.close_pool()
+"""
+
+import asyncio
+import json
+import os
+from contextlib import asynccontextmanager
+from dataclasses import fields
+from typing import Dict, List, Optional, Tuple
+
+import asyncpg
+
+from db import _connection_params
+from models.class_sections import ClassSection
+from models.courses import Course
+from models.facilities import Facility
+from models.teachers import Teacher
+from models.time_periods import TimePeriod
+
+# Event loop -> future of its pool; asyncpg pools cannot be shared across loops.
+_pools: Dict[asyncio.AbstractEventLoop, "asyncio.Future[asyncpg.Pool]"] = {}
+
+
+async def _init_connection(conn):
+    # Decode JSON/JSONB to Python objects, as psycopg2 does.
+    for typename in ("json", "jsonb"):
+        await conn.set_type_codec(
+            typename, encoder=json.dumps, decoder=json.loads, schema="pg_catalog"
+        )
+
+
+async def _reset_connection(conn):
+    # asyncpg always rolls back an open transaction on release. Like the
+    # blocking pool, do nothing more, which saves the default RESET ALL /
+    # UNLISTEN round trip on every release.
+    pass
+
+
+async def _create_pool() -> asyncpg.Pool:
+    params = _connection_params()
+    return await asyncpg.create_pool(
+        database=params["dbname"],
+        user=params["user"],
+        password=params["password"],
+        host=params["host"],
+        port=int(params["port"]),
+        min_size=int(os.environ.get("POSTGRES_POOL_MIN", 1)),
+        max_size=int(os.environ.get("POSTGRES_POOL_MAX", 10)),
+        init=_init_connection,
+        reset=_reset_connection,
+    )
+
+
+async def get_pool() -> asyncpg.Pool:
+    """
+    Return the running event loop's pool, creating it on first use.
+    Concurrent first callers wait for the same pool.
+    """
+    loop = asyncio.get_running_loop()
+    for stale in [other for other in _pools if other.is_closed()]:
+        del _pools[stale]
+    pending = _pools.get(loop)
+    if pending is None:
+        pending = _pools[loop] = asyncio.ensure_future(_create_pool())
+    try:
+        return await asyncio.shield(pending)
+    except Exception:
+        if pending.done() and _pools.get(loop) is pending:
+            del _pools[loop]
+        raise
+
+
+async def close_pool():
+    """Close the running event loop's pool; the next call creates a fresh one."""
+    pending = _pools.pop(asyncio.get_running_loop(), None)
+    if pending is None:
+        return
+    try:
+        pool = await pending
+    except Exception:
+        return  # the pool was never created
+    await pool.close()
+
+
+@asynccontextmanager
+async def connection():
+    """Borrow a connection from the event loop's pool."""
+    pool = await get_pool()
+    async with pool.acquire() as conn:
+        yield conn
+
+
+def _select_by_id(table: str, model) -> str:
+    columns = ", ".join(f.name for f in fields(model))
+    return f"SELECT {columns} FROM {table} WHERE id=$1"
+
+
+async def _fetch_one(sql: str, *args):
+    async with connection() as conn:
+        return await conn.fetchrow(sql, *args)
+
+
+async def get_students() -> List[Tuple]:
+    """Return all students from the database."""
+    async with connection() as conn:
+        rows = await conn.fetch(
+            "SELECT id, student_id, name, grade_level FROM students"
+        )
+    return [tuple(row) for row in rows]
+
+
+async def get_student(student_id: str) -> Optional[Tuple]:
+    """Fetch a single student row by ``student_id``."""
+    row = await _fetch_one(
+        "SELECT id, student_id, name, grade_level FROM students WHERE student_id=$1",
+        student_id,
+    )
+    return tuple(row) if row else None
+
+
+_TEACHER_SQL = _select_by_id("teachers", Teacher)
+_COURSE_SQL = _select_by_id("courses", Course)
+_FACILITY_SQL = _select_by_id("facilities", Facility)
+_TIME_PERIOD_SQL = _select_by_id("time_periods", TimePeriod)
+_CLASS_SECTION_SQL = _select_by_id("class_sections", ClassSection)
+
+
+async def get_teacher(teacher_id: int) -> Optional[Teacher]:
+    row = await _fetch_one(_TEACHER_SQL, teacher_id)
+    return Teacher(*row) if row else None
+
+
+async def get_course(course_id: int) -> Optional[Course]:
+    row = await _fetch_one(_COURSE_SQL, course_id)
+    return Course(*row) if row else None
+
+
+async def get_facility(facility_id: int) -> Optional[Facility]:
+    row = await _fetch_one(_FACILITY_SQL, facility_id)
+    return Facility(*row) if row else None
+
+
+async def get_time_period(tp_id: int) -> Optional[TimePeriod]:
+    row = await _fetch_one(_TIME_PERIOD_SQL, tp_id)
+    return TimePeriod(*row) if row else None
+
+
+async def get_class_section(section_id: int) -> Optional[ClassSection]:
+    row = await _fetch_one(_CLASS_SECTION_SQL, section_id)
+    return ClassSection(*row) if row else None
@@ -0,0 +1,160 @@
+"""
+Load test for the async data layer.
+
+Usage: python benchmarks/bench_async.py --reset [REQUESTS] [CONCURRENCY ...]
+
+Seeds a small set of teachers, courses and students, then issues REQUESTS
+random lookups (``get_teacher``/``get_course``/``get_student``) at each
+concurrency level, through ``aiodb`` and through the blocking getters in a
+thread pool, and reports requests per second. The blocking getters called
+one after another are the baseline. The blocking teacher and course lookups
+bypass the read-through cache (``cache.py``), so every request on both sides
+is a database round trip.
+
+Seeding truncates the teachers, courses and students tables (and everything
+referencing them) of the database ``POSTGRES_*`` points at, so the script
+only runs with ``--reset``. Point it at a disposable database.
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import aiodb  # noqa: E402
+from db import close_pool, connection, get_student, init_db  # noqa: E402
+from models.courses import _fetch_course  # noqa: E402
+from models.teachers import _fetch_teacher  # noqa: E402
+
+TEACHERS = 50
+COURSES = 100
+STUDENTS = 2000
+
+
+def seed():
+    init_db()
+    with connection() as conn:
+        with conn:
+            with conn.cursor() as cur:
+                cur.execute(
+                    "TRUNCATE teachers, courses, students RESTART IDENTITY CASCADE"
+                )
+                cur.execute(
+                    "INSERT INTO teachers (name) SELECT 'T' || i"
+                    " FROM generate_series(1, %s) i",
+                    (TEACHERS,),
+                )
+                cur.execute(
+                    "INSERT INTO courses (code, name, periods_per_week)"
+                    " SELECT 'C' || i, 'Course ' || i, 4 FROM generate_series(1, %s) i",
+                    (COURSES,),
+                )
+                cur.execute(
+                    "INSERT INTO students (student_id, name, grade_level)"
+                    " SELECT 'S' || i, 'Student ' || i, 10 + i %% 3"
+                    " FROM generate_series(1, %s) i",
+                    (STUDENTS,),
+                )
+
+
+def _requests(count: int, seed_value: int = 0):
+    rng = random.Random(seed_value)
+    kinds = ("teacher", "course", "student")
+    return [(rng.choice(kinds), rng.randint(1, TEACHERS)) for _ in range(count)]
+
+
+def _lookup(request):
+    kind, key = request
+    if kind == "teacher":
+        return _fetch_teacher(key)
+    if kind == "course":
+        return _fetch_course(key)
+    return get_student(f"S{key}")
+
+
+def bench_blocking(requests) -> float:
+    start = time.perf_counter()
+    for request in requests:
+        _lookup(request)
+    return len(requests) / (time.perf_counter() - start)
+
+
+async def bench_threads(requests, concurrency: int) -> float:
+    """Blocking getters run in a thread pool, as a sync app would do under asyncio."""
+    loop = asyncio.get_running_loop()
+    with ThreadPoolExecutor(concurrency) as executor:
+        start = time.perf_counter()
+        await asyncio.gather(
+            *(loop.run_in_executor(executor, _lookup, r) for r in requests)
+        )
+        return len(requests) / (time.perf_counter() - start)
+
+
+async def bench_async(requests, concurrency: int) -> float:
+    queue = list(requests)
+
+    async def worker():
+        while queue:
+            kind, key = queue.pop()
+            if kind == "teacher":
+                await aiodb.get_teacher(key)
+            elif kind == "course":
+                await aiodb.get_course(key)
+            else:
+                await aiodb.get_student(f"S{key}")
+
+    await aiodb.get_pool()  # connect outside the timed section
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return len(requests) / (time.perf_counter() - start)
+
+
+async def run_async(requests, levels):
+    results = []
+    try:
+        for concurrency in levels:
+            results.append(
+                (
+                    concurrency,
+                    await bench_threads(requests, concurrency),
+                    await bench_async(requests, concurrency),
+                )
+            )
+    finally:
+        await aiodb.close_pool()
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python benchmarks/bench_async.py")
+    parser.add_argument("requests", type=int, nargs="?", default=5000)
+    parser.add_argument("concurrency", type=int, nargs="*", default=[1, 10, 50])
+    parser.add_argument(
+        "--reset",
+        action="store_true",
+        help="truncate and reseed teachers, courses and students (required)",
+    )
+    args = parser.parse_args(argv)
+    if not args.reset:
+        parser.error(
+            "this benchmark truncates teachers, courses and students in the"
+            f" {os.environ.get('POSTGRES_DB', 'configured')!r} database;"
+            " pass --reset to confirm"
+        )
+    levels = args.concurrency
+    seed()
+    requests = _requests(args.requests)
+    print(f"blocking, sequential:       {bench_blocking(requests):8.0f} req/s")
+    for concurrency, threaded, native in asyncio.run(run_async(requests, levels)):
+        print(f"{concurrency:>3} concurrent, threads:    {threaded:8.0f} req/s")
+        print(f"{concurrency:>3} concurrent, aiodb:      {native:8.0f} req/s")
+    close_pool()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+"""
+Compare connection throughput with and without the connection pool.
+
+Usage: python benchmarks/bench_pool.py [ITERATIONS]
+
+Each iteration runs ``SELECT 1``, first over a fresh ``get_connection()``
+and then over a connection borrowed from ``db.connection()``.
+"""
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from db import close_pool, connection, get_connection  # noqa: E402
+
+
+def bench_direct(iterations: int) -> float:
+    start = time.perf_counter()
+    for _ in range(iterations):
+        conn = get_connection()
+        try:
+            with conn.cursor() as cur:
+                cur.execute("SELECT 1")
+                cur.fetchone()
+        finally:
+            conn.close()
+    return iterations / (time.perf_counter() - start)
+
+
+def bench_pooled(iterations: int) -> float:
+    start = time.perf_counter()
+    for _ in range(iterations):
+        with connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute("SELECT 1")
+                cur.fetchone()
+    return iterations / (time.perf_counter() - start)
+
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    direct = bench_direct(iterations)
+    pooled = bench_pooled(iterations)
+    close_pool()
+    print(f"direct connect: {direct:10.1f} ops/s")
+    print(f"pooled:         {pooled:10.1f} ops/s")
+    print(f"speedup:        {pooled / direct:10.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+"""
+Per-statement latency of the hot CRUD calls with and without server-side
+prepared statements.
+
+Usage: python benchmarks/bench_statements.py [ITERATIONS]
+
+Seeds a scratch course and student, then times ``get_student``,
+``update_student``, ``update_course`` and the uncached course lookup with
+``db.PREPARE_STATEMENTS`` off (plain SQL) and on. Run against a disposable
+database: the schema is reset first.
+"""
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import db  # noqa: E402
+from models import courses  # noqa: E402
+
+
+def _latency(call, iterations: int) -> float:
+    call()  # warm up: borrow the connection and prepare the statement
+    start = time.perf_counter()
+    for _ in range(iterations):
+        call()
+    return (time.perf_counter() - start) / iterations * 1e6
+
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    db.init_db()
+    db.reset_db()
+    db.add_student("B1", "Bench Student", 10)
+    course = courses.create_course("BENCH", "Benchmark", 5, department="Maths")
+    cases = {
+        "get_student": lambda: db.get_student("B1"),
+        "update_student": lambda: db.update_student("B1", grade_level=11),
+        "get_course (uncached)": lambda: courses._fetch_course(course.id),
+        "update_course": lambda: courses.update_course(course.id, notes="n"),
+    }
+    print(f"{'statement':24}{'plain µs':>12}{'prepared µs':>14}{'speedup':>10}")
+    for label, call in cases.items():
+        db.PREPARE_STATEMENTS = False
+        plain = _latency(call, iterations)
+        db.PREPARE_STATEMENTS = True
+        prepared = _latency(call, iterations)
+        print(f"{label:24}{plain:12.1f}{prepared:14.1f}{plain / prepared:9.2f}x")
+    db.reset_db()
+    db.close_pool()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""
+Time the hard-constraint validator on a synthetic district-sized timetable.
+
+Usage: python benchmarks/bench_validate.py [STUDENTS] [TEACHERS]
+
+No database is needed: the timetable and feasibility index are generated in
+memory (45 periods, sections of 24 students meeting 4 times a week). As with
+``load_timetable``, every row has its teaching weeks (most meet every week,
+``AB_SHARE`` alternate A/B weeks) and a ``linked_period_id`` (pairs of
+meetings of ``DOUBLE_SHARE`` of the sections are linked as double periods).
+"""
+
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from models.teachers import Teacher  # noqa: E402
+from models.time_periods import TimePeriod  # noqa: E402
+from solver.feasibility import FeasibilityIndex  # noqa: E402
+from solver.slots import SlotTable  # noqa: E402
+from solver.validation import ALL_WEEKS, Timetable, validate  # noqa: E402
+
+PERIODS = 45
+SECTION_SIZE = 24
+MEETINGS = 4
+COURSES_PER_STUDENT = 12
+AB_SHARE = 0.1
+DOUBLE_SHARE = 0.2
+
+ODD_WEEKS = sum(1 << (w - 1) for w in range(1, 54, 2))
+EVEN_WEEKS = ALL_WEEKS & ~ODD_WEEKS
+
+
+def synthetic(students: int, teachers: int, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    sections = students * COURSES_PER_STUDENT // SECTION_SIZE
+    courses = sections // 10 + 1
+    section_course = rng.integers(0, courses, sections)
+    section_teacher = rng.integers(0, teachers, sections)
+
+    meeting_section = np.repeat(np.arange(sections), MEETINGS)
+    period_ids = rng.integers(0, PERIODS, len(meeting_section)) + 1
+    row_ids = np.arange(len(meeting_section)) + 1
+
+    roster = rng.permutation(np.repeat(np.arange(students), COURSES_PER_STUDENT))
+    roster = roster[: sections * SECTION_SIZE].reshape(sections, SECTION_SIZE)
+    enrollment_rows = np.repeat(np.arange(len(meeting_section)), SECTION_SIZE)
+    enrollment_students = roster[meeting_section].ravel()
+
+    weeks = np.full(len(meeting_section), ALL_WEEKS, dtype=np.int64)
+    alternating = rng.random(len(meeting_section)) < AB_SHARE
+    weeks[alternating] = rng.choice([ODD_WEEKS, EVEN_WEEKS], alternating.sum())
+    # Link the first two meetings of some sections, as write_schedule does.
+    linked_ids = np.full(len(meeting_section), -1, dtype=np.int64)
+    doubles = np.flatnonzero(rng.random(sections) < DOUBLE_SHARE) * MEETINGS
+    linked_ids[doubles] = row_ids[doubles + 1]
+    linked_ids[doubles + 1] = row_ids[doubles]
+
+    tt = Timetable(
+        row_ids=row_ids,
+        section_ids=meeting_section,
+        course_ids=section_course[meeting_section],
+        teacher_ids=section_teacher[meeting_section],
+        facility_ids=np.full(len(meeting_section), -1),
+        period_ids=period_ids,
+        enrollment_rows=enrollment_rows,
+        enrollment_students=enrollment_students,
+        section_max={s: SECTION_SIZE for s in range(sections)},
+        teacher_max={t: 24 for t in range(teachers)},
+        international=frozenset(range(0, teachers, 3)),
+        linked_ids=linked_ids,
+        weeks=weeks,
+    )
+    periods = [TimePeriod(p + 1, p % 9 + 1, p // 9 + 1) for p in range(PERIODS)]
+    index = FeasibilityIndex.build(
+        [Teacher(t, f"T{t}", is_international=t % 3 == 0) for t in range(teachers)],
+        list(range(courses)),
+        set(zip(section_teacher.tolist(), section_course.tolist())),
+        periods,
+    )
+    return tt, index, SlotTable(periods)
+
+
+def main():
+    students = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    teachers = int(sys.argv[2]) if len(sys.argv) > 2 else 300
+    tt, index, slots = synthetic(students, teachers)
+    start = time.perf_counter()
+    violations = validate(tt, index, slots)
+    elapsed = time.perf_counter() - start
+    print(
+        f"{students} students, {teachers} teachers, {len(tt.row_ids)} meetings,"
+        f" {len(tt.enrollment_rows)} enrollments"
+    )
+    print(f"{len(violations)} violations found in {elapsed:.3f}s")
+
+
+if __name__ == "__main__":
+    main()
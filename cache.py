@@ -0,0 +1,214 @@
+"""
+In-process read-through cache for the reference tables (courses, teachers,
+facilities, time_periods).
+
+Each table has a size-bounded LRU whose entries expire after a TTL. The model
+modules read through it in their ``get_*`` functions and invalidate it in
+their ``update_*`` and ``delete_*`` functions. After ``start_listener()``,
+invalidations are also broadcast with ``NOTIFY`` on ``CHANNEL`` and applied
+when other processes send them, so every process drops stale rows.
+Cached objects are shared between callers and must be treated as read-only.
+"""
+
+import json
+import logging
+import select
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+DEFAULT_MAXSIZE = 1024
+DEFAULT_TTL = 300.0
+CHANNEL = "timetable_cache"
+# PostgreSQL rejects NOTIFY payloads of 8000 bytes or more.
+MAX_PAYLOAD = 7999
+
+log = logging.getLogger(__name__)
+
+
+class ReadThroughCache:
+    """
+    Thread-safe LRU of ``key -> value`` with a per-entry time to live.
+
+    ``get(key, load)`` returns the cached value or calls ``load(key)`` and
+    caches the result. ``None`` results (missing rows) are not cached.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        maxsize: int = DEFAULT_MAXSIZE,
+        ttl: float = DEFAULT_TTL,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.name = name
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self._clock = clock
+        self._entries: "OrderedDict[Any, tuple]" = OrderedDict()
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    def get(self, key, load: Callable[[Any], Any]):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[1] > self._clock():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            self.misses += 1
+            generation = self._generation
+        value = load(key)
+        if value is not None:
+            with self._lock:
+                # Skip storing if the key was invalidated while loading.
+                if generation == self._generation:
+                    self._entries[key] = (value, self._clock() + self.ttl)
+                    self._entries.move_to_end(key)
+                    while len(self._entries) > self.maxsize:
+                        self._entries.popitem(last=False)
+                        self.evictions += 1
+        return value
+
+    def invalidate(self, keys: Optional[Iterable] = None) -> None:
+        """Drop ``keys``, or every entry when ``keys`` is ``None``."""
+        with self._lock:
+            self._generation += 1
+            self.invalidations += 1
+            if keys is None:
+                self._entries.clear()
+            else:
+                for key in keys:
+                    self._entries.pop(key, None)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+                "size": len(self._entries),
+            }
+
+
+_caches: Dict[str, ReadThroughCache] = {}
+_listener: Optional["_Listener"] = None
+
+
+def register(table: str, **options) -> ReadThroughCache:
+    """Return the cache of ``table``, creating it on first use."""
+    cache = _caches.get(table)
+    if cache is None:
+        cache = _caches[table] = ReadThroughCache(table, **options)
+    return cache
+
+
+def stats() -> Dict[str, Dict[str, int]]:
+    """Hit/miss/eviction counters of every cache, by table."""
+    return {table: cache.stats() for table, cache in _caches.items()}
+
+
+def _invalidate_local(table: Optional[str], ids: Optional[Iterable] = None) -> None:
+    for name, cache in _caches.items():
+        if table is None or name == table:
+            cache.invalidate(ids)
+
+
+def invalidate(table: Optional[str] = None, ids: Optional[Iterable[int]] = None):
+    """
+    Drop ``ids`` of ``table`` (everything when ``ids`` is ``None``; every
+    table when ``table`` is ``None``) here and, while the listener runs, in
+    every other listening process.
+    """
+    ids = None if ids is None else list(ids)
+    _invalidate_local(table, ids)
+    if _listener is not None:
+        _listener.notify(table, ids)
+
+
+class _Listener(threading.Thread):
+    """Background ``LISTEN`` on a dedicated connection, reconnecting on errors."""
+
+    def __init__(self, poll_interval: float):
+        super().__init__(name="cache-listener", daemon=True)
+        self.poll_interval = poll_interval
+        self.ready = threading.Event()
+        self.origin = uuid.uuid4().hex  # skips our own notifications
+        self._stopping = threading.Event()
+
+    def payloads(self, table, ids) -> List[str]:
+        """Messages for ``ids``, split so that each fits in one ``NOTIFY``."""
+        payload = json.dumps({"table": table, "ids": ids, "origin": self.origin})
+        if ids is None or len(ids) < 2 or len(payload.encode()) <= MAX_PAYLOAD:
+            return [payload]
+        half = len(ids) // 2
+        return self.payloads(table, ids[:half]) + self.payloads(table, ids[half:])
+
+    def notify(self, table, ids) -> None:
+        from db import connection
+
+        with connection() as conn:
+            with conn.cursor() as cur:
+                for payload in self.payloads(table, ids):
+                    cur.execute("SELECT pg_notify(%s, %s)", (CHANNEL, payload))
+
+    def stop(self) -> None:
+        self._stopping.set()
+
+    def run(self) -> None:
+        from db import get_connection
+
+        while not self._stopping.is_set():
+            conn = None
+            try:
+                conn = get_connection()
+                with conn.cursor() as cur:
+                    cur.execute(f"LISTEN {CHANNEL}")
+                # Anything may have changed while we were not listening.
+                _invalidate_local(None)
+                self.ready.set()
+                while not self._stopping.is_set():
+                    if select.select([conn], [], [], self.poll_interval)[0]:
+                        conn.poll()
+                        while conn.notifies:
+                            self._apply(conn.notifies.pop(0).payload)
+            except Exception:
+                log.exception("cache listener failed; reconnecting")
+                self._stopping.wait(self.poll_interval)
+            finally:
+                if conn is not None and not conn.closed:
+                    conn.close()
+
+    def _apply(self, payload: str) -> None:
+        message = json.loads(payload)
+        if message.get("origin") != self.origin:
+            _invalidate_local(message.get("table"), message.get("ids"))
+
+
+def start_listener(poll_interval: float = 1.0) -> None:
+    """
+    Share invalidations with other processes through ``LISTEN/NOTIFY``.
+    Waits (up to ten seconds) until the listener is subscribed.
+    """
+    global _listener
+    if _listener is not None:
+        return
+    listener = _Listener(poll_interval)
+    listener.start()
+    listener.ready.wait(timeout=10)
+    _listener = listener
+
+
+def stop_listener() -> None:
+    global _listener
+    listener, _listener = _listener, None
+    if listener is not None:
+        listener.stop()
+        listener.join()
@@ -1,127 +1,437 @@
-from openpyxl import load_workbook
+"""
+Translate the Chinese labels in a master-schedule workbook to English.
+
+Every sheet is processed. By default the workbook is loaded in full so merged
+cells survive; ``--stream`` reads it in read-only mode and writes a write-only
+copy, which keeps memory flat on large workbooks at the cost of losing merges.
+
+The Chinese -> English table lives in ``translations.yaml``; edit it (or pass
+``--dictionary`` with another YAML/JSON file) to add names or subjects.
+
+Any number of workbooks, directories or glob patterns can be given; several
+workbooks are translated in parallel and outputs newer than their workbook
+and the dictionary are skipped.
+
+Usage: python chi2eng.py [--stream] [--dictionary FILE] [--jobs N] [--force]
+       workbook.xlsx|directory|pattern ...
+"""
+
+from openpyxl import Workbook, load_workbook
 from openpyxl.utils import get_column_letter
 from openpyxl.styles import Font
+from openpyxl.cell import WriteOnlyCell
 from openpyxl.cell.cell import MergedCell
-import sys
+import argparse
+import copy
+import functools
+import glob
+import json
+import os
 import re
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass
+from unicodedata import east_asian_width
+
+import yaml
 
 font_size = 12
 padding_inline = 5
 line_spacing = 1.4
 
-replacements = {
-    "经济": "Econ",
-    "统计": "Stat",
-    "数学": "Math",
-    "进阶": "Further ",
-    "化学": "Chem",
-    "艺术": "Art",
-    "生物": "Bio",
-    "物理": "Phys",
-    "体育": "PE",
-    "雅思": "IELTS",
-    "自习不安排": "Study Hr. (No Tchr)",
-    "自习": " Study Hr.",
-    "语文": "Chinese",
-    "外教": "FT ",
-    "英语": "English",
-    "美国历史": "US Hist",
-    "英国历史": "British Hist",
-    "IG": "IG ",
-    "AP": "AP ",
-    "AS": "AS ",
-    "MED": " Med",
-    "贾慧荣": " Zora",
-    "胡捷": " Carol",
-    "赵云飞": " Yunfei",
-    "王岩": " Dawn",
-    "侯静菲": " Jessica",
-    "傅莹": " William",
-    "郭艳": " Serena",
-    "王京": " Ms. Wang Jing",
-    "黄通昀": " Mr. Huang Tongyun",
-    "封媛媛": " Ms. Feng Yuanyuan",
-    "梁庆柱": " Mr. Liang Qingzhu",
-    "刘蔚云": " Ms. Liu Weiyun",
-    "陈改利": " Ms. Chen Gaili",
-    "许英国": " Mr. Xu Yingguo",
-    "屈晓瑜": "Ms. Qu Xiaoyu",
-    "世界政治双语": "World Politics Bilingual",
-    "世界地理双语": "World Geo Bilingual",
-    "作息时间": "Period",
-    "早读": "AM Study Hr.",
-    "晚": "PM ",
-    "升旗仪式": "Flag-Raising",
-    "第一节": "1st",
-    "第二节": "2nd",
-    "第三节": "3rd",
-    "第四节": "4th",
-    "第五节": "5th",
-    "第六节": "6th",
-    "第七节": "7th",
-    "第八节": "8th",
-    "第九节": "9th",
-    "高一": "G10.",
-    "高二": "G11.",
-    "高三": "G12.",
-}
-
-
-def reduce_spaces(text):
-    text = text.strip()
-    text = re.sub(" +", " ", text)
-    text = re.sub("/", "\n", text)
-    return text
-
-
-def replace_text(cell_value, text, replacement):
-    if isinstance(cell_value, str):  # Ensure it's a string
-        new_value = cell_value.replace(text, replacement)
-        new_value = reduce_spaces(new_value)
-        return new_value
-    return cell_value  # Return unchanged if not a string
-
-
-def auto_adjust_dimensions(ws):
-    """ Auto-adjust column widths and row heights based on cell content. """
-    for col in ws.columns:  # Iterate over all columns
-        max_length = max(
-            max(len(line) for line in str(cell.value).split("\n"))
-            if cell.value is not None else 0
-            for cell in col if not isinstance(cell, MergedCell)
-        )
-        # Get column letter (A, B, C, ...)
-        col_letter = get_column_letter(col[0].column)
-        ws.column_dimensions[col_letter].width = max_length + padding_inline
-
-    for index, row in enumerate(ws.iter_rows(), start=1):
-        max_height = max(len(str(cell.value).split("\n"))
-                         if cell.value is not None else 1 for cell in row)
-        print(index, max_height, max_height * font_size * line_spacing)
-        ws.row_dimensions[index].hidden = False
-        ws.row_dimensions[index].height = max_height * font_size * line_spacing
-
-
-def main():
-    # Load the workbook
-    wb = load_workbook(sys.argv[1])
-
-    # Select the worksheet
-    ws = wb.active  # Or specify a sheet name: ws = wb["Sheet1"]
+# One font object shared by every cell.
+FONT = Font(size=font_size, name="Calibri")
+
+# Default dictionary; --dictionary points at another YAML or JSON file.
+DICTIONARY = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "translations.yaml"
+)
+# Distinct cell values remembered per translator.
+CACHE_SIZE = 65536
+
+SPACES = re.compile(" +")
+
+
+def compile_replacements(table):
+    """
+    One alternation matching every key of ``table``, longest key first so
+    "自习不安排" wins over "自习".
+    """
+    keys = sorted(table, key=len, reverse=True)
+    return re.compile("|".join(map(re.escape, keys)) or "(?!)")
+
+
+def load_replacements(path=DICTIONARY):
+    """
+    Read a replacement table from YAML (or JSON, by extension).
+
+    The parsed table is kept in ``<path>.cache`` and reused for as long as
+    the dictionary's size and modification time are unchanged.
+    """
+    stat = os.stat(path)
+    stamp = [stat.st_mtime_ns, stat.st_size]
+    cache = path + ".cache"
+    try:
+        with open(cache, encoding="utf-8") as f:
+            cached = json.load(f)
+        if cached["source"] == stamp:
+            return cached["replacements"]
+    except (OSError, ValueError, KeyError, TypeError):
+        pass
+
+    with open(path, encoding="utf-8") as f:
+        if path.endswith(".json"):
+            table = json.load(f)
+        else:
+            table = yaml.safe_load(f) or {}
+    table = {str(k): str(v) for k, v in table.items()}
+    try:
+        tmp = f"{cache}.{os.getpid()}"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"source": stamp, "replacements": table}, f, ensure_ascii=False)
+        os.replace(tmp, cache)
+    except OSError:
+        pass  # read-only checkout; parse again next time
+    return table
+
+
+class Translator:
+    """
+    A compiled replacement table plus a bounded LRU of translated cell
+    values, so each distinct string is translated once.
+    """
+
+    def __init__(self, table, cache_size=CACHE_SIZE, wide=True):
+        self.table = dict(table)
+        self.pattern = compile_replacements(self.table)
+        self.wide = wide
+        self._translate = functools.lru_cache(maxsize=cache_size)(self._apply)
+
+    @classmethod
+    def from_file(cls, path=DICTIONARY, cache_size=CACHE_SIZE, wide=True):
+        return cls(load_replacements(path), cache_size, wide)
+
+    def _apply(self, text):
+        text = self.pattern.sub(lambda m: self.table[m.group(0)], text)
+        text = SPACES.sub(" ", text.replace("/", "\n")).strip()
+        return (text,) + text_extent(text, self.wide)
+
+    def measure(self, value):
+        """Return ``(translated value, width, line count)`` for a cell value."""
+        if not isinstance(value, str):
+            return (value,) + text_extent(value, self.wide)
+        return self._translate(value)
+
+    def __call__(self, value):
+        """Translate a cell value; non-strings pass through."""
+        if not isinstance(value, str):
+            return value
+        return self._translate(value)[0]
+
+    def cache_info(self):
+        return self._translate.cache_info()
+
+
+_default = None
+
+
+def default_translator():
+    """The translator for ``DICTIONARY``, loaded on first use."""
+    global _default
+    if _default is None:
+        _default = Translator.from_file()
+    return _default
+
+
+def translate(value):
+    """Translate a cell value with the default dictionary."""
+    return default_translator()(value)
+
+
+def display_width(text, wide=True):
+    """Width of one line in character cells; CJK characters count double if ``wide``."""
+    if not wide or text.isascii():
+        return len(text)
+    return sum(2 if east_asian_width(ch) in "WF" else 1 for ch in text)
+
+
+def text_extent(value, wide=True):
+    """Return ``(widest line, line count)`` of a cell value."""
+    if value is None:
+        return 0, 1
+    lines = str(value).split("\n")
+    return max(display_width(line, wide) for line in lines), len(lines)
+
+
+class DimensionFitter:
+    """
+    Column widths and row heights collected cell by cell in a single
+    row-major pass, then written to a worksheet in one go.
+    """
+
+    def __init__(self):
+        self.widths = {}  # column index -> widest line
+        self.lines = {}  # row index -> most lines in a cell
 
+    def add(self, row, column, width, lines):
+        if width > self.widths.get(column, -1):
+            self.widths[column] = width
+        if lines > self.lines.get(row, 0):
+            self.lines[row] = lines
+
+    def apply(self, ws):
+        for column, width in self.widths.items():
+            letter = get_column_letter(column)
+            ws.column_dimensions[letter].width = width + padding_inline
+        for row, lines in self.lines.items():
+            ws.row_dimensions[row].hidden = False
+            ws.row_dimensions[row].height = lines * font_size * line_spacing
+
+
+def auto_adjust_dimensions(ws, wide=True):
+    """Fit column widths and row heights to the cell contents in one pass."""
+    fitter = DimensionFitter()
     for row in ws.iter_rows():
-        for text, replacement in replacements.items():
+        for cell in row:
+            if isinstance(cell, MergedCell):
+                fitter.add(cell.row, cell.column, 0, 1)
+            else:
+                fitter.add(cell.row, cell.column, *text_extent(cell.value, wide))
+    fitter.apply(ws)
+
+
+def output_path(path):
+    """``dir/name.xlsx`` -> ``dir/Modified name.xlsx``."""
+    head, tail = os.path.split(path)
+    return os.path.join(head, " ".join(["Modified", tail]))
+
+
+def translate_workbook(path, output, translator=None):
+    """Translate every sheet of a fully loaded workbook, keeping merged cells."""
+    translator = translator or default_translator()
+    wb = load_workbook(path)
+    for ws in wb.worksheets:
+        fitter = DimensionFitter()
+        for row in ws.iter_rows():
             for cell in row:
+                cell.font = FONT
+                if isinstance(cell, MergedCell):
+                    fitter.add(cell.row, cell.column, 0, 1)
+                    continue
+                value, width, lines = translator.measure(cell.value)
                 if cell.value:  # Only modify non-empty cells
-                    cell.value = replace_text(cell.value, text, replacement)
-                cell.font = Font(size=12, name="Calibri")
+                    cell.value = value
+                fitter.add(cell.row, cell.column, width, lines)
+        fitter.apply(ws)
+    wb.save(output)
+    wb.close()
 
-    auto_adjust_dimensions(ws)
 
-    new_filename = ' '.join(["Modified", sys.argv[1]])
-    wb.save(new_filename)
-    wb.close()
+def _styled_cell(ws, source, value, styles):
+    """
+    A write-only cell carrying ``source``'s fill, border, alignment and number
+    format with the shared font. Each distinct source style is converted once.
+    """
+    cell = WriteOnlyCell(ws, value)
+    style_id = getattr(source, "_style_id", 0)
+    style = styles.get(style_id)
+    if style is None:
+        if style_id:
+            cell.fill = source.fill
+            cell.border = source.border
+            cell.alignment = source.alignment
+            cell.protection = source.protection
+            cell.number_format = source.number_format
+        cell.font = FONT
+        style = styles[style_id] = copy.copy(cell._style)
+    else:
+        cell._style = copy.copy(style)
+    return cell
+
+
+def stream_workbook(path, output, translator=None):
+    """
+    Translate every sheet with a read-only source and a write-only target.
+
+    Column widths have to be written before the first row, so each sheet is
+    read twice: once to measure the translated text and once to write it
+    (the second pass hits the translator's cache). Merged cells are not
+    available in read-only mode and are not copied.
+    """
+    translator = translator or default_translator()
+    src = load_workbook(path, read_only=True)
+    dst = Workbook(write_only=True)
+    for source in src.worksheets:
+        ws = dst.create_sheet(source.title)
+        fitter = DimensionFitter()
+        rows = source.iter_rows(min_row=1, min_col=1)
+        for index, row in enumerate(rows, start=1):
+            for column, cell in enumerate(row, start=1):
+                _, width, lines = translator.measure(cell.value)
+                fitter.add(index, column, width, lines)
+        fitter.apply(ws)
+
+        styles = {}
+        for row in source.iter_rows(min_row=1, min_col=1):
+            cells = []
+            for cell in row:
+                value = translator(cell.value) if cell.value else cell.value
+                cells.append(_styled_cell(ws, cell, value, styles))
+            ws.append(cells)
+    src.close()
+    dst.save(output)
+
+
+OUTPUT_PREFIX = "Modified "
+
+
+def find_workbooks(patterns):
+    """
+    Expand files, directories (their ``*.xlsx``) and glob patterns into a
+    sorted list of workbooks, leaving out earlier outputs and Excel lock files.
+    """
+    found = set()
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            pattern = os.path.join(pattern, "*.xlsx")
+        found.update(glob.glob(pattern))
+    return sorted(
+        path
+        for path in found
+        if os.path.isfile(path)
+        and not os.path.basename(path).startswith((OUTPUT_PREFIX, "~$"))
+    )
+
+
+def up_to_date(path, output, dictionary=DICTIONARY):
+    """Whether ``output`` is newer than both the workbook and the dictionary."""
+    try:
+        built = os.stat(output).st_mtime_ns
+    except FileNotFoundError:
+        return False
+    return built >= max(os.stat(path).st_mtime_ns, os.stat(dictionary).st_mtime_ns)
+
+
+@dataclass
+class FileResult:
+    path: str
+    output: str
+    status: str  # "translated", "skipped" or "failed: <error>"
+    seconds: float = 0.0
+
+
+def convert(path, stream=False, translator=None):
+    """Translate one workbook next to itself and time it."""
+    output = output_path(path)
+    start = time.perf_counter()
+    if stream:
+        stream_workbook(path, output, translator)
+    else:
+        translate_workbook(path, output, translator)
+    return FileResult(path, output, "translated", time.perf_counter() - start)
+
+
+def _init_worker(dictionary, wide):
+    """Load the dictionary once per worker process."""
+    global _default
+    _default = Translator.from_file(dictionary, wide=wide)
+
+
+def batch(
+    paths, dictionary=DICTIONARY, jobs=None, stream=False, force=False, wide=True
+):
+    """
+    Translate ``paths``, skipping workbooks whose output is up to date.
+
+    More than one workbook is spread over a pool of ``jobs`` processes, each
+    loading the dictionary once. Returns one result per path, in order.
+    """
+    results = {}
+    todo = []
+    for path in paths:
+        output = output_path(path)
+        if not force and up_to_date(path, output, dictionary):
+            results[path] = FileResult(path, output, "skipped")
+        else:
+            todo.append(path)
+
+    if len(todo) == 1 or jobs == 1:
+        translator = Translator.from_file(dictionary, wide=wide)
+        for path in todo:
+            try:
+                results[path] = convert(path, stream, translator)
+            except Exception as exc:
+                results[path] = FileResult(path, output_path(path), f"failed: {exc}")
+    elif todo:
+        with ProcessPoolExecutor(
+            max_workers=jobs, initializer=_init_worker, initargs=(dictionary, wide)
+        ) as pool:
+            futures = {pool.submit(convert, path, stream): path for path in todo}
+            for future in as_completed(futures):
+                path = futures[future]
+                try:
+                    results[path] = future.result()
+                except Exception as exc:
+                    results[path] = FileResult(
+                        path, output_path(path), f"failed: {exc}"
+                    )
+    return [results[path] for path in paths]
+
+
+def print_summary(results, elapsed):
+    for r in results:
+        seconds = f"{r.seconds:6.2f}s" if r.status == "translated" else "      -"
+        print(f"{seconds}  {r.status:<10}  {r.path}")
+    counts = {
+        status: sum(r.status.startswith(status) for r in results)
+        for status in ("translated", "skipped", "failed")
+    }
+    print(
+        f"{len(results)} workbooks: {counts['translated']} translated,"
+        f" {counts['skipped']} skipped, {counts['failed']} failed"
+        f" in {elapsed:.2f}s"
+    )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python chi2eng.py")
+    parser.add_argument(
+        "workbooks", nargs="+", help="workbooks, directories or glob patterns"
+    )
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        help="constant-memory mode for large workbooks (merged cells are lost)",
+    )
+    parser.add_argument("--dictionary", default=DICTIONARY)
+    parser.add_argument(
+        "--narrow-cjk",
+        action="store_true",
+        help="count CJK characters as one column instead of two when fitting widths",
+    )
+    parser.add_argument(
+        "--jobs", type=int, help="worker processes (default: one per CPU)"
+    )
+    parser.add_argument(
+        "--force", action="store_true", help="rebuild outputs that are up to date"
+    )
+    args = parser.parse_args(argv)
+
+    paths = find_workbooks(args.workbooks)
+    if not paths:
+        parser.error("no workbooks found")
+    start = time.perf_counter()
+    results = batch(
+        paths,
+        args.dictionary,
+        args.jobs,
+        args.stream,
+        args.force,
+        wide=not args.narrow_cjk,
+    )
+    print_summary(results, time.perf_counter() - start)
+    return 1 if any(r.status.startswith("failed") for r in results) else 0
 
 
 if __name__ == "__main__":
-    main()
+    raise SystemExit(main())
@@ -1,29 +1,333 @@
+import functools
+import graphlib
+import hashlib
 import os
-from typing import Optional
+import re
+import threading
+import time
+import weakref
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
 
 import psycopg2
+import psycopg2.extensions
+from psycopg2.pool import PoolError
 
+import cache
 
-def get_connection():
-    """Create a new database connection using environment variables."""
-    conn = psycopg2.connect(
+
+def _connection_params():
+    """Return ``psycopg2.connect`` keyword arguments from the environment."""
+    return dict(
         dbname=os.environ.get("POSTGRES_DB", "postgres"),
         user=os.environ.get("POSTGRES_USER", "postgres"),
         password=os.environ.get("POSTGRES_PASSWORD", "postgres"),
         host=os.environ.get("POSTGRES_HOST", "localhost"),
         port=os.environ.get("POSTGRES_PORT", 5432),
     )
+
+
+def get_connection():
+    """Create a new database connection using environment variables."""
+    conn = psycopg2.connect(**_connection_params())
     conn.autocommit = True
     return conn
 
 
-def init_db():
-    """Initialise the database using the schema.sql file."""
-    conn = get_connection()
-    cur = conn.cursor()
-    cur.execute("DROP SCHEMA IF EXISTS public CASCADE; CREATE SCHEMA public;")
+class ConnectionPool:
+    """
+    Thread-safe pool of autocommit connections.
+
+    Between ``minconn`` and ``maxconn`` connections are kept open. Borrowers
+    block for up to ``timeout`` seconds when every connection is in use.
+    Connections idle for longer than ``max_idle`` seconds are pinged with
+    ``SELECT 1`` before being handed out, and broken connections are replaced
+    transparently.
+    """
+
+    def __init__(
+        self,
+        minconn: int = 1,
+        maxconn: int = 10,
+        timeout: float = 30.0,
+        max_idle: float = 30.0,
+        connect=get_connection,
+    ):
+        if minconn < 0 or maxconn < 1 or minconn > maxconn:
+            raise ValueError("Invalid pool size")
+        self.minconn = minconn
+        self.maxconn = maxconn
+        self.timeout = timeout
+        self.max_idle = max_idle
+        self.pid = os.getpid()
+        self.connects = 0
+        self._connect = connect
+        self._idle = deque()  # (conn, last_used) pairs, most recent last
+        self._size = 0  # idle + borrowed
+        self._closed = False
+        self._cond = threading.Condition()
+        with self._cond:
+            for _ in range(minconn):
+                self._idle.append((self._new_connection(), time.monotonic()))
+                self._size += 1
+
+    def _new_connection(self):
+        conn = self._connect()
+        self.connects += 1
+        return conn
+
+    def _is_healthy(self, conn, last_used: float) -> bool:
+        if conn.closed:
+            return False
+        if time.monotonic() - last_used < self.max_idle:
+            return True
+        try:
+            with conn.cursor() as cur:
+                cur.execute("SELECT 1")
+            return True
+        except psycopg2.Error:
+            return False
+
+    def _discard(self, conn):
+        with self._cond:
+            self._size -= 1
+            self._cond.notify()
+        if not conn.closed:
+            try:
+                conn.close()
+            except psycopg2.Error:
+                pass
+
+    def getconn(self):
+        """Borrow a connection, opening a new one if the pool is below ``maxconn``."""
+        deadline = time.monotonic() + self.timeout
+        while True:
+            with self._cond:
+                while True:
+                    if self._closed:
+                        raise PoolError("connection pool is closed")
+                    if self._idle:
+                        conn, last_used = self._idle.pop()
+                        break
+                    if self._size < self.maxconn:
+                        self._size += 1
+                        conn = None
+                        break
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise PoolError("timed out waiting for a connection")
+                    self._cond.wait(remaining)
+            if conn is None:
+                try:
+                    return self._new_connection()
+                except Exception:
+                    with self._cond:
+                        self._size -= 1
+                        self._cond.notify()
+                    raise
+            if self._is_healthy(conn, last_used):
+                return conn
+            self._discard(conn)
+
+    def putconn(self, conn, close: bool = False):
+        """Return a borrowed connection, rolling back any open transaction."""
+        if not close and not conn.closed:
+            try:
+                status = conn.get_transaction_status()
+                if status != psycopg2.extensions.TRANSACTION_STATUS_IDLE:
+                    conn.rollback()
+                if not conn.autocommit:
+                    conn.autocommit = True
+            except psycopg2.Error:
+                close = True
+        if close or conn.closed or self._closed:
+            self._discard(conn)
+            return
+        with self._cond:
+            self._idle.append((conn, time.monotonic()))
+            self._cond.notify()
+
+    @contextmanager
+    def connection(self):
+        """Borrow a connection for the duration of a ``with`` block."""
+        conn = self.getconn()
+        try:
+            yield conn
+        finally:
+            self.putconn(conn)
+
+    def closeall(self):
+        """Close every idle connection and refuse further checkouts."""
+        with self._cond:
+            self._closed = True
+            idle = [conn for conn, _ in self._idle]
+            self._idle.clear()
+            self._size -= len(idle)
+            self._cond.notify_all()
+        for conn in idle:
+            if not conn.closed:
+                conn.close()
+
+
+_pool: Optional[ConnectionPool] = None
+_pool_lock = threading.Lock()
+# Pools inherited across fork() share sockets with the parent; keep them
+# referenced so garbage collection never closes the parent's sessions.
+_inherited_pools = []
+
+
+def get_pool() -> ConnectionPool:
+    """
+    Return the process-wide connection pool, creating it on first use.
+
+    The pool size is read from ``POSTGRES_POOL_MIN`` and ``POSTGRES_POOL_MAX``.
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is not None and _pool.pid != os.getpid():
+            _inherited_pools.append(_pool)
+            _pool = None
+        if _pool is None:
+            _pool = ConnectionPool(
+                minconn=int(os.environ.get("POSTGRES_POOL_MIN", 1)),
+                maxconn=int(os.environ.get("POSTGRES_POOL_MAX", 10)),
+            )
+        return _pool
+
+
+def close_pool():
+    """Close the process-wide pool; the next borrower creates a fresh one."""
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None and pool.pid == os.getpid():
+        pool.closeall()
+
+
+@contextmanager
+def connection():
+    """Borrow a connection from the process-wide pool."""
+    with get_pool().connection() as conn:
+        yield conn
+
+
+# Hot statements are sent as server-side prepared statements: each is parsed
+# and planned once per connection with PREPARE, then run with EXECUTE. Set
+# POSTGRES_PREPARE=0 when a transaction-pooling proxy (e.g. PgBouncer) sits
+# between the pool and the server, as those do not keep session state.
+PREPARE_STATEMENTS = os.environ.get("POSTGRES_PREPARE", "1") != "0"
+_statements: Dict[str, Tuple[str, str, int]] = {}  # sql -> (name, body, params)
+_statements_lock = threading.Lock()
+# Connection -> (schema generation, names prepared on it).
+_prepared: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()
+_schema_generation = 0
+
+
+def _numbered(sql: str) -> Tuple[str, int]:
+    """Rewrite ``%s`` placeholders as ``$1, $2, ...``; returns the parameter count."""
+    count = 0
+
+    def number(match):
+        nonlocal count
+        if match.group() == "%%":
+            return "%"
+        count += 1
+        return f"${count}"
+
+    return re.sub(r"%%|%s", number, sql), count
+
+
+def _statement(sql: str) -> Tuple[str, str, int]:
+    statement = _statements.get(sql)
+    if statement is None:
+        with _statements_lock:
+            statement = _statements.get(sql)
+            if statement is None:
+                body, count = _numbered(sql)
+                statement = (f"stmt_{len(_statements) + 1}", body, count)
+                _statements[sql] = statement
+    return statement
+
+
+def execute(cur, sql: str, params: Sequence = ()) -> None:
+    """
+    Run ``sql`` (with ``%s`` placeholders) on ``cur`` as a prepared statement,
+    preparing it first if this connection has not seen it yet. Falls back to
+    a plain ``cur.execute`` when ``PREPARE_STATEMENTS`` is off.
+    """
+    if not PREPARE_STATEMENTS:
+        cur.execute(sql, params)
+        return
+    name, body, count = _statement(sql)
+    conn = cur.connection
+    generation, names = _prepared.get(conn, (None, None))
+    if generation != _schema_generation:
+        if names:
+            cur.execute("DEALLOCATE ALL")
+        names = set()
+        _prepared[conn] = (_schema_generation, names)
+    if name not in names:
+        cur.execute(f"PREPARE {name} AS {body}")
+        names.add(name)
+    if count:
+        cur.execute(f"EXECUTE {name} ({', '.join(['%s'] * count)})", params)
+    else:
+        cur.execute(f"EXECUTE {name}")
+
+
+def check_columns(table: str, fields: Dict[str, Any], allowed: Sequence[str]):
+    """Raise ``ValueError`` for empty ``fields`` or a column not in ``allowed``."""
+    if not fields:
+        raise ValueError("No fields to update")
+    unknown = [column for column in fields if column not in allowed]
+    if unknown:
+        raise ValueError(f"Cannot update {', '.join(map(repr, unknown))} on {table}")
+
+
+@functools.lru_cache(maxsize=None)
+def _update_sql(
+    table: str, columns: Tuple[str, ...], key: str, returning: Tuple[str, ...]
+) -> str:
+    return (
+        f"UPDATE {table} SET {', '.join(f'{c}=%s' for c in columns)}"
+        f" WHERE {key}=%s RETURNING {', '.join(returning)}"
+    )
+
+
+def update_statement(
+    table: str,
+    fields: Dict[str, Any],
+    allowed: Sequence[str],
+    returning: Sequence[str],
+    key: str = "id",
+) -> str:
+    """
+    ``UPDATE`` of the ``fields`` columns of one row, matched on ``key``.
+    Column names are checked against ``allowed`` so that caller-supplied
+    keys never reach the SQL text; the statement is built once per
+    combination of columns. Parameters are the field values, then the key.
+    """
+    check_columns(table, fields, allowed)
+    return _update_sql(table, tuple(fields), key, tuple(returning))
+
+
+SCHEMA_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "schema.sql")
+# SQL files applied after schema.sql, in file name order.
+MIGRATIONS_DIR = os.path.join(os.path.dirname(SCHEMA_PATH), "migrations")
+# Key of the advisory lock that serialises concurrent schema bootstraps.
+SCHEMA_LOCK = 7_305_001
+_SCHEMA_TAG = "schema.sql sha256 "
+
+
+def schema_script(path: str = SCHEMA_PATH) -> str:
+    """
+    Return ``schema.sql`` as a single script, without the pg_dump session
+    settings and ``OWNER TO`` statements that only apply to the dumping server.
+    """
+    statements = []
     statement = ""
-    with open("schema.sql") as f:
+    with open(path, encoding="utf-8") as f:
         for line in f:
             line = line.strip()
             if not line or line.startswith("--"):
@@ -32,31 +336,235 @@ def init_db():
                 continue
             statement += " " + line
             if line.endswith(";"):
-                if "OWNER TO" in statement:
-                    statement = ""
-                    continue
-                try:
-                    cur.execute(statement)
-                except psycopg2.Error:
-                    pass
+                if "OWNER TO" not in statement:
+                    statements.append(statement.strip())
                 statement = ""
-    cur.close()
-    conn.close()
+    return "\n".join(statements)
+
+
+def migrations_script(directory: str = MIGRATIONS_DIR) -> str:
+    """Concatenate the ``*.sql`` files of ``directory`` in file name order."""
+    if not os.path.isdir(directory):
+        return ""
+    scripts = []
+    for name in sorted(os.listdir(directory)):
+        if name.endswith(".sql"):
+            with open(os.path.join(directory, name), encoding="utf-8") as f:
+                scripts.append(f.read())
+    return "\n".join(scripts)
+
+
+def schema_checksum(script: str) -> str:
+    return hashlib.sha256(script.encode("utf-8")).hexdigest()
+
+
+def init_db(force: bool = False) -> bool:
+    """
+    Initialise the database using the schema.sql file and the migrations.
+
+    The schema is recreated in one transaction and tagged with the checksum
+    of the scripts. Later calls find the tag and return immediately, leaving
+    the data in place, until one of the scripts changes or ``force`` is set.
+    Returns whether the schema was (re)created. Errors in the DDL are raised.
+    """
+    script = schema_script(SCHEMA_PATH) + "\n" + migrations_script(MIGRATIONS_DIR)
+    tag = _SCHEMA_TAG + schema_checksum(script)
+    with connection() as conn:
+        with conn:
+            with conn.cursor() as cur:
+                cur.execute("SELECT pg_advisory_xact_lock(%s)", (SCHEMA_LOCK,))
+                cur.execute(
+                    "SELECT obj_description(oid, 'pg_namespace')"
+                    " FROM pg_namespace WHERE nspname = 'public'"
+                )
+                row = cur.fetchone()
+                if not force and row is not None and row[0] == tag:
+                    return False
+                cur.execute(
+                    "DROP SCHEMA IF EXISTS public CASCADE; CREATE SCHEMA public;"
+                )
+                cur.execute(script)
+                cur.execute("COMMENT ON SCHEMA public IS %s", (tag,))
+    # Plans prepared against the old tables are dropped on next use.
+    global _schema_generation
+    _schema_generation += 1
+    cache.invalidate()
+    return True
+
+
+_TABLE_PARENTS_SQL = """
+    SELECT c.relname, array_remove(array_agg(DISTINCT p.relname), NULL)
+    FROM pg_class c
+    JOIN pg_namespace n ON n.oid = c.relnamespace
+    LEFT JOIN pg_constraint k ON k.conrelid = c.oid AND k.contype = 'f'
+    LEFT JOIN pg_class p ON p.oid = k.confrelid AND p.oid <> c.oid
+    WHERE n.nspname = 'public' AND c.relkind IN ('r', 'p')
+    GROUP BY c.relname
+"""
+
+
+def reset_db():
+    """
+    Empty every table in the public schema and restart its sequences,
+    keeping the schema itself.
+
+    Rows are deleted child tables first, which on the small tables used in
+    tests is far cheaper than ``TRUNCATE`` or recreating the schema.
+    """
+    with connection() as conn:
+        with conn:
+            with conn.cursor() as cur:
+                cur.execute(_TABLE_PARENTS_SQL)
+                parents = dict(cur.fetchall())
+                order = list(graphlib.TopologicalSorter(parents).static_order())
+                statements = [
+                    "DELETE FROM public.{}".format(
+                        psycopg2.extensions.quote_ident(table, cur)
+                    )
+                    for table in reversed(order)
+                ]
+                statements.append(
+                    "SELECT setval(format('%I.%I', schemaname, sequencename)::regclass,"
+                    " 1, false) FROM pg_sequences"
+                    " WHERE schemaname = 'public'"
+                )
+                cur.execute(";\n".join(statements))
+    cache.invalidate()
+
+
+STREAM_ITERSIZE = 2000
+PAGE_SIZE = 100
+STUDENT_COLUMNS = ("id", "student_id", "name", "grade_level")
+STUDENT_FILTERS = ("grade_level", "homeroom_id", "enrollment_status")
+
+
+def _where(
+    filterable: Sequence[str], filters: Dict[str, Any], after_id: Optional[int]
+) -> Tuple[str, list]:
+    """
+    ``WHERE`` clause for equality filters (a list or tuple value matches any
+    of its items; ``None`` means no filter) and a keyset lower bound on id.
+    Only columns named in ``filterable`` are accepted.
+    """
+    clauses, params = [], []
+    for column, value in filters.items():
+        if column not in filterable:
+            raise ValueError(f"Cannot filter on {column!r}")
+        if value is None:
+            continue
+        if isinstance(value, (list, tuple, set, frozenset)):
+            clauses.append(f"{column} = ANY(%s)")
+            params.append(list(value))
+        else:
+            clauses.append(f"{column} = %s")
+            params.append(value)
+    if after_id is not None:
+        clauses.append("id > %s")
+        params.append(after_id)
+    return (" WHERE " + " AND ".join(clauses) if clauses else ""), params
+
+
+def stream_rows(
+    table: str,
+    columns: Sequence[str],
+    itersize: int = STREAM_ITERSIZE,
+    after_id: Optional[int] = None,
+    filterable: Optional[Sequence[str]] = None,
+    **filters,
+) -> Iterator[tuple]:
+    """
+    Yield the rows of ``table`` in id order through a named (server-side)
+    cursor, fetching ``itersize`` rows per round trip. Memory use does not
+    depend on the number of rows. Filters may use ``filterable`` columns
+    (default: ``columns``). The pooled connection is held until the
+    iterator is exhausted or closed.
+    """
+    where, params = _where(filterable or columns, filters, after_id)
+    sql = f"SELECT {', '.join(columns)} FROM {table}{where} ORDER BY id"
+    with connection() as conn:
+        # Named cursors only live inside a transaction; the pool restores
+        # autocommit when the connection is returned.
+        conn.autocommit = False
+        with conn:
+            with conn.cursor(name=f"stream_{table}") as cur:
+                cur.itersize = itersize
+                cur.execute(sql, params)
+                yield from cur
+
+
+def keyset_page(
+    table: str,
+    columns: Sequence[str],
+    after_id: Optional[int] = None,
+    limit: int = PAGE_SIZE,
+    filterable: Optional[Sequence[str]] = None,
+    **filters,
+) -> List[tuple]:
+    """
+    Return up to ``limit`` rows with ``id > after_id`` in id order. Pass the
+    last id of a page as ``after_id`` to get the next one.
+    """
+    where, params = _where(filterable or columns, filters, after_id)
+    sql = f"SELECT {', '.join(columns)} FROM {table}{where} ORDER BY id LIMIT %s"
+    with connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute(sql, (*params, limit))
+            return cur.fetchall()
 
 
 def get_students():
     """Return all students from the database."""
-    conn = get_connection()
-    with conn.cursor() as cur:
-        cur.execute("SELECT id, student_id, name, grade_level FROM students")
-        rows = cur.fetchall()
-    conn.close()
-    return rows
+    with connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute("SELECT id, student_id, name, grade_level FROM students")
+            return cur.fetchall()
+
+
+def iter_students(
+    grade_level=None,
+    homeroom_id=None,
+    itersize: int = STREAM_ITERSIZE,
+    enrollment_status=None,
+) -> Iterator[tuple]:
+    """
+    Stream ``(id, student_id, name, grade_level)`` rows in id order,
+    optionally filtered by grade and/or homeroom (both are indexed) and
+    enrollment status.
+    """
+    return stream_rows(
+        "students",
+        STUDENT_COLUMNS,
+        itersize,
+        filterable=STUDENT_FILTERS,
+        grade_level=grade_level,
+        homeroom_id=homeroom_id,
+        enrollment_status=enrollment_status,
+    )
+
+
+def students_page(
+    after_id: Optional[int] = None,
+    limit: int = PAGE_SIZE,
+    grade_level=None,
+    homeroom_id=None,
+    enrollment_status=None,
+) -> List[tuple]:
+    """One keyset page of students; see ``keyset_page``."""
+    return keyset_page(
+        "students",
+        STUDENT_COLUMNS,
+        after_id,
+        limit,
+        filterable=STUDENT_FILTERS,
+        grade_level=grade_level,
+        homeroom_id=homeroom_id,
+        enrollment_status=enrollment_status,
+    )
 
 
 def display_students():
     """Print the students table to stdout."""
-    for row in get_students():
+    for row in iter_students():
         print(row)
 
 
@@ -67,15 +575,12 @@ def add_student(student_id: str, name: str, grade_level: int):
         VALUES (%s, %s, %s)
         RETURNING id, student_id, name, grade_level;
     """
-    conn = get_connection()
-    try:
+    with connection() as conn:
         with conn:  # commits on success, rollbacks on exception
             with conn.cursor() as cur:
-                cur.execute(sql, (student_id, name, grade_level))
+                execute(cur, sql, (student_id, name, grade_level))
                 row = cur.fetchone()
                 return row
-    finally:
-        conn.close()
 
 
 def get_student(student_id: str):
@@ -83,13 +588,10 @@ def get_student(student_id: str):
     sql = (
         "SELECT id, student_id, name, grade_level FROM students WHERE student_id=%s"
     )
-    conn = get_connection()
-    try:
+    with connection() as conn:
         with conn.cursor() as cur:
-            cur.execute(sql, (student_id,))
+            execute(cur, sql, (student_id,))
             return cur.fetchone()
-    finally:
-        conn.close()
 
 
 def update_student(
@@ -100,44 +602,27 @@ def update_student(
 
     At least one of ``name`` or ``grade_level`` must be provided.
     """
-
-    fields = []
-    values = []
+    fields = {}
     if name is not None:
-        fields.append("name=%s")
-        values.append(name)
+        fields["name"] = name
     if grade_level is not None:
-        fields.append("grade_level=%s")
-        values.append(grade_level)
-    if not fields:
-        raise ValueError("No fields to update")
-    values.append(student_id)
-
-    sql = f"""
-        UPDATE students
-        SET {', '.join(fields)}
-        WHERE student_id=%s
-        RETURNING id, student_id, name, grade_level;
-    """
+        fields["grade_level"] = grade_level
+    sql = update_statement(
+        "students", fields, STUDENT_COLUMNS[2:], STUDENT_COLUMNS, key="student_id"
+    )
 
-    conn = get_connection()
-    try:
+    with connection() as conn:
         with conn:
             with conn.cursor() as cur:
-                cur.execute(sql, tuple(values))
+                execute(cur, sql, (*fields.values(), student_id))
                 return cur.fetchone()
-    finally:
-        conn.close()
 
 
 def delete_student(student_id: str) -> bool:
     """Delete a student by ``student_id``. Returns ``True`` if a row was deleted."""
     sql = "DELETE FROM students WHERE student_id=%s"
-    conn = get_connection()
-    try:
+    with connection() as conn:
         with conn:
             with conn.cursor() as cur:
-                cur.execute(sql, (student_id,))
+                execute(cur, sql, (student_id,))
                 return cur.rowcount > 0
-    finally:
-        conn.close()
@@ -0,0 +1,192 @@
+"""
+Bulk-load ``config.yaml`` into the database in a single transaction.
+
+Usage: python load_config.py [CONFIG] [--semester SEMESTER] [--replace]
+
+The file is parsed once and every table is streamed through
+``COPY ... FROM STDIN`` in foreign-key order. Either everything is written or,
+on any error, nothing is.
+"""
+
+import argparse
+import csv
+import io
+import json
+import time
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+import yaml
+
+import cache
+from db import connection
+
+# Tables written by the loader, parents before children.
+TABLES = (
+    ("teachers", ("id", "name", "max_periods_per_week", "unavailable_periods")),
+    ("homerooms", ("id", "name", "capacity", "grade_level")),
+    ("students", ("id", "student_id", "name", "grade_level", "homeroom_id")),
+    ("courses", ("id", "code", "name", "periods_per_week", "grade_levels")),
+    ("teacher_courses", ("teacher_id", "course_id")),
+    ("student_courses", ("student_id", "course_id", "semester")),
+)
+
+# courses.periods_per_week is limited to 1..6 by a CHECK constraint; the exact
+# per-grade requirement is kept in courses.grade_levels.
+MAX_PERIODS_PER_WEEK = 6
+
+
+class _CopyStream(io.TextIOBase):
+    """File-like object that renders rows as CSV lazily for ``copy_expert``."""
+
+    def __init__(self, rows: Iterable[Sequence[Any]]):
+        self._rows = iter(rows)
+        self._buffer = ""
+        self._line = io.StringIO()
+        self._writer = csv.writer(self._line, lineterminator="\n")
+
+    def readable(self) -> bool:
+        return True
+
+    def _render(self, row: Sequence[Any]) -> str:
+        self._line.seek(0)
+        self._line.truncate()
+        self._writer.writerow(
+            json.dumps(v) if isinstance(v, (dict, list)) else v for v in row
+        )
+        return self._line.getvalue()
+
+    def read(self, size: int = -1) -> str:
+        while size < 0 or len(self._buffer) < size:
+            row = next(self._rows, None)
+            if row is None:
+                break
+            self._buffer += self._render(row)
+        if size < 0:
+            size = len(self._buffer)
+        chunk, self._buffer = self._buffer[:size], self._buffer[size:]
+        return chunk
+
+
+def build_rows(
+    config: Dict[str, Any], semester: Optional[str] = None
+) -> Dict[str, List[tuple]]:
+    """Translate a parsed config mapping into rows for each table."""
+    limits = config.get("teacher_limits") or {}
+    constraints = config.get("teacher_constraints") or {}
+    teachers = config.get("teachers") or []
+    teacher_names = {t["id"]: t["name"] for t in teachers}
+    rows: Dict[str, List[tuple]] = {table: [] for table, _ in TABLES}
+
+    for t in teachers:
+        rows["teachers"].append(
+            (t["id"], t["name"], limits.get(t["id"], 24), constraints.get(t["id"]))
+        )
+
+    homerooms: Dict[tuple, int] = {}
+    for s in config.get("students") or []:
+        key = (s["grade"], s.get("homeroom_teacher"))
+        if key not in homerooms:
+            homerooms[key] = len(homerooms) + 1
+            label = f"G{key[0]} {teacher_names.get(key[1], '')}".strip()
+            rows["homerooms"].append((homerooms[key], label[:50], 24, key[0]))
+        rows["students"].append(
+            (s["id"], f"S{s['id']:04d}", s["name"], s["grade"], homerooms[key])
+        )
+
+    requirements = config.get("course_requirements") or {}
+    per_course: Dict[int, Dict[str, int]] = {}
+    for grade, reqs in requirements.items():
+        for req in reqs or []:
+            per_course.setdefault(req["course_id"], {})[str(grade)] = req[
+                "periods_per_week"
+            ]
+
+    for c in config.get("courses") or []:
+        grades = per_course.get(c["id"])
+        periods = max(grades.values()) if grades else 1
+        rows["courses"].append(
+            (
+                c["id"],
+                f"C{c['id']:03d}",
+                c["name"],
+                min(max(periods, 1), MAX_PERIODS_PER_WEEK),
+                grades,
+            )
+        )
+        if c.get("teacher_id") is not None:
+            rows["teacher_courses"].append((c["teacher_id"], c["id"]))
+
+    for s in config.get("students") or []:
+        for req in requirements.get(s["grade"]) or []:
+            rows["student_courses"].append((s["id"], req["course_id"], semester))
+
+    return rows
+
+
+def copy_rows(cur, table: str, columns: Sequence[str], rows: Iterable[Sequence]):
+    """Stream ``rows`` into ``table`` with ``COPY ... FROM STDIN``."""
+    sql = f"COPY {table} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)"
+    cur.copy_expert(sql, _CopyStream(rows))
+
+
+def load_rows(
+    rows: Dict[str, Iterable[tuple]], replace: bool = False
+) -> Dict[str, int]:
+    """
+    Write ``rows`` in one transaction and return the row count per table.
+
+    With ``replace`` the target tables are truncated first, inside the same
+    transaction.
+    """
+    counts = {}
+    with connection() as conn:
+        with conn:
+            with conn.cursor() as cur:
+                if replace:
+                    cur.execute(
+                        "TRUNCATE TABLE "
+                        + ", ".join(table for table, _ in TABLES)
+                        + " RESTART IDENTITY CASCADE"
+                    )
+                for table, columns in TABLES:
+                    copy_rows(cur, table, columns, rows.get(table, ()))
+                    counts[table] = cur.rowcount
+                for table, columns in TABLES:
+                    if columns[0] == "id":
+                        cur.execute(
+                            f"SELECT setval(pg_get_serial_sequence('{table}', 'id'),"
+                            f" COALESCE(MAX(id), 0) + 1, false) FROM {table}"
+                        )
+    for table, _ in TABLES:
+        cache.invalidate(table)
+    return counts
+
+
+def load_config(
+    path: str = "config.yaml", semester: Optional[str] = None, replace: bool = False
+) -> Dict[str, int]:
+    """Load ``path`` into the database and return the row count per table."""
+    with open(path) as f:
+        config = yaml.safe_load(f)
+    return load_rows(build_rows(config, semester), replace=replace)
+
+
+def main(argv: Optional[Sequence[str]] = None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("config", nargs="?", default="config.yaml")
+    parser.add_argument("--semester")
+    parser.add_argument(
+        "--replace", action="store_true", help="truncate the target tables first"
+    )
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    counts = load_config(args.config, semester=args.semester, replace=args.replace)
+    elapsed = time.perf_counter() - start
+    for table, count in counts.items():
+        print(f"{table:<16} {count:>8}")
+    print(f"loaded in {elapsed:.3f}s")
+
+
+if __name__ == "__main__":
+    main()
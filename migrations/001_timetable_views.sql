@@ -0,0 +1,112 @@
+--
+-- Materialized day x period timetables per (semester, teacher) and
+-- (semester, student). Statement-level triggers queue the keys touched by
+-- changes to scheduled_classes and class_enrollments; timetables.refresh()
+-- rebuilds only the queued grids. Rows without a semester are not projected.
+--
+
+CREATE TABLE public.teacher_timetables (
+    semester character varying(10) NOT NULL,
+    teacher_id integer NOT NULL,
+    grid jsonb NOT NULL,
+    refreshed_at timestamp with time zone DEFAULT now() NOT NULL,
+    PRIMARY KEY (semester, teacher_id)
+);
+
+CREATE TABLE public.student_timetables (
+    semester character varying(10) NOT NULL,
+    student_id integer NOT NULL,
+    grid jsonb NOT NULL,
+    refreshed_at timestamp with time zone DEFAULT now() NOT NULL,
+    PRIMARY KEY (semester, student_id)
+);
+
+-- owner is 't' for teacher_timetables and 's' for student_timetables.
+CREATE TABLE public.timetable_refresh_queue (
+    owner character(1) NOT NULL,
+    semester character varying(10) NOT NULL,
+    owner_id integer NOT NULL,
+    PRIMARY KEY (owner, semester, owner_id)
+);
+
+CREATE FUNCTION public.queue_scheduled_class_timetables() RETURNS trigger
+    LANGUAGE plpgsql AS $$
+BEGIN
+    IF TG_OP <> 'DELETE' THEN
+        INSERT INTO public.timetable_refresh_queue
+        SELECT 't', semester, teacher_id FROM changed_new
+        WHERE semester IS NOT NULL AND teacher_id IS NOT NULL
+        UNION
+        SELECT 's', n.semester, ce.student_id
+        FROM changed_new n
+        JOIN public.class_enrollments ce ON ce.scheduled_class_id = n.id
+        WHERE n.semester IS NOT NULL AND ce.student_id IS NOT NULL
+        ON CONFLICT DO NOTHING;
+    END IF;
+    IF TG_OP <> 'INSERT' THEN
+        INSERT INTO public.timetable_refresh_queue
+        SELECT 't', semester, teacher_id FROM changed_old
+        WHERE semester IS NOT NULL AND teacher_id IS NOT NULL
+        UNION
+        SELECT 's', o.semester, ce.student_id
+        FROM changed_old o
+        JOIN public.class_enrollments ce ON ce.scheduled_class_id = o.id
+        WHERE o.semester IS NOT NULL AND ce.student_id IS NOT NULL
+        ON CONFLICT DO NOTHING;
+    END IF;
+    RETURN NULL;
+END
+$$;
+
+CREATE FUNCTION public.queue_enrollment_timetables() RETURNS trigger
+    LANGUAGE plpgsql AS $$
+BEGIN
+    IF TG_OP <> 'DELETE' THEN
+        INSERT INTO public.timetable_refresh_queue
+        SELECT DISTINCT 's', sc.semester, n.student_id
+        FROM changed_new n
+        JOIN public.scheduled_classes sc ON sc.id = n.scheduled_class_id
+        WHERE sc.semester IS NOT NULL AND n.student_id IS NOT NULL
+        ON CONFLICT DO NOTHING;
+    END IF;
+    IF TG_OP <> 'INSERT' THEN
+        INSERT INTO public.timetable_refresh_queue
+        SELECT DISTINCT 's', sc.semester, o.student_id
+        FROM changed_old o
+        JOIN public.scheduled_classes sc ON sc.id = o.scheduled_class_id
+        WHERE sc.semester IS NOT NULL AND o.student_id IS NOT NULL
+        ON CONFLICT DO NOTHING;
+    END IF;
+    RETURN NULL;
+END
+$$;
+
+CREATE TRIGGER scheduled_classes_timetables_insert
+    AFTER INSERT ON public.scheduled_classes
+    REFERENCING NEW TABLE AS changed_new
+    FOR EACH STATEMENT EXECUTE FUNCTION public.queue_scheduled_class_timetables();
+
+CREATE TRIGGER scheduled_classes_timetables_update
+    AFTER UPDATE ON public.scheduled_classes
+    REFERENCING NEW TABLE AS changed_new OLD TABLE AS changed_old
+    FOR EACH STATEMENT EXECUTE FUNCTION public.queue_scheduled_class_timetables();
+
+CREATE TRIGGER scheduled_classes_timetables_delete
+    AFTER DELETE ON public.scheduled_classes
+    REFERENCING OLD TABLE AS changed_old
+    FOR EACH STATEMENT EXECUTE FUNCTION public.queue_scheduled_class_timetables();
+
+CREATE TRIGGER class_enrollments_timetables_insert
+    AFTER INSERT ON public.class_enrollments
+    REFERENCING NEW TABLE AS changed_new
+    FOR EACH STATEMENT EXECUTE FUNCTION public.queue_enrollment_timetables();
+
+CREATE TRIGGER class_enrollments_timetables_update
+    AFTER UPDATE ON public.class_enrollments
+    REFERENCING NEW TABLE AS changed_new OLD TABLE AS changed_old
+    FOR EACH STATEMENT EXECUTE FUNCTION public.queue_enrollment_timetables();
+
+CREATE TRIGGER class_enrollments_timetables_delete
+    AFTER DELETE ON public.class_enrollments
+    REFERENCING OLD TABLE AS changed_old
+    FOR EACH STATEMENT EXECUTE FUNCTION public.queue_enrollment_timetables();
@@ -0,0 +1,35 @@
+--
+-- Indexes for the scheduler's query patterns.
+--
+-- Point clash lookups ("teacher T / facility F at period P in semester S")
+-- are served by the UNIQUE (teacher_id | facility_id, time_period_id,
+-- semester) constraints. What was missing is a semester-first index for
+-- per-period occupancy ("who is busy at P in S") and semester scans; it
+-- makes the single-column semester index redundant, and the teacher and
+-- facility indexes duplicate prefixes of the unique constraints.
+--
+
+CREATE INDEX idx_scheduled_classes_semester_period
+    ON public.scheduled_classes USING btree (semester, time_period_id, teacher_id)
+    INCLUDE (facility_id, class_section_id);
+
+DROP INDEX public.idx_scheduled_classes_semester;
+DROP INDEX public.idx_scheduled_classes_teacher;
+DROP INDEX public.idx_scheduled_classes_facility;
+
+-- JSONB containment (@>) on teacher departments and per-grade course loads.
+CREATE INDEX idx_teachers_departments
+    ON public.teachers USING gin (departments jsonb_path_ops);
+
+CREATE INDEX idx_courses_grade_levels
+    ON public.courses USING gin (grade_levels jsonb_path_ops);
+
+-- Readers only ever look at active rows.
+CREATE INDEX idx_class_sections_active
+    ON public.class_sections USING btree (semester, course_id) WHERE is_active;
+
+CREATE INDEX idx_time_periods_active
+    ON public.time_periods USING btree (day_of_week, period_number) WHERE is_active;
+
+CREATE INDEX idx_scheduling_constraints_active
+    ON public.scheduling_constraints USING btree (constraint_type) WHERE is_active;
@@ -0,0 +1,75 @@
+--
+-- Let PostgreSQL reject teacher and facility clashes in scheduled_classes.
+--
+-- The UNIQUE (teacher_id | facility_id, time_period_id, semester)
+-- constraints could not tell alternating weeks apart, so they are replaced
+-- by exclusion constraints that also require the rows' teaching weeks to
+-- overlap. Scalars are compared as single-point ranges, which GiST indexes
+-- natively, so no extension (btree_gist) is needed. Rows with a NULL
+-- teacher or facility, period or semester never clash, as before. Each half
+-- of a double period is its own row and is checked like any other.
+--
+
+-- week_pattern accepts 'all' (the default), 'A'/'odd', 'B'/'even' or a list
+-- of weeks and week ranges such as '1-6, 9, 12-14' (weeks 1 to 53).
+CREATE FUNCTION public.week_pattern_weeks(pattern text) RETURNS int4multirange
+    LANGUAGE plpgsql IMMUTABLE AS $$
+DECLARE
+    p text := lower(btrim(coalesce(pattern, 'all')));
+    weeks int4multirange := '{}';
+    item text;
+    bounds text[];
+BEGIN
+    IF p IN ('', 'all') THEN
+        RETURN int4multirange(int4range(1, 53, '[]'));
+    END IF;
+    IF p IN ('a', 'odd', 'b', 'even') THEN
+        SELECT range_agg(int4range(w, w, '[]')) INTO weeks
+        FROM generate_series(CASE WHEN p IN ('a', 'odd') THEN 1 ELSE 2 END, 53, 2) AS w;
+        RETURN weeks;
+    END IF;
+    FOREACH item IN ARRAY string_to_array(p, ',') LOOP
+        bounds := regexp_match(btrim(item), '^(\d+)(?:\s*-\s*(\d+))?$');
+        IF bounds IS NULL
+           OR bounds[1]::int < 1
+           OR coalesce(bounds[2], bounds[1])::int NOT BETWEEN bounds[1]::int AND 53 THEN
+            RAISE EXCEPTION 'invalid week_pattern: %', pattern
+                USING ERRCODE = 'check_violation';
+        END IF;
+        weeks := weeks + int4multirange(
+            int4range(bounds[1]::int, coalesce(bounds[2], bounds[1])::int, '[]'));
+    END LOOP;
+    RETURN weeks;
+END
+$$;
+
+CREATE TYPE public.textrange AS RANGE (subtype = text);
+
+ALTER TABLE public.scheduled_classes
+    ADD COLUMN weeks int4multirange
+        GENERATED ALWAYS AS (public.week_pattern_weeks(week_pattern)) STORED,
+    DROP CONSTRAINT scheduled_classes_teacher_id_time_period_id_semester_key,
+    DROP CONSTRAINT scheduled_classes_facility_id_time_period_id_semester_key,
+    ADD CONSTRAINT scheduled_classes_teacher_clash EXCLUDE USING gist (
+        int4range(teacher_id, teacher_id, '[]') WITH =,
+        int4range(time_period_id, time_period_id, '[]') WITH =,
+        public.textrange(semester, semester, '[]') WITH =,
+        weeks WITH &&
+    ) WHERE (teacher_id IS NOT NULL AND time_period_id IS NOT NULL AND semester IS NOT NULL),
+    ADD CONSTRAINT scheduled_classes_facility_clash EXCLUDE USING gist (
+        int4range(facility_id, facility_id, '[]') WITH =,
+        int4range(time_period_id, time_period_id, '[]') WITH =,
+        public.textrange(semester, semester, '[]') WITH =,
+        weeks WITH &&
+    ) WHERE (facility_id IS NOT NULL AND time_period_id IS NOT NULL AND semester IS NOT NULL),
+    -- A double period links its two halves; only double periods may link.
+    ADD CONSTRAINT scheduled_classes_linked_period_check
+        CHECK (linked_period_id IS NULL OR (is_double_period AND linked_period_id <> id));
+
+-- The dropped unique constraints also indexed lookups by teacher (timetable
+-- refresh) and by facility (foreign key checks when deleting facilities).
+CREATE INDEX idx_scheduled_classes_teacher
+    ON public.scheduled_classes USING btree (teacher_id, semester);
+
+CREATE INDEX idx_scheduled_classes_facility
+    ON public.scheduled_classes USING btree (facility_id);
@@ -0,0 +1,81 @@
+"""
+Shared helpers for the many-row ``create_*``/``update_*``/``delete_*``
+functions in ``models``.
+
+Each helper runs one transaction. Inserts are sent as multi-row
+``INSERT ... VALUES ... RETURNING`` pages of ``page_size`` rows; updates and
+deletes are a single statement over ``id = ANY(...)``.
+"""
+
+from typing import Any, Dict, Iterable, List, Sequence, Tuple
+
+from psycopg2.extras import Json, execute_values
+
+from db import check_columns, connection
+
+BATCH_PAGE_SIZE = 500
+
+
+def _adapt(value):
+    """Dicts and lists are stored in JSONB columns."""
+    return Json(value) if isinstance(value, (dict, list)) else value
+
+
+def insert_many(
+    table: str,
+    columns: Sequence[str],
+    rows: Iterable[Sequence[Any]],
+    returning: Sequence[str],
+    page_size: int = BATCH_PAGE_SIZE,
+) -> List[Tuple]:
+    """Insert ``rows`` and return the ``returning`` columns, in input order."""
+    values = [tuple(_adapt(v) for v in row) for row in rows]
+    if not values:
+        return []
+    sql = (
+        f"INSERT INTO {table} ({', '.join(columns)}) VALUES %s"
+        f" RETURNING {', '.join(returning)}"
+    )
+    with connection() as conn:
+        with conn:
+            with conn.cursor() as cur:
+                return execute_values(cur, sql, values, page_size=page_size, fetch=True)
+
+
+def update_many(
+    table: str,
+    ids: Iterable[int],
+    fields: Dict[str, Any],
+    returning: Sequence[str],
+    allowed: Sequence[str],
+) -> List[Tuple]:
+    """
+    Set ``fields`` on every row in ``ids``; returns the updated rows by id.
+    Only columns named in ``allowed`` may be set.
+    """
+    check_columns(table, fields, allowed)
+    ids = list(ids)
+    if not ids:
+        return []
+    sql = f"""
+        UPDATE {table} SET {', '.join(f"{k}=%s" for k in fields)}
+        WHERE id = ANY(%s)
+        RETURNING {', '.join(returning)}
+    """
+    with connection() as conn:
+        with conn:
+            with conn.cursor() as cur:
+                cur.execute(sql, (*map(_adapt, fields.values()), ids))
+                return sorted(cur.fetchall(), key=lambda row: row[0])
+
+
+def delete_many(table: str, ids: Iterable[int]) -> int:
+    """Delete every row in ``ids``; returns the number of rows deleted."""
+    ids = list(ids)
+    if not ids:
+        return 0
+    with connection() as conn:
+        with conn:
+            with conn.cursor() as cur:
+                cur.execute(f"DELETE FROM {table} WHERE id = ANY(%s)", (ids,))
+                return cur.rowcount
@@ -1,7 +1,16 @@
 from dataclasses import dataclass
-from typing import Optional
+from typing import Iterable, Iterator, List, Optional
 
-from db import get_connection
+from db import (
+    PAGE_SIZE,
+    STREAM_ITERSIZE,
+    connection,
+    execute,
+    keyset_page,
+    stream_rows,
+    update_statement,
+)
+from models.batch import BATCH_PAGE_SIZE, delete_many, insert_many, update_many
 
 
 @dataclass
@@ -14,6 +23,17 @@ class ClassSection:
     is_active: bool = True
 
 
+# Writable columns, in dataclass field order after ``id``. Updates accept
+# only these names.
+_COLUMNS = (
+    "course_id",
+    "section_name",
+    "max_students",
+    "semester",
+    "is_active",
+)
+
+
 def create_class_section(
     course_id: Optional[int] = None,
     section_name: Optional[str] = None,
@@ -26,18 +46,16 @@ def create_class_section(
         VALUES (%s,%s,%s,%s,%s)
         RETURNING id, course_id, section_name, max_students, semester, is_active;
     """
-    conn = get_connection()
-    try:
+    with connection() as conn:
         with conn:
             with conn.cursor() as cur:
-                cur.execute(
+                execute(
+                    cur,
                     sql,
                     (course_id, section_name, max_students, semester, is_active),
                 )
                 row = cur.fetchone()
                 return ClassSection(*row)
-    finally:
-        conn.close()
 
 
 def get_class_section(section_id: int) -> Optional[ClassSection]:
@@ -45,47 +63,74 @@ def get_class_section(section_id: int) -> Optional[ClassSection]:
         SELECT id, course_id, section_name, max_students, semester, is_active
         FROM class_sections WHERE id=%s
     """
-    conn = get_connection()
-    try:
+    with connection() as conn:
         with conn.cursor() as cur:
-            cur.execute(sql, (section_id,))
+            execute(cur, sql, (section_id,))
             row = cur.fetchone()
             return ClassSection(*row) if row else None
-    finally:
-        conn.close()
 
 
 def update_class_section(section_id: int, **fields) -> ClassSection:
-    if not fields:
-        raise ValueError("No fields to update")
-    cols = []
-    vals = []
-    for k, v in fields.items():
-        cols.append(f"{k}=%s")
-        vals.append(v)
-    vals.append(section_id)
-    sql = f"""
-        UPDATE class_sections SET {', '.join(cols)} WHERE id=%s
-        RETURNING id, course_id, section_name, max_students, semester, is_active
-    """
-    conn = get_connection()
-    try:
+    sql = update_statement("class_sections", fields, _COLUMNS, ("id",) + _COLUMNS)
+    with connection() as conn:
         with conn:
             with conn.cursor() as cur:
-                cur.execute(sql, tuple(vals))
+                execute(cur, sql, (*fields.values(), section_id))
                 row = cur.fetchone()
                 return ClassSection(*row)
-    finally:
-        conn.close()
 
 
 def delete_class_section(section_id: int) -> bool:
     sql = "DELETE FROM class_sections WHERE id=%s"
-    conn = get_connection()
-    try:
+    with connection() as conn:
         with conn:
             with conn.cursor() as cur:
-                cur.execute(sql, (section_id,))
+                execute(cur, sql, (section_id,))
                 return cur.rowcount > 0
-    finally:
-        conn.close()
+
+
+def create_class_sections(
+    class_sections: Iterable[ClassSection], page_size: int = BATCH_PAGE_SIZE
+) -> List[ClassSection]:
+    """
+    Insert many class sections in multi-row pages. The ``id`` of the inputs is
+    ignored; the created rows are returned in input order.
+    """
+    rows = insert_many(
+        "class_sections",
+        _COLUMNS,
+        ([getattr(item, c) for c in _COLUMNS] for item in class_sections),
+        ("id",) + _COLUMNS,
+        page_size,
+    )
+    return [ClassSection(*row) for row in rows]
+
+
+def update_class_sections(ids: Iterable[int], **fields) -> List[ClassSection]:
+    """Apply the same ``fields`` to every id in one statement; returns rows by id."""
+    rows = update_many("class_sections", ids, fields, ("id",) + _COLUMNS, _COLUMNS)
+    return [ClassSection(*row) for row in rows]
+
+
+def delete_class_sections(ids: Iterable[int]) -> int:
+    """Delete every id in one statement and return the number of rows deleted."""
+    return delete_many("class_sections", ids)
+
+
+def iter_class_sections(
+    itersize: int = STREAM_ITERSIZE, **filters
+) -> Iterator[ClassSection]:
+    """
+    Stream class sections in id order through a server-side cursor.
+    ``filters`` are equality (or, given a list, membership) tests on columns.
+    """
+    for row in stream_rows("class_sections", ("id",) + _COLUMNS, itersize, **filters):
+        yield ClassSection(*row)
+
+
+def class_sections_page(
+    after_id: Optional[int] = None, limit: int = PAGE_SIZE, **filters
+) -> List[ClassSection]:
+    """Up to ``limit`` rows after ``after_id`` in id order (keyset pagination)."""
+    rows = keyset_page("class_sections", ("id",) + _COLUMNS, after_id, limit, **filters)
+    return [ClassSection(*row) for row in rows]
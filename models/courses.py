@@ -1,7 +1,17 @@
 from dataclasses import dataclass
-from typing import Optional, Dict, Any
+from typing import Any, Dict, Iterable, Iterator, List, Optional
 
-from db import get_connection
+import cache
+from db import (
+    PAGE_SIZE,
+    STREAM_ITERSIZE,
+    connection,
+    execute,
+    keyset_page,
+    stream_rows,
+    update_statement,
+)
+from models.batch import BATCH_PAGE_SIZE, delete_many, insert_many, update_many
 
 
 @dataclass
@@ -20,6 +30,25 @@ class Course:
     notes: Optional[str] = None
 
 
+_cache = cache.register("courses")
+
+# Writable columns, in dataclass field order after ``id``. Updates accept
+# only these names.
+_COLUMNS = (
+    "code",
+    "name",
+    "department",
+    "periods_per_week",
+    "is_mandatory",
+    "is_elective",
+    "requires_consecutive_periods",
+    "preferred_facility_type",
+    "requires_specific_facility",
+    "grade_levels",
+    "notes",
+)
+
+
 def create_course(
     code: str,
     name: str,
@@ -44,11 +73,11 @@ def create_course(
                   preferred_facility_type, requires_specific_facility,
                   grade_levels, notes;
     """
-    conn = get_connection()
-    try:
+    with connection() as conn:
         with conn:
             with conn.cursor() as cur:
-                cur.execute(
+                execute(
+                    cur,
                     sql,
                     (
                         code,
@@ -66,11 +95,14 @@ def create_course(
                 )
                 row = cur.fetchone()
                 return Course(*row)
-    finally:
-        conn.close()
 
 
 def get_course(course_id: int) -> Optional[Course]:
+    """Read through the courses cache; the result is shared, do not mutate it."""
+    return _cache.get(course_id, _fetch_course)
+
+
+def _fetch_course(course_id: int) -> Optional[Course]:
     sql = """
         SELECT id, code, name, department, periods_per_week,
                is_mandatory, is_elective, requires_consecutive_periods,
@@ -78,50 +110,80 @@ def get_course(course_id: int) -> Optional[Course]:
                grade_levels, notes
         FROM courses WHERE id=%s
     """
-    conn = get_connection()
-    try:
+    with connection() as conn:
         with conn.cursor() as cur:
-            cur.execute(sql, (course_id,))
+            execute(cur, sql, (course_id,))
             row = cur.fetchone()
             return Course(*row) if row else None
-    finally:
-        conn.close()
 
 
 def update_course(course_id: int, **fields) -> Course:
-    if not fields:
-        raise ValueError("No fields to update")
-    cols = []
-    vals = []
-    for k, v in fields.items():
-        cols.append(f"{k}=%s")
-        vals.append(v)
-    vals.append(course_id)
-    sql = f"""
-        UPDATE courses SET {', '.join(cols)} WHERE id=%s
-        RETURNING id, code, name, department, periods_per_week,
-                  is_mandatory, is_elective, requires_consecutive_periods,
-                  preferred_facility_type, requires_specific_facility,
-                  grade_levels, notes
-    """
-    conn = get_connection()
-    try:
+    sql = update_statement("courses", fields, _COLUMNS, ("id",) + _COLUMNS)
+    with connection() as conn:
         with conn:
             with conn.cursor() as cur:
-                cur.execute(sql, tuple(vals))
+                execute(cur, sql, (*fields.values(), course_id))
                 row = cur.fetchone()
-                return Course(*row)
-    finally:
-        conn.close()
+    cache.invalidate("courses", [course_id])
+    return Course(*row)
 
 
 def delete_course(course_id: int) -> bool:
     sql = "DELETE FROM courses WHERE id=%s"
-    conn = get_connection()
-    try:
+    with connection() as conn:
         with conn:
             with conn.cursor() as cur:
-                cur.execute(sql, (course_id,))
-                return cur.rowcount > 0
-    finally:
-        conn.close()
+                execute(cur, sql, (course_id,))
+                deleted = cur.rowcount > 0
+    cache.invalidate("courses", [course_id])
+    return deleted
+
+
+def create_courses(
+    courses: Iterable[Course], page_size: int = BATCH_PAGE_SIZE
+) -> List[Course]:
+    """
+    Insert many courses in multi-row pages. The ``id`` of the inputs is
+    ignored; the created rows are returned in input order.
+    """
+    rows = insert_many(
+        "courses",
+        _COLUMNS,
+        ([getattr(item, c) for c in _COLUMNS] for item in courses),
+        ("id",) + _COLUMNS,
+        page_size,
+    )
+    return [Course(*row) for row in rows]
+
+
+def update_courses(ids: Iterable[int], **fields) -> List[Course]:
+    """Apply the same ``fields`` to every id in one statement; returns rows by id."""
+    ids = list(ids)
+    rows = update_many("courses", ids, fields, ("id",) + _COLUMNS, _COLUMNS)
+    cache.invalidate("courses", ids)
+    return [Course(*row) for row in rows]
+
+
+def delete_courses(ids: Iterable[int]) -> int:
+    """Delete every id in one statement and return the number of rows deleted."""
+    ids = list(ids)
+    deleted = delete_many("courses", ids)
+    cache.invalidate("courses", ids)
+    return deleted
+
+
+def iter_courses(itersize: int = STREAM_ITERSIZE, **filters) -> Iterator[Course]:
+    """
+    Stream courses in id order through a server-side cursor.
+    ``filters`` are equality (or, given a list, membership) tests on columns.
+    """
+    for row in stream_rows("courses", ("id",) + _COLUMNS, itersize, **filters):
+        yield Course(*row)
+
+
+def courses_page(
+    after_id: Optional[int] = None, limit: int = PAGE_SIZE, **filters
+) -> List[Course]:
+    """Up to ``limit`` rows after ``after_id`` in id order (keyset pagination)."""
+    rows = keyset_page("courses", ("id",) + _COLUMNS, after_id, limit, **filters)
+    return [Course(*row) for row in rows]
@@ -1,7 +1,17 @@
 from dataclasses import dataclass
-from typing import Optional
+from typing import Iterable, Iterator, List, Optional
 
-from db import get_connection
+import cache
+from db import (
+    PAGE_SIZE,
+    STREAM_ITERSIZE,
+    connection,
+    execute,
+    keyset_page,
+    stream_rows,
+    update_statement,
+)
+from models.batch import BATCH_PAGE_SIZE, delete_many, insert_many, update_many
 
 
 @dataclass
@@ -15,6 +25,20 @@ class Facility:
     notes: Optional[str] = None
 
 
+_cache = cache.register("facilities")
+
+# Writable columns, in dataclass field order after ``id``. Updates accept
+# only these names.
+_COLUMNS = (
+    "name",
+    "facility_type",
+    "capacity",
+    "can_split",
+    "split_capacity",
+    "notes",
+)
+
+
 def create_facility(
     name: str,
     facility_type: Optional[str] = None,
@@ -28,66 +52,102 @@ def create_facility(
         VALUES (%s,%s,%s,%s,%s,%s)
         RETURNING id, name, facility_type, capacity, can_split, split_capacity, notes;
     """
-    conn = get_connection()
-    try:
+    with connection() as conn:
         with conn:
             with conn.cursor() as cur:
-                cur.execute(
+                execute(
+                    cur,
                     sql,
                     (name, facility_type, capacity, can_split, split_capacity, notes),
                 )
                 row = cur.fetchone()
                 return Facility(*row)
-    finally:
-        conn.close()
 
 
 def get_facility(facility_id: int) -> Optional[Facility]:
+    """Read through the facilities cache; the result is shared, do not mutate it."""
+    return _cache.get(facility_id, _fetch_facility)
+
+
+def _fetch_facility(facility_id: int) -> Optional[Facility]:
     sql = """
         SELECT id, name, facility_type, capacity, can_split, split_capacity, notes
         FROM facilities WHERE id=%s
     """
-    conn = get_connection()
-    try:
+    with connection() as conn:
         with conn.cursor() as cur:
-            cur.execute(sql, (facility_id,))
+            execute(cur, sql, (facility_id,))
             row = cur.fetchone()
             return Facility(*row) if row else None
-    finally:
-        conn.close()
 
 
 def update_facility(facility_id: int, **fields) -> Facility:
-    if not fields:
-        raise ValueError("No fields to update")
-    cols = []
-    vals = []
-    for k, v in fields.items():
-        cols.append(f"{k}=%s")
-        vals.append(v)
-    vals.append(facility_id)
-    sql = f"""
-        UPDATE facilities SET {', '.join(cols)} WHERE id=%s
-        RETURNING id, name, facility_type, capacity, can_split, split_capacity, notes
-    """
-    conn = get_connection()
-    try:
+    sql = update_statement("facilities", fields, _COLUMNS, ("id",) + _COLUMNS)
+    with connection() as conn:
         with conn:
             with conn.cursor() as cur:
-                cur.execute(sql, tuple(vals))
+                execute(cur, sql, (*fields.values(), facility_id))
                 row = cur.fetchone()
-                return Facility(*row)
-    finally:
-        conn.close()
+    cache.invalidate("facilities", [facility_id])
+    return Facility(*row)
 
 
 def delete_facility(facility_id: int) -> bool:
     sql = "DELETE FROM facilities WHERE id=%s"
-    conn = get_connection()
-    try:
+    with connection() as conn:
         with conn:
             with conn.cursor() as cur:
-                cur.execute(sql, (facility_id,))
-                return cur.rowcount > 0
-    finally:
-        conn.close()
+                execute(cur, sql, (facility_id,))
+                deleted = cur.rowcount > 0
+    cache.invalidate("facilities", [facility_id])
+    return deleted
+
+
+def create_facilities(
+    facilities: Iterable[Facility], page_size: int = BATCH_PAGE_SIZE
+) -> List[Facility]:
+    """
+    Insert many facilities in multi-row pages. The ``id`` of the inputs is
+    ignored; the created rows are returned in input order.
+    """
+    rows = insert_many(
+        "facilities",
+        _COLUMNS,
+        ([getattr(item, c) for c in _COLUMNS] for item in facilities),
+        ("id",) + _COLUMNS,
+        page_size,
+    )
+    return [Facility(*row) for row in rows]
+
+
+def update_facilities(ids: Iterable[int], **fields) -> List[Facility]:
+    """Apply the same ``fields`` to every id in one statement; returns rows by id."""
+    ids = list(ids)
+    rows = update_many("facilities", ids, fields, ("id",) + _COLUMNS, _COLUMNS)
+    cache.invalidate("facilities", ids)
+    return [Facility(*row) for row in rows]
+
+
+def delete_facilities(ids: Iterable[int]) -> int:
+    """Delete every id in one statement and return the number of rows deleted."""
+    ids = list(ids)
+    deleted = delete_many("facilities", ids)
+    cache.invalidate("facilities", ids)
+    return deleted
+
+
+def iter_facilities(itersize: int = STREAM_ITERSIZE, **filters) -> Iterator[Facility]:
+    """
+    Stream facilities in id order through a server-side cursor.
+    ``filters`` are equality (or, given a list, membership) tests on columns.
+    """
+    for row in stream_rows("facilities", ("id",) + _COLUMNS, itersize, **filters):
+        yield Facility(*row)
+
+
+def facilities_page(
+    after_id: Optional[int] = None, limit: int = PAGE_SIZE, **filters
+) -> List[Facility]:
+    """Up to ``limit`` rows after ``after_id`` in id order (keyset pagination)."""
+    rows = keyset_page("facilities", ("id",) + _COLUMNS, after_id, limit, **filters)
+    return [Facility(*row) for row in rows]
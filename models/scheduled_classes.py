@@ -0,0 +1,143 @@
+from dataclasses import dataclass, field
+from typing import Iterable, List, Optional, Tuple
+
+from psycopg2.extras import execute_values
+
+from db import connection
+from models.batch import BATCH_PAGE_SIZE
+
+
+@dataclass
+class ScheduledClass:
+    id: Optional[int]
+    class_section_id: Optional[int]
+    teacher_id: Optional[int]
+    facility_id: Optional[int]
+    time_period_id: Optional[int]
+    week_pattern: str = "all"
+    is_double_period: bool = False
+    linked_period_id: Optional[int] = None
+    semester: Optional[str] = None
+    notes: Optional[str] = None
+
+
+# Writable columns, in dataclass field order after ``id``.
+_COLUMNS = (
+    "class_section_id",
+    "teacher_id",
+    "facility_id",
+    "time_period_id",
+    "week_pattern",
+    "is_double_period",
+    "linked_period_id",
+    "semester",
+    "notes",
+)
+_TYPES = ("int", "int", "int", "int", "varchar", "bool", "int", "varchar", "text")
+
+
+@dataclass
+class Rejected:
+    """An input row refused by the clash constraints, with the rows it clashes with."""
+
+    index: int  # position in the input
+    item: ScheduledClass
+    teacher_clashes: Tuple[int, ...] = ()
+    facility_clashes: Tuple[int, ...] = ()
+
+
+@dataclass
+class CreateReport:
+    created: List[ScheduledClass] = field(default_factory=list)
+    rejected: List[Rejected] = field(default_factory=list)
+
+
+# Ids are drawn before inserting so that the rows skipped by ON CONFLICT can
+# be matched back to their input position.
+_INSERT_SQL = f"""
+    WITH input AS (
+        SELECT nextval(pg_get_serial_sequence('scheduled_classes', 'id')) AS id, v.*
+        FROM (VALUES %s) AS v (ord, {', '.join(_COLUMNS)})
+    ),
+    inserted AS (
+        INSERT INTO scheduled_classes (id, {', '.join(_COLUMNS)})
+        SELECT id, {', '.join(_COLUMNS)} FROM input ORDER BY ord
+        ON CONFLICT DO NOTHING
+        RETURNING id, {', '.join(_COLUMNS)}
+    )
+    SELECT input.ord, inserted.* FROM input LEFT JOIN inserted USING (id)
+"""
+_INSERT_TEMPLATE = "(%s, " + ", ".join(f"%s::{t}" for t in _TYPES) + ")"
+
+_CLASHES_SQL = """
+    SELECT v.ord, sc.id, sc.teacher_id = v.teacher_id, sc.facility_id = v.facility_id
+    FROM (VALUES %s) AS v (ord, teacher_id, facility_id, time_period_id, semester,
+                           week_pattern)
+    JOIN scheduled_classes sc
+      ON sc.time_period_id = v.time_period_id AND sc.semester = v.semester
+     AND (sc.teacher_id = v.teacher_id OR sc.facility_id = v.facility_id)
+     AND sc.weeks && week_pattern_weeks(v.week_pattern)
+    ORDER BY v.ord, sc.id
+"""
+_CLASHES_TEMPLATE = "(%s, %s::int, %s::int, %s::int, %s::varchar, %s::varchar)"
+
+
+def create_scheduled_classes(
+    items: Iterable[ScheduledClass], page_size: int = BATCH_PAGE_SIZE
+) -> CreateReport:
+    """
+    Insert many meetings in one transaction, skipping instead of failing on
+    those that would double-book a teacher or facility (against existing
+    rows or earlier rows of ``items``). The skipped rows are returned with
+    the ids of the rows they clash with. Other errors, such as a malformed
+    ``week_pattern`` or a missing foreign key, still abort the whole batch.
+    """
+    items = list(items)
+    if not items:
+        return CreateReport()
+    rows = [(i, *(getattr(item, c) for c in _COLUMNS)) for i, item in enumerate(items)]
+    report = CreateReport()
+    with connection() as conn:
+        with conn:
+            with conn.cursor() as cur:
+                results = execute_values(
+                    cur,
+                    _INSERT_SQL,
+                    rows,
+                    template=_INSERT_TEMPLATE,
+                    page_size=page_size,
+                    fetch=True,
+                )
+                skipped = {}
+                for ord_, *created in sorted(results):
+                    if created[0] is None:
+                        skipped[ord_] = Rejected(ord_, items[ord_])
+                    else:
+                        report.created.append(ScheduledClass(*created))
+                if skipped:
+                    clashes = execute_values(
+                        cur,
+                        _CLASHES_SQL,
+                        [
+                            (
+                                i,
+                                r.item.teacher_id,
+                                r.item.facility_id,
+                                r.item.time_period_id,
+                                r.item.semester,
+                                r.item.week_pattern,
+                            )
+                            for i, r in skipped.items()
+                        ],
+                        template=_CLASHES_TEMPLATE,
+                        page_size=page_size,
+                        fetch=True,
+                    )
+                    for ord_, other, teacher, facility in clashes:
+                        rejected = skipped[ord_]
+                        if teacher:
+                            rejected.teacher_clashes += (other,)
+                        if facility:
+                            rejected.facility_clashes += (other,)
+                report.rejected = list(skipped.values())
+    return report
@@ -1,7 +1,17 @@
 from dataclasses import dataclass
-from typing import Optional, Dict, Any
+from typing import Any, Dict, Iterable, Iterator, List, Optional
 
-from db import get_connection
+import cache
+from db import (
+    PAGE_SIZE,
+    STREAM_ITERSIZE,
+    connection,
+    execute,
+    keyset_page,
+    stream_rows,
+    update_statement,
+)
+from models.batch import BATCH_PAGE_SIZE, delete_many, insert_many, update_many
 
 
 @dataclass
@@ -18,6 +28,23 @@ class Teacher:
     notes: Optional[str] = None
 
 
+_cache = cache.register("teachers")
+
+# Writable columns, in dataclass field order after ``id``. Updates accept
+# only these names.
+_COLUMNS = (
+    "name",
+    "employee_id",
+    "max_periods_per_week",
+    "is_international",
+    "can_supervise_study_hours",
+    "departments",
+    "preferred_periods",
+    "unavailable_periods",
+    "notes",
+)
+
+
 def create_teacher(
     name: str,
     employee_id: Optional[str] = None,
@@ -38,11 +65,11 @@ def create_teacher(
                   can_supervise_study_hours, departments, preferred_periods,
                   unavailable_periods, notes;
     """
-    conn = get_connection()
-    try:
+    with connection() as conn:
         with conn:
             with conn.cursor() as cur:
-                cur.execute(
+                execute(
+                    cur,
                     sql,
                     (
                         name,
@@ -58,60 +85,94 @@ def create_teacher(
                 )
                 row = cur.fetchone()
                 return Teacher(*row)
-    finally:
-        conn.close()
 
 
 def get_teacher(teacher_id: int) -> Optional[Teacher]:
+    """Read through the teachers cache; the result is shared, do not mutate it."""
+    return _cache.get(teacher_id, _fetch_teacher)
+
+
+def _fetch_teacher(teacher_id: int) -> Optional[Teacher]:
     sql = """
         SELECT id, name, employee_id, max_periods_per_week, is_international,
                can_supervise_study_hours, departments, preferred_periods,
                unavailable_periods, notes
         FROM teachers WHERE id=%s
     """
-    conn = get_connection()
-    try:
+    with connection() as conn:
         with conn.cursor() as cur:
-            cur.execute(sql, (teacher_id,))
+            execute(cur, sql, (teacher_id,))
             row = cur.fetchone()
             return Teacher(*row) if row else None
-    finally:
-        conn.close()
 
 
 def update_teacher(teacher_id: int, **fields) -> Teacher:
-    if not fields:
-        raise ValueError("No fields to update")
-    columns = []
-    values = []
-    for key, value in fields.items():
-        columns.append(f"{key}=%s")
-        values.append(value)
-    values.append(teacher_id)
-    sql = f"""
-        UPDATE teachers SET {', '.join(columns)} WHERE id=%s
-        RETURNING id, name, employee_id, max_periods_per_week, is_international,
-                  can_supervise_study_hours, departments, preferred_periods,
-                  unavailable_periods, notes
-    """
-    conn = get_connection()
-    try:
+    sql = update_statement("teachers", fields, _COLUMNS, ("id",) + _COLUMNS)
+    with connection() as conn:
         with conn:
             with conn.cursor() as cur:
-                cur.execute(sql, tuple(values))
+                execute(cur, sql, (*fields.values(), teacher_id))
                 row = cur.fetchone()
-                return Teacher(*row)
-    finally:
-        conn.close()
+    cache.invalidate("teachers", [teacher_id])
+    return Teacher(*row)
 
 
 def delete_teacher(teacher_id: int) -> bool:
     sql = "DELETE FROM teachers WHERE id=%s"
-    conn = get_connection()
-    try:
+    with connection() as conn:
         with conn:
             with conn.cursor() as cur:
-                cur.execute(sql, (teacher_id,))
-                return cur.rowcount > 0
-    finally:
-        conn.close()
+                execute(cur, sql, (teacher_id,))
+                deleted = cur.rowcount > 0
+    cache.invalidate("teachers", [teacher_id])
+    return deleted
+
+
+def create_teachers(
+    teachers: Iterable[Teacher], page_size: int = BATCH_PAGE_SIZE
+) -> List[Teacher]:
+    """
+    Insert many teachers in multi-row pages. The ``id`` of the inputs is
+    ignored; the created rows are returned in input order.
+    """
+    rows = insert_many(
+        "teachers",
+        _COLUMNS,
+        ([getattr(item, c) for c in _COLUMNS] for item in teachers),
+        ("id",) + _COLUMNS,
+        page_size,
+    )
+    return [Teacher(*row) for row in rows]
+
+
+def update_teachers(ids: Iterable[int], **fields) -> List[Teacher]:
+    """Apply the same ``fields`` to every id in one statement; returns rows by id."""
+    ids = list(ids)
+    rows = update_many("teachers", ids, fields, ("id",) + _COLUMNS, _COLUMNS)
+    cache.invalidate("teachers", ids)
+    return [Teacher(*row) for row in rows]
+
+
+def delete_teachers(ids: Iterable[int]) -> int:
+    """Delete every id in one statement and return the number of rows deleted."""
+    ids = list(ids)
+    deleted = delete_many("teachers", ids)
+    cache.invalidate("teachers", ids)
+    return deleted
+
+
+def iter_teachers(itersize: int = STREAM_ITERSIZE, **filters) -> Iterator[Teacher]:
+    """
+    Stream teachers in id order through a server-side cursor.
+    ``filters`` are equality (or, given a list, membership) tests on columns.
+    """
+    for row in stream_rows("teachers", ("id",) + _COLUMNS, itersize, **filters):
+        yield Teacher(*row)
+
+
+def teachers_page(
+    after_id: Optional[int] = None, limit: int = PAGE_SIZE, **filters
+) -> List[Teacher]:
+    """Up to ``limit`` rows after ``after_id`` in id order (keyset pagination)."""
+    rows = keyset_page("teachers", ("id",) + _COLUMNS, after_id, limit, **filters)
+    return [Teacher(*row) for row in rows]
@@ -1,8 +1,18 @@
 from dataclasses import dataclass
 from datetime import time
-from typing import Optional
+from typing import Iterable, Iterator, List, Optional
 
-from db import get_connection
+import cache
+from db import (
+    PAGE_SIZE,
+    STREAM_ITERSIZE,
+    connection,
+    execute,
+    keyset_page,
+    stream_rows,
+    update_statement,
+)
+from models.batch import BATCH_PAGE_SIZE, delete_many, insert_many, update_many
 
 
 @dataclass
@@ -17,6 +27,21 @@ class TimePeriod:
     special_notes: Optional[str] = None
 
 
+_cache = cache.register("time_periods")
+
+# Writable columns, in dataclass field order after ``id``. Updates accept
+# only these names.
+_COLUMNS = (
+    "period_number",
+    "day_of_week",
+    "period_type",
+    "start_time",
+    "end_time",
+    "is_active",
+    "special_notes",
+)
+
+
 def create_time_period(
     period_number: int,
     day_of_week: Optional[int] = None,
@@ -33,11 +58,11 @@ def create_time_period(
         RETURNING id, period_number, day_of_week, period_type,
                   start_time, end_time, is_active, special_notes;
     """
-    conn = get_connection()
-    try:
+    with connection() as conn:
         with conn:
             with conn.cursor() as cur:
-                cur.execute(
+                execute(
+                    cur,
                     sql,
                     (
                         period_number,
@@ -51,58 +76,95 @@ def create_time_period(
                 )
                 row = cur.fetchone()
                 return TimePeriod(*row)
-    finally:
-        conn.close()
 
 
 def get_time_period(tp_id: int) -> Optional[TimePeriod]:
+    """Read through the time_periods cache; the result is shared, do not mutate it."""
+    return _cache.get(tp_id, _fetch_time_period)
+
+
+def _fetch_time_period(tp_id: int) -> Optional[TimePeriod]:
     sql = """
         SELECT id, period_number, day_of_week, period_type,
                start_time, end_time, is_active, special_notes
         FROM time_periods WHERE id=%s
     """
-    conn = get_connection()
-    try:
+    with connection() as conn:
         with conn.cursor() as cur:
-            cur.execute(sql, (tp_id,))
+            execute(cur, sql, (tp_id,))
             row = cur.fetchone()
             return TimePeriod(*row) if row else None
-    finally:
-        conn.close()
 
 
 def update_time_period(tp_id: int, **fields) -> TimePeriod:
-    if not fields:
-        raise ValueError("No fields to update")
-    cols = []
-    vals = []
-    for k, v in fields.items():
-        cols.append(f"{k}=%s")
-        vals.append(v)
-    vals.append(tp_id)
-    sql = f"""
-        UPDATE time_periods SET {', '.join(cols)} WHERE id=%s
-        RETURNING id, period_number, day_of_week, period_type,
-                  start_time, end_time, is_active, special_notes
-    """
-    conn = get_connection()
-    try:
+    sql = update_statement("time_periods", fields, _COLUMNS, ("id",) + _COLUMNS)
+    with connection() as conn:
         with conn:
             with conn.cursor() as cur:
-                cur.execute(sql, tuple(vals))
+                execute(cur, sql, (*fields.values(), tp_id))
                 row = cur.fetchone()
-                return TimePeriod(*row)
-    finally:
-        conn.close()
+    cache.invalidate("time_periods", [tp_id])
+    return TimePeriod(*row)
 
 
 def delete_time_period(tp_id: int) -> bool:
     sql = "DELETE FROM time_periods WHERE id=%s"
-    conn = get_connection()
-    try:
+    with connection() as conn:
         with conn:
             with conn.cursor() as cur:
-                cur.execute(sql, (tp_id,))
-                return cur.rowcount > 0
-    finally:
-        conn.close()
+                execute(cur, sql, (tp_id,))
+                deleted = cur.rowcount > 0
+    cache.invalidate("time_periods", [tp_id])
+    return deleted
+
+
+def create_time_periods(
+    time_periods: Iterable[TimePeriod], page_size: int = BATCH_PAGE_SIZE
+) -> List[TimePeriod]:
+    """
+    Insert many time periods in multi-row pages. The ``id`` of the inputs is
+    ignored; the created rows are returned in input order.
+    """
+    rows = insert_many(
+        "time_periods",
+        _COLUMNS,
+        ([getattr(item, c) for c in _COLUMNS] for item in time_periods),
+        ("id",) + _COLUMNS,
+        page_size,
+    )
+    return [TimePeriod(*row) for row in rows]
+
+
+def update_time_periods(ids: Iterable[int], **fields) -> List[TimePeriod]:
+    """Apply the same ``fields`` to every id in one statement; returns rows by id."""
+    ids = list(ids)
+    rows = update_many("time_periods", ids, fields, ("id",) + _COLUMNS, _COLUMNS)
+    cache.invalidate("time_periods", ids)
+    return [TimePeriod(*row) for row in rows]
+
+
+def delete_time_periods(ids: Iterable[int]) -> int:
+    """Delete every id in one statement and return the number of rows deleted."""
+    ids = list(ids)
+    deleted = delete_many("time_periods", ids)
+    cache.invalidate("time_periods", ids)
+    return deleted
+
+
+def iter_time_periods(
+    itersize: int = STREAM_ITERSIZE, **filters
+) -> Iterator[TimePeriod]:
+    """
+    Stream time periods in id order through a server-side cursor.
+    ``filters`` are equality (or, given a list, membership) tests on columns.
+    """
+    for row in stream_rows("time_periods", ("id",) + _COLUMNS, itersize, **filters):
+        yield TimePeriod(*row)
+
+
+def time_periods_page(
+    after_id: Optional[int] = None, limit: int = PAGE_SIZE, **filters
+) -> List[TimePeriod]:
+    """Up to ``limit`` rows after ``after_id`` in id order (keyset pagination)."""
+    rows = keyset_page("time_periods", ("id",) + _COLUMNS, after_id, limit, **filters)
+    return [TimePeriod(*row) for row in rows]
@@ -0,0 +1,17 @@
+from solver.data import Problem, Section, load_problem, load_problem_from_config
+from solver.engine import Assignment, SolveResult, schedule, solve, write_schedule
+from solver.model import TimetableModel, build_model
+
+__all__ = [
+    "Assignment",
+    "Problem",
+    "Section",
+    "SolveResult",
+    "TimetableModel",
+    "build_model",
+    "load_problem",
+    "load_problem_from_config",
+    "schedule",
+    "solve",
+    "write_schedule",
+]
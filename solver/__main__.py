@@ -0,0 +1,82 @@
+"""
+Build and solve the timetable for a semester.
+
+Usage: python -m solver [--semester S] [--config config.yaml] [--time-limit N]
+                        [--workers N] [--seed N] [--dry-run] [--log]
+                        [--trace-json PATH] [--metrics PATH]
+                        [--teacher ID ...] [--course ID ...] [--section ID ...]
+
+Passing --teacher, --course or --section re-solves only the neighbourhood of
+those rows, starting from the current timetable; such runs are not traced.
+"""
+
+import argparse
+
+from solver.engine import DEFAULT_TIME_LIMIT, DEFAULT_WORKERS, schedule
+from solver.incremental import resolve
+from solver.trace import Trace
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m solver")
+    parser.add_argument("--semester")
+    parser.add_argument("--config", help="read the problem from a config.yaml file")
+    parser.add_argument("--time-limit", type=float, default=DEFAULT_TIME_LIMIT)
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--dry-run", action="store_true", help="do not write the result"
+    )
+    parser.add_argument("--log", action="store_true", help="print the solver log")
+    parser.add_argument("--trace-json", help="write stage timings and progress here")
+    parser.add_argument("--metrics", help="write Prometheus metrics to this file")
+    parser.add_argument("--teacher", type=int, action="append", default=[])
+    parser.add_argument("--course", type=int, action="append", default=[])
+    parser.add_argument("--section", type=int, action="append", default=[])
+    args = parser.parse_args(argv)
+
+    if args.teacher or args.course or args.section:
+        if args.trace_json or args.metrics:
+            parser.error(
+                "--trace-json and --metrics trace a full solve;"
+                " they cannot be combined with --teacher, --course or --section"
+            )
+        outcome = resolve(
+            args.semester,
+            teacher_ids=args.teacher,
+            course_ids=args.course,
+            section_ids=args.section,
+            time_limit=args.time_limit,
+            workers=args.workers,
+            write=not args.dry_run,
+        )
+        result = outcome.result
+        print(f"status: {result.status} in {result.wall_time:.2f}s")
+        print(f"sections re-optimised: {len(outcome.affected)}")
+        print(f"meetings added: {len(outcome.added)}, removed: {len(outcome.removed)}")
+        return 0 if result.feasible else 1
+
+    trace = None
+    if args.trace_json or args.metrics:
+        trace = Trace(args.semester, args.trace_json, args.metrics)
+    result = schedule(
+        args.semester,
+        config=args.config,
+        time_limit=args.time_limit,
+        workers=args.workers,
+        seed=args.seed,
+        write=not args.dry_run,
+        log=args.log,
+        trace=trace,
+    )
+    print(f"status: {result.status} in {result.wall_time:.2f}s")
+    if result.feasible:
+        print(f"objective: {result.objective} (bound {result.bound})")
+        print(f"scheduled meetings: {len(result.assignments)}")
+    for issue in result.diagnostics:
+        print(f"  - {issue}")
+    return 0 if result.feasible else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,396 @@
+"""Problem data for the timetable solver, read from the database or config.yaml."""
+
+from collections import defaultdict
+from dataclasses import dataclass, field
+from datetime import time
+from typing import Any, Dict, FrozenSet, Iterable, List, Optional, Set, Tuple
+
+import yaml
+
+from db import connection
+from load_config import build_rows
+from models.courses import Course
+from models.facilities import Facility
+from models.teachers import Teacher
+from models.time_periods import TimePeriod
+
+TEACHABLE_PERIOD_TYPES = ("regular",)
+
+# Regular periods of the school day: 40 minutes with 10-minute breaks, lunch
+# from 11:40 to 13:30 and electives in the last two periods (16:10-17:40).
+DEFAULT_PERIOD_TIMES = (
+    (time(8, 0), time(8, 40)),
+    (time(8, 50), time(9, 30)),
+    (time(9, 40), time(10, 20)),
+    (time(10, 30), time(11, 10)),
+    (time(13, 30), time(14, 10)),
+    (time(14, 20), time(15, 0)),
+    (time(15, 10), time(15, 50)),
+    (time(16, 10), time(16, 50)),
+    (time(17, 0), time(17, 40)),
+)
+
+COURSE_SQL = """
+    SELECT id, code, name, department, periods_per_week,
+           is_mandatory, is_elective, requires_consecutive_periods,
+           preferred_facility_type, requires_specific_facility,
+           grade_levels, notes
+    FROM courses ORDER BY id
+"""
+TEACHER_SQL = """
+    SELECT id, name, employee_id, max_periods_per_week, is_international,
+           can_supervise_study_hours, departments, preferred_periods,
+           unavailable_periods, notes
+    FROM teachers ORDER BY id
+"""
+TIME_PERIOD_SQL = """
+    SELECT id, period_number, day_of_week, period_type,
+           start_time, end_time, is_active, special_notes
+    FROM time_periods
+    WHERE is_active AND period_type = ANY(%s)
+    ORDER BY day_of_week, period_number
+"""
+# Active periods nobody is taught in (lunch, ceremonies, ...), which break
+# up double periods.
+BREAK_PERIOD_SQL = """
+    SELECT id, period_number, day_of_week, period_type,
+           start_time, end_time, is_active, special_notes
+    FROM time_periods
+    WHERE is_active AND NOT (period_type = ANY(%s))
+    ORDER BY day_of_week, period_number
+"""
+FACILITY_SQL = """
+    SELECT id, name, facility_type, capacity, can_split, split_capacity, notes
+    FROM facilities ORDER BY id
+"""
+CONSTRAINT_SQL = """
+    SELECT id, constraint_type, constraint_value
+    FROM scheduling_constraints WHERE is_active ORDER BY id
+"""
+
+
+@dataclass
+class Constraint:
+    """An active ``scheduling_constraints`` row (see ``solver.objectives``)."""
+
+    id: Optional[int]
+    constraint_type: str
+    constraint_value: Dict[str, Any] = field(default_factory=dict)
+
+
+@dataclass
+class Section:
+    """A class section to place on the timetable."""
+
+    id: Optional[int]
+    course_id: int
+    name: str
+    periods: int
+    teacher_ids: Tuple[int, ...]
+    student_ids: FrozenSet[int] = frozenset()
+
+    @property
+    def size(self) -> int:
+        return len(self.student_ids)
+
+
+@dataclass
+class Problem:
+    """
+    Everything the solver needs for one semester.
+
+    ``periods`` holds only teachable periods, ordered by day and period
+    number. Periods and sections without an ``id`` are created in the
+    database when the schedule is written. ``constraints`` are the soft
+    constraints of the objective and ``homerooms`` maps homeroom ids to
+    their students. ``breaks`` are the non-teachable periods that separate
+    double periods (see ``solver.slots``).
+    """
+
+    semester: Optional[str]
+    courses: Dict[int, Course]
+    teachers: Dict[int, Teacher]
+    periods: List[TimePeriod]
+    facilities: List[Facility]
+    sections: List[Section]
+    constraints: List[Constraint] = field(default_factory=list)
+    homerooms: Dict[int, FrozenSet[int]] = field(default_factory=dict)
+    breaks: List[TimePeriod] = field(default_factory=list)
+    days: Dict[int, List[int]] = field(init=False, repr=False)
+
+    def __post_init__(self):
+        self.days = defaultdict(list)
+        for index, period in enumerate(self.periods):
+            self.days[period.day_of_week].append(index)
+        self.days = dict(self.days)
+
+    def edge_periods(self) -> Set[int]:
+        """Indexes of the first and last teachable period of every day."""
+        edges = set()
+        for indexes in self.days.values():
+            edges.add(indexes[0])
+            edges.add(indexes[-1])
+        return edges
+
+    def last_periods(self, count: int) -> Set[int]:
+        """Indexes of the last ``count`` teachable periods of every day."""
+        return {i for indexes in self.days.values() for i in indexes[-count:]}
+
+    def diagnose(self) -> List[str]:
+        """Return reasons the problem cannot be solved that are cheap to spot."""
+        issues = []
+        for section in self.sections:
+            label = f"{self.courses[section.course_id].name} {section.name}"
+            if not any(t in self.teachers for t in section.teacher_ids):
+                issues.append(f"{label}: no qualified teacher")
+            if section.periods > len(self.periods):
+                issues.append(
+                    f"{label}: needs {section.periods} periods,"
+                    f" only {len(self.periods)} exist"
+                )
+        load: Dict[int, int] = defaultdict(int)
+        for section in self.sections:
+            for student_id in section.student_ids:
+                load[student_id] += section.periods
+        overloaded = sorted(s for s, n in load.items() if n > len(self.periods))
+        if overloaded:
+            issues.append(
+                f"{len(overloaded)} students need more than {len(self.periods)}"
+                f" periods per week (e.g. student {overloaded[0]}:"
+                f" {load[overloaded[0]]})"
+            )
+        return issues
+
+
+def blocked_slots(periods: Optional[Dict[str, Any]]) -> Set[Tuple[int, int]]:
+    """
+    Parse a ``{"<day_of_week>": [period_number, ...]}`` JSONB value into a set
+    of ``(day_of_week, period_number)`` pairs.
+    """
+    if not periods:
+        return set()
+    return {
+        (int(day), int(number))
+        for day, numbers in periods.items()
+        for number in numbers
+    }
+
+
+def default_week() -> List[TimePeriod]:
+    """Regular periods for a week of 9 periods a day, ending one period early on Friday."""
+    periods = []
+    for day in range(1, 6):
+        count = len(DEFAULT_PERIOD_TIMES) - (1 if day == 5 else 0)
+        for number, (start, end) in enumerate(DEFAULT_PERIOD_TIMES[:count], start=1):
+            periods.append(TimePeriod(None, number, day, "regular", start, end))
+    return periods
+
+
+def section_periods(course: Course, grade: Optional[int]) -> int:
+    """Weekly periods for a section of ``course`` taken by students in ``grade``."""
+    grades = course.grade_levels
+    if isinstance(grades, dict) and grade is not None:
+        value = grades.get(str(grade))
+        if isinstance(value, int):
+            return value
+    return course.periods_per_week
+
+
+def _sections_by_grade(
+    courses: Dict[int, Course],
+    teacher_map: Dict[int, Tuple[int, ...]],
+    course_students: Iterable[Tuple[int, int]],
+    grades: Dict[int, int],
+) -> List[Section]:
+    """One section per (course, grade) for courses that have no sections yet."""
+    groups: Dict[Tuple[int, Optional[int]], Set[int]] = defaultdict(set)
+    for course_id, student_id in course_students:
+        groups[(course_id, grades.get(student_id))].add(student_id)
+    sections = []
+    for (course_id, grade), students in sorted(
+        groups.items(), key=lambda g: (g[0][0], g[0][1] or 0)
+    ):
+        course = courses[course_id]
+        sections.append(
+            Section(
+                None,
+                course_id,
+                f"G{grade}" if grade is not None else "A",
+                section_periods(course, grade),
+                teacher_map.get(course_id, ()),
+                frozenset(students),
+            )
+        )
+    return sections
+
+
+def load_problem(semester: Optional[str] = None) -> Problem:
+    """
+    Read the solver input for ``semester`` from the database.
+
+    Sections come from active ``class_sections`` rows. A section's students
+    are its existing enrollments or, when the course has a single section,
+    everyone taking the course in ``student_courses``. Courses with students
+    but no sections get one section per grade.
+    """
+    with connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute(COURSE_SQL)
+            courses = {row[0]: Course(*row) for row in cur.fetchall()}
+            cur.execute(TEACHER_SQL)
+            teachers = {row[0]: Teacher(*row) for row in cur.fetchall()}
+            cur.execute(TIME_PERIOD_SQL, (list(TEACHABLE_PERIOD_TYPES),))
+            periods = [TimePeriod(*row) for row in cur.fetchall()]
+            cur.execute(BREAK_PERIOD_SQL, (list(TEACHABLE_PERIOD_TYPES),))
+            breaks = [TimePeriod(*row) for row in cur.fetchall()]
+            cur.execute(FACILITY_SQL)
+            facilities = [Facility(*row) for row in cur.fetchall()]
+
+            cur.execute(
+                "SELECT course_id, teacher_id FROM teacher_courses ORDER BY teacher_id"
+            )
+            teacher_lists: Dict[int, List[int]] = defaultdict(list)
+            for course_id, teacher_id in cur.fetchall():
+                if teacher_id not in teacher_lists[course_id]:
+                    teacher_lists[course_id].append(teacher_id)
+            teacher_map = {c: tuple(ts) for c, ts in teacher_lists.items()}
+
+            cur.execute(
+                """
+                SELECT id, course_id, section_name FROM class_sections
+                WHERE is_active AND semester IS NOT DISTINCT FROM %s
+                ORDER BY id
+                """,
+                (semester,),
+            )
+            section_rows = cur.fetchall()
+            cur.execute(
+                """
+                SELECT DISTINCT sc.class_section_id, ce.student_id
+                FROM class_enrollments ce
+                JOIN scheduled_classes sc ON sc.id = ce.scheduled_class_id
+                WHERE sc.semester IS NOT DISTINCT FROM %s
+                """,
+                (semester,),
+            )
+            enrolled: Dict[int, Set[int]] = defaultdict(set)
+            for section_id, student_id in cur.fetchall():
+                enrolled[section_id].add(student_id)
+            cur.execute(
+                """
+                SELECT course_id, student_id FROM student_courses
+                WHERE semester IS NOT DISTINCT FROM %s AND enrollment_status = 'enrolled'
+                """,
+                (semester,),
+            )
+            course_students = cur.fetchall()
+            cur.execute("SELECT id, grade_level, homeroom_id FROM students")
+            student_rows = cur.fetchall()
+            cur.execute(CONSTRAINT_SQL)
+            constraints = [Constraint(*row) for row in cur.fetchall()]
+
+    grades = {student_id: grade for student_id, grade, _ in student_rows}
+    homerooms = _homerooms((student_id, h) for student_id, _, h in student_rows)
+
+    by_course: Dict[int, Set[int]] = defaultdict(set)
+    for course_id, student_id in course_students:
+        by_course[course_id].add(student_id)
+    section_count: Dict[int, int] = defaultdict(int)
+    for _, course_id, _ in section_rows:
+        section_count[course_id] += 1
+
+    sections = []
+    for section_id, course_id, name in section_rows:
+        students = enrolled.get(section_id)
+        if students is None and section_count[course_id] == 1:
+            students = by_course.get(course_id, set())
+        students = frozenset(students or ())
+        section_grades = {grades.get(s) for s in students}
+        grade = section_grades.pop() if len(section_grades) == 1 else None
+        sections.append(
+            Section(
+                section_id,
+                course_id,
+                name or "",
+                section_periods(courses[course_id], grade),
+                teacher_map.get(course_id, ()),
+                students,
+            )
+        )
+    sections.extend(
+        _sections_by_grade(
+            courses,
+            teacher_map,
+            [(c, s) for c, s in course_students if section_count[c] == 0],
+            grades,
+        )
+    )
+    return Problem(
+        semester,
+        courses,
+        teachers,
+        periods,
+        facilities,
+        sections,
+        constraints,
+        homerooms,
+        breaks,
+    )
+
+
+def _homerooms(
+    members: Iterable[Tuple[int, Optional[int]]],
+) -> Dict[int, FrozenSet[int]]:
+    """Group ``(student_id, homeroom_id)`` pairs by homeroom."""
+    homerooms: Dict[int, Set[int]] = defaultdict(set)
+    for student_id, homeroom_id in members:
+        if homeroom_id is not None:
+            homerooms[homeroom_id].add(student_id)
+    return {h: frozenset(students) for h, students in homerooms.items()}
+
+
+def problem_from_config(
+    config: Dict[str, Any],
+    semester: Optional[str] = None,
+    periods: Optional[List[TimePeriod]] = None,
+) -> Problem:
+    """Build the solver input from a parsed config.yaml mapping."""
+    rows = build_rows(config, semester)
+    teachers = {
+        tid: Teacher(tid, name, max_periods_per_week=limit, unavailable_periods=blocked)
+        for tid, name, limit, blocked in rows["teachers"]
+    }
+    courses = {
+        cid: Course(cid, code, name, periods_per_week=ppw, grade_levels=grade_levels)
+        for cid, code, name, ppw, grade_levels in rows["courses"]
+    }
+    teacher_lists: Dict[int, List[int]] = defaultdict(list)
+    for teacher_id, course_id in rows["teacher_courses"]:
+        teacher_lists[course_id].append(teacher_id)
+    grades = {row[0]: row[3] for row in rows["students"]}
+    sections = _sections_by_grade(
+        courses,
+        {c: tuple(ts) for c, ts in teacher_lists.items()},
+        [
+            (course_id, student_id)
+            for student_id, course_id, _ in rows["student_courses"]
+        ],
+        grades,
+    )
+    return Problem(
+        semester,
+        courses,
+        teachers,
+        periods if periods is not None else default_week(),
+        [],
+        sections,
+        homerooms=_homerooms((row[0], row[4]) for row in rows["students"]),
+    )
+
+
+def load_problem_from_config(
+    path: str = "config.yaml", semester: Optional[str] = None
+) -> Problem:
+    """Build the solver input from ``path`` using the default weekly grid."""
+    with open(path) as f:
+        return problem_from_config(yaml.safe_load(f), semester)
@@ -0,0 +1,346 @@
+"""Solve a timetable model and write the result to ``scheduled_classes``."""
+
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+from ortools.sat.python import cp_model
+from psycopg2.extras import execute_values
+
+from db import connection
+from solver.data import Problem, load_problem, load_problem_from_config
+from solver.feasibility import index_for
+from solver.model import TimetableModel, build_model
+from solver.slots import slots_for
+from solver.trace import Trace
+
+DEFAULT_TIME_LIMIT = 60.0
+DEFAULT_WORKERS = 8
+
+
+@dataclass
+class Assignment:
+    """One meeting of a section: indexes into ``problem.sections``/``periods``."""
+
+    section: int
+    period: int
+    teacher_id: int
+    facility_id: Optional[int] = None
+
+
+@dataclass
+class SolveResult:
+    status: str
+    objective: Optional[float]
+    bound: Optional[float]
+    wall_time: float
+    assignments: List[Assignment] = field(default_factory=list)
+    diagnostics: List[str] = field(default_factory=list)
+
+    @property
+    def feasible(self) -> bool:
+        return self.status in ("OPTIMAL", "FEASIBLE")
+
+
+def make_solver(
+    time_limit: float = DEFAULT_TIME_LIMIT,
+    workers: int = DEFAULT_WORKERS,
+    seed: int = 0,
+    log: bool = False,
+) -> cp_model.CpSolver:
+    """Return a CP-SAT solver configured for timetabling."""
+    solver = cp_model.CpSolver()
+    solver.parameters.max_time_in_seconds = time_limit
+    solver.parameters.num_workers = workers
+    solver.parameters.random_seed = seed
+    solver.parameters.log_search_progress = log
+    return solver
+
+
+def extract_assignments(
+    tm: TimetableModel, solver: cp_model.CpSolver
+) -> List[Assignment]:
+    """Read the chosen meetings (and facilities) out of a solved model."""
+    rooms: Dict[tuple, int] = {}
+    for (si, pi, f), var in tm.rooms.items():
+        if solver.BooleanValue(var):
+            rooms[(si, pi)] = f
+    return [
+        Assignment(si, pi, t, rooms.get((si, pi)))
+        for (si, pi, t), var in tm.x.items()
+        if solver.BooleanValue(var)
+    ]
+
+
+def solve_model(
+    tm: TimetableModel,
+    time_limit: float = DEFAULT_TIME_LIMIT,
+    workers: int = DEFAULT_WORKERS,
+    seed: int = 0,
+    log: bool = False,
+    trace: Optional[Trace] = None,
+) -> SolveResult:
+    """Solve an already built model, reporting progress to ``trace``."""
+    start = time.perf_counter()
+    solver = make_solver(time_limit, workers, seed, log)
+    status = solver.Solve(tm.model, trace.attach(solver) if trace else None)
+    if trace:
+        trace.finish(solver, status)
+    result = SolveResult(
+        solver.StatusName(status),
+        None,
+        None,
+        time.perf_counter() - start,
+    )
+    if status in (cp_model.OPTIMAL, cp_model.FEASIBLE):
+        result.objective = solver.ObjectiveValue()
+        result.bound = solver.BestObjectiveBound()
+        result.assignments = extract_assignments(tm, solver)
+    else:
+        result.diagnostics = tm.problem.diagnose()
+    return result
+
+
+def solve(
+    problem: Problem,
+    time_limit: float = DEFAULT_TIME_LIMIT,
+    workers: int = DEFAULT_WORKERS,
+    seed: int = 0,
+    log: bool = False,
+) -> SolveResult:
+    """Build and solve the model for ``problem``."""
+    start = time.perf_counter()
+    result = solve_model(build_model(problem), time_limit, workers, seed, log)
+    result.wall_time = time.perf_counter() - start
+    return result
+
+
+def read_schedule(problem: Problem) -> Dict[int, Assignment]:
+    """
+    Return the semester's current ``scheduled_classes`` rows as assignments,
+    keyed by row id. Rows whose section or period is not part of ``problem``
+    are left out.
+    """
+    sections = {s.id: i for i, s in enumerate(problem.sections) if s.id is not None}
+    periods = {p.id: i for i, p in enumerate(problem.periods) if p.id is not None}
+    with connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute(
+                """
+                SELECT id, class_section_id, time_period_id, teacher_id, facility_id
+                FROM scheduled_classes WHERE semester IS NOT DISTINCT FROM %s
+                """,
+                (problem.semester,),
+            )
+            rows = cur.fetchall()
+    return {
+        row_id: Assignment(
+            sections[section_id], periods[period_id], teacher_id, facility_id
+        )
+        for row_id, section_id, period_id, teacher_id, facility_id in rows
+        if section_id in sections and period_id in periods
+    }
+
+
+def _resolve_periods(cur, problem: Problem) -> None:
+    """Give every period an id, inserting time_periods rows that are missing."""
+    missing = [p for p in problem.periods if p.id is None]
+    if not missing:
+        return
+    cur.execute(
+        "SELECT day_of_week, period_number, id FROM time_periods WHERE period_type = 'regular'"
+    )
+    existing = {(day, number): pid for day, number, pid in cur.fetchall()}
+    to_insert = [p for p in missing if (p.day_of_week, p.period_number) not in existing]
+    if to_insert:
+        rows = execute_values(
+            cur,
+            """
+            INSERT INTO time_periods (period_number, day_of_week, period_type, start_time, end_time)
+            VALUES %s RETURNING day_of_week, period_number, id
+            """,
+            [
+                (
+                    p.period_number,
+                    p.day_of_week,
+                    p.period_type,
+                    p.start_time,
+                    p.end_time,
+                )
+                for p in to_insert
+            ],
+            fetch=True,
+        )
+        existing.update({(day, number): pid for day, number, pid in rows})
+    for period in missing:
+        period.id = existing[(period.day_of_week, period.period_number)]
+
+
+def _resolve_sections(cur, problem: Problem) -> None:
+    """Give every section an id, inserting class_sections rows that are missing."""
+    missing = [s for s in problem.sections if s.id is None]
+    if not missing:
+        return
+    cur.execute(
+        """
+        SELECT course_id, section_name, id FROM class_sections
+        WHERE semester IS NOT DISTINCT FROM %s
+        """,
+        (problem.semester,),
+    )
+    existing = {(course_id, name): sid for course_id, name, sid in cur.fetchall()}
+    to_insert = [s for s in missing if (s.course_id, s.name) not in existing]
+    if to_insert:
+        rows = execute_values(
+            cur,
+            """
+            INSERT INTO class_sections (course_id, section_name, semester)
+            VALUES %s RETURNING course_id, section_name, id
+            """,
+            [(s.course_id, s.name, problem.semester) for s in to_insert],
+            fetch=True,
+        )
+        existing.update({(course_id, name): sid for course_id, name, sid in rows})
+    for section in missing:
+        section.id = existing[(section.course_id, section.name)]
+
+
+def double_period_sections(problem: Problem) -> List[int]:
+    """Ids of the sections whose course requires consecutive periods."""
+    return [
+        s.id
+        for s in problem.sections
+        if s.id is not None
+        and problem.courses[s.course_id].requires_consecutive_periods
+    ]
+
+
+def link_double_periods(cur, problem: Problem, section_ids: List[int]) -> int:
+    """
+    Mark back-to-back meetings of ``section_ids`` as double periods linked
+    to each other, replacing their previous links. Returns the pair count.
+    """
+    if not section_ids:
+        return 0
+    cur.execute(
+        """
+        UPDATE scheduled_classes SET is_double_period = false, linked_period_id = NULL
+        WHERE class_section_id = ANY(%s) AND semester IS NOT DISTINCT FROM %s
+          AND (is_double_period OR linked_period_id IS NOT NULL)
+        """,
+        (section_ids, problem.semester),
+    )
+    cur.execute(
+        """
+        SELECT class_section_id, time_period_id, id FROM scheduled_classes
+        WHERE class_section_id = ANY(%s) AND semester IS NOT DISTINCT FROM %s
+        """,
+        (section_ids, problem.semester),
+    )
+    slots = slots_for(problem)
+    position = {p.id: i for i, p in enumerate(slots.periods) if p.id is not None}
+    meetings: Dict[int, Dict[int, int]] = {}
+    for section_id, period_id, row_id in cur.fetchall():
+        if period_id in position:
+            meetings.setdefault(section_id, {})[position[period_id]] = row_id
+    links = []
+    for rows in meetings.values():
+        for a, b in slots.link(list(rows)):
+            links += [(rows[a], rows[b]), (rows[b], rows[a])]
+    if links:
+        execute_values(
+            cur,
+            """
+            UPDATE scheduled_classes sc
+            SET is_double_period = true, linked_period_id = v.linked
+            FROM (VALUES %s) AS v (id, linked)
+            WHERE sc.id = v.id
+            """,
+            links,
+            page_size=1000,
+        )
+    return len(links) // 2
+
+
+def write_schedule(problem: Problem, assignments: List[Assignment]) -> int:
+    """
+    Replace the semester's ``scheduled_classes`` with ``assignments``.
+
+    Runs in a single transaction and returns the number of rows written.
+    Enrollments attached to the replaced rows are removed with them, and
+    back-to-back meetings of consecutive-period courses are linked.
+    """
+    with connection() as conn:
+        with conn:
+            with conn.cursor() as cur:
+                _resolve_periods(cur, problem)
+                _resolve_sections(cur, problem)
+                cur.execute(
+                    """
+                    DELETE FROM class_enrollments WHERE scheduled_class_id IN (
+                        SELECT id FROM scheduled_classes
+                        WHERE semester IS NOT DISTINCT FROM %s)
+                    """,
+                    (problem.semester,),
+                )
+                cur.execute(
+                    "DELETE FROM scheduled_classes WHERE semester IS NOT DISTINCT FROM %s",
+                    (problem.semester,),
+                )
+                execute_values(
+                    cur,
+                    """
+                    INSERT INTO scheduled_classes
+                        (class_section_id, teacher_id, facility_id, time_period_id, semester)
+                    VALUES %s
+                    """,
+                    [
+                        (
+                            problem.sections[a.section].id,
+                            a.teacher_id,
+                            a.facility_id,
+                            problem.periods[a.period].id,
+                            problem.semester,
+                        )
+                        for a in assignments
+                    ],
+                    page_size=1000,
+                )
+                link_double_periods(cur, problem, double_period_sections(problem))
+    return len(assignments)
+
+
+def schedule(
+    semester: Optional[str] = None,
+    config: Optional[str] = None,
+    time_limit: float = DEFAULT_TIME_LIMIT,
+    workers: int = DEFAULT_WORKERS,
+    seed: int = 0,
+    write: bool = True,
+    log: bool = False,
+    trace: Optional[Trace] = None,
+) -> SolveResult:
+    """
+    Load the problem (from the database, or from ``config`` if given), solve
+    it and, when a solution is found, write it to ``scheduled_classes``.
+    Each stage is timed in ``trace`` when one is given.
+    """
+    stages = trace if trace is not None else Trace(semester)
+    with stages.stage("load"):
+        if config:
+            problem = load_problem_from_config(config, semester)
+        else:
+            problem = load_problem(semester)
+    with stages.stage("feasibility"):
+        index_for(problem)
+    start = time.perf_counter()
+    with stages.stage("build"):
+        tm = build_model(problem)
+    stages.model_size(tm.num_variables, tm.num_constraints)
+    with stages.stage("solve"):
+        result = solve_model(tm, time_limit, workers, seed, log, trace)
+    result.wall_time = time.perf_counter() - start
+    if write and result.feasible:
+        with stages.stage("write"):
+            write_schedule(problem, result.assignments)
+    return result
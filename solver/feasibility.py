@@ -0,0 +1,220 @@
+"""
+Precomputed index of the (teacher, course, period) triples that may be scheduled.
+
+The index is a boolean NumPy array of shape teachers × courses × periods. It
+combines ``teacher_courses`` qualifications, ``teachers.unavailable_periods``
+and the no-first-or-last-period rule for international teachers, so the
+solver and the validators look triples up instead of re-deriving them.
+"""
+
+import threading
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from db import connection
+from models.teachers import Teacher
+from models.time_periods import TimePeriod
+from solver.data import (
+    TEACHABLE_PERIOD_TYPES,
+    TEACHER_SQL,
+    TIME_PERIOD_SQL,
+    Problem,
+    blocked_slots,
+)
+
+# Cheap change detector for the tables the index is built from: the row
+# count and newest row version of each table.
+FINGERPRINT_SQL = """
+    SELECT (SELECT (count(*), max(xmin::text::bigint))::text FROM teachers),
+           (SELECT (count(*), max(xmin::text::bigint))::text FROM teacher_courses),
+           (SELECT (count(*), max(xmin::text::bigint))::text FROM courses),
+           (SELECT (count(*), max(xmin::text::bigint))::text FROM time_periods)
+"""
+
+
+class FeasibilityIndex:
+    """
+    ``allowed[t, c, p]`` is true when teacher ``teacher_ids[t]`` may teach
+    course ``course_ids[c]`` in ``periods[p]``.
+    """
+
+    def __init__(
+        self,
+        teacher_ids: Sequence[int],
+        course_ids: Sequence[int],
+        periods: Sequence[TimePeriod],
+        allowed: np.ndarray,
+    ):
+        self.teacher_ids = list(teacher_ids)
+        self.course_ids = list(course_ids)
+        self.periods = list(periods)
+        self.allowed = allowed
+        self.teacher_index = {t: i for i, t in enumerate(self.teacher_ids)}
+        self.course_index = {c: i for i, c in enumerate(self.course_ids)}
+        self.period_index = {
+            p.id: i for i, p in enumerate(self.periods) if p.id is not None
+        }
+        self._teacher_table = _lookup_table(self.teacher_index)
+        self._course_table = _lookup_table(self.course_index)
+        self._period_table = _lookup_table(self.period_index)
+        self.edges = _edge_mask(self.periods)
+
+    @classmethod
+    def build(
+        cls,
+        teachers: Iterable[Teacher],
+        course_ids: Sequence[int],
+        qualifications: Iterable[Tuple[int, int]],
+        periods: Sequence[TimePeriod],
+    ) -> "FeasibilityIndex":
+        """
+        Build the index from teachers, ``(teacher_id, course_id)``
+        qualifications and the ordered teachable periods.
+        """
+        teachers = list(teachers)
+        teacher_index = {t.id: i for i, t in enumerate(teachers)}
+        course_index = {c: i for i, c in enumerate(course_ids)}
+        slots = {(p.day_of_week, p.period_number): i for i, p in enumerate(periods)}
+
+        qualified = np.zeros((len(teachers), len(course_ids)), dtype=bool)
+        for teacher_id, course_id in qualifications:
+            if teacher_id in teacher_index and course_id in course_index:
+                qualified[teacher_index[teacher_id], course_index[course_id]] = True
+
+        available = np.ones((len(teachers), len(periods)), dtype=bool)
+        edges = _edge_mask(periods)
+        international = np.array(
+            [bool(t.is_international) for t in teachers], dtype=bool
+        )
+        available[np.ix_(international, edges)] = False
+        for row, teacher in enumerate(teachers):
+            for slot in blocked_slots(teacher.unavailable_periods):
+                if slot in slots:
+                    available[row, slots[slot]] = False
+
+        allowed = qualified[:, :, None] & available[:, None, :]
+        return cls([t.id for t in teachers], course_ids, periods, allowed)
+
+    @classmethod
+    def from_problem(cls, problem: Problem) -> "FeasibilityIndex":
+        qualifications = {
+            (t, s.course_id) for s in problem.sections for t in s.teacher_ids
+        }
+        return cls.build(
+            problem.teachers.values(),
+            list(problem.courses),
+            qualifications,
+            problem.periods,
+        )
+
+    def periods_for(self, teacher_id: int, course_id: int) -> np.ndarray:
+        """Period indexes in which the teacher may teach the course."""
+        t = self.teacher_index.get(teacher_id)
+        c = self.course_index.get(course_id)
+        if t is None or c is None:
+            return np.empty(0, dtype=np.intp)
+        return np.flatnonzero(self.allowed[t, c])
+
+    def is_allowed(self, teacher_id: int, course_id: int, period: int) -> bool:
+        """Whether the triple is allowed; ``period`` is an index into ``periods``."""
+        t = self.teacher_index.get(teacher_id)
+        c = self.course_index.get(course_id)
+        return t is not None and c is not None and bool(self.allowed[t, c, period])
+
+    def period_positions(self, period_ids) -> np.ndarray:
+        """Positions in ``periods`` of the given time_periods ids, -1 if unknown."""
+        return _positions(self._period_table, period_ids)
+
+    def lookup(
+        self, teacher_ids: np.ndarray, course_ids: np.ndarray, period_ids: np.ndarray
+    ) -> np.ndarray:
+        """
+        Vectorised check of many triples given as database ids. Triples with
+        an unknown teacher, course or period are reported as not allowed.
+        """
+        t = _positions(self._teacher_table, teacher_ids)
+        c = _positions(self._course_table, course_ids)
+        p = self.period_positions(period_ids)
+        known = (t >= 0) & (c >= 0) & (p >= 0)
+        result = np.zeros(len(t), dtype=bool)
+        result[known] = self.allowed[t[known], c[known], p[known]]
+        return result
+
+
+def _lookup_table(index: Dict[int, int]) -> np.ndarray:
+    """Dense id -> position array, -1 for ids that are not indexed."""
+    table = np.full(max(index, default=-1) + 1, -1, dtype=np.intp)
+    if index:
+        table[list(index)] = list(index.values())
+    return table
+
+
+def _positions(table: np.ndarray, ids) -> np.ndarray:
+    ids = np.asarray(ids, dtype=np.intp)
+    positions = np.full(ids.shape, -1, dtype=np.intp)
+    known = (ids >= 0) & (ids < len(table))
+    positions[known] = table[ids[known]]
+    return positions
+
+
+def _edge_mask(periods: Sequence[TimePeriod]) -> np.ndarray:
+    """Boolean mask of the first and last period of each day."""
+    mask = np.zeros(len(periods), dtype=bool)
+    first: Dict[int, int] = {}
+    last: Dict[int, int] = {}
+    for i, period in enumerate(periods):
+        first.setdefault(period.day_of_week, i)
+        last[period.day_of_week] = i
+    mask[list(first.values())] = True
+    mask[list(last.values())] = True
+    return mask
+
+
+def index_for(problem: Problem) -> FeasibilityIndex:
+    """Return the index for ``problem``, building it on first use."""
+    index = getattr(problem, "_feasibility", None)
+    if index is None:
+        index = FeasibilityIndex.from_problem(problem)
+        problem._feasibility = index
+    return index
+
+
+_cached: Optional[Tuple[tuple, FeasibilityIndex]] = None
+_cache_lock = threading.Lock()
+
+
+def load_index() -> FeasibilityIndex:
+    """
+    Return the index for the whole database.
+
+    The index is cached for the process and rebuilt only when teachers,
+    teacher_courses, courses or time_periods have changed since it was built.
+    """
+    global _cached
+    with connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute(FINGERPRINT_SQL)
+            fingerprint = cur.fetchone()
+            with _cache_lock:
+                if _cached is not None and _cached[0] == fingerprint:
+                    return _cached[1]
+            cur.execute(TEACHER_SQL)
+            teachers = [Teacher(*row) for row in cur.fetchall()]
+            cur.execute("SELECT id FROM courses ORDER BY id")
+            course_ids = [row[0] for row in cur.fetchall()]
+            cur.execute("SELECT teacher_id, course_id FROM teacher_courses")
+            qualifications = cur.fetchall()
+            cur.execute(TIME_PERIOD_SQL, (list(TEACHABLE_PERIOD_TYPES),))
+            periods: List[TimePeriod] = [TimePeriod(*row) for row in cur.fetchall()]
+    index = FeasibilityIndex.build(teachers, course_ids, qualifications, periods)
+    with _cache_lock:
+        _cached = (fingerprint, index)
+    return index
+
+
+def invalidate() -> None:
+    """Drop the cached database index."""
+    global _cached
+    with _cache_lock:
+        _cached = None
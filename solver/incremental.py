@@ -0,0 +1,285 @@
+"""
+Incremental re-solve after a change to a few teachers, courses or sections.
+
+The current ``scheduled_classes`` rows are used as a solution hint. Sections
+outside the affected neighbourhood are pinned to their current meetings, and
+moving an affected meeting away from its current slot is penalised so the
+solver keeps churn low. Only the difference is written back.
+"""
+
+from collections import Counter, defaultdict
+from dataclasses import astuple, dataclass, field
+from typing import Dict, Iterable, List, Optional, Set
+
+from psycopg2.extras import execute_values
+
+from db import connection
+from solver.data import Problem, load_problem
+from solver.engine import (
+    DEFAULT_WORKERS,
+    Assignment,
+    SolveResult,
+    _resolve_periods,
+    _resolve_sections,
+    double_period_sections,
+    link_double_periods,
+    read_schedule,
+    solve_model,
+)
+from solver.model import TimetableModel, build_model
+
+DEFAULT_TIME_LIMIT = 10.0
+DEFAULT_MAX_HOPS = 2
+# Cost of moving one meeting away from its current slot.
+MOVE_WEIGHT = 10
+
+
+@dataclass
+class IncrementalResult:
+    result: SolveResult
+    affected: Set[int] = field(default_factory=set)
+    added: List[Assignment] = field(default_factory=list)
+    removed: Dict[int, Assignment] = field(default_factory=dict)
+
+
+def affected_sections(
+    problem: Problem,
+    current: Dict[int, Assignment],
+    teacher_ids: Iterable[int] = (),
+    course_ids: Iterable[int] = (),
+    section_ids: Iterable[int] = (),
+) -> Set[int]:
+    """
+    Indexes of the sections that must be free to move: sections of the given
+    courses, sections the given teachers teach or could teach, the given
+    sections, and any section whose current meetings no longer add up.
+    """
+    teacher_ids = set(teacher_ids)
+    course_ids = set(course_ids)
+    section_ids = set(section_ids)
+    teaching = {a.section for a in current.values() if a.teacher_id in teacher_ids}
+    counts = Counter(a.section for a in current.values())
+    return {
+        si
+        for si, section in enumerate(problem.sections)
+        if section.course_id in course_ids
+        or section.id in section_ids
+        or teacher_ids.intersection(section.teacher_ids)
+        or si in teaching
+        or counts[si] != section.periods
+    }
+
+
+def expand(
+    problem: Problem, sections: Set[int], current: Dict[int, Assignment]
+) -> Set[int]:
+    """Add every section sharing a student or a current teacher with ``sections``."""
+    students = set().union(*(problem.sections[si].student_ids for si in sections))
+    teachers = {a.teacher_id for a in current.values() if a.section in sections}
+    taught_by: Dict[int, Set[int]] = defaultdict(set)
+    for a in current.values():
+        taught_by[a.section].add(a.teacher_id)
+    return sections | {
+        si
+        for si, section in enumerate(problem.sections)
+        if not students.isdisjoint(section.student_ids) or taught_by[si] & teachers
+    }
+
+
+def invalid_sections(tm: TimetableModel, current: Dict[int, Assignment]) -> Set[int]:
+    """
+    Sections whose current meetings are no longer allowed by the model,
+    including meetings without a room whose course now needs one.
+    """
+    roomed = {(si, pi) for si, pi, _ in tm.rooms}
+    return {
+        a.section
+        for a in current.values()
+        if (a.section, a.period, a.teacher_id) not in tm.x
+        or (
+            a.facility_id is not None
+            and (a.section, a.period, a.facility_id) not in tm.rooms
+        )
+        or (a.facility_id is None and (a.section, a.period) in roomed)
+    }
+
+
+def pin(tm: TimetableModel, current: Dict[int, Assignment], affected: Set[int]) -> None:
+    """
+    Hint every variable with the current timetable, fix the sections outside
+    ``affected`` and penalise moving the affected ones.
+    """
+    meetings = {(a.section, a.period, a.teacher_id) for a in current.values()}
+    rooms = {
+        (a.section, a.period, a.facility_id)
+        for a in current.values()
+        if a.facility_id is not None
+    }
+    for variables, chosen in ((tm.x, meetings), (tm.rooms, rooms)):
+        for key, var in variables.items():
+            value = key in chosen
+            tm.model.AddHint(var, value)
+            if key[0] not in affected:
+                tm.model.Add(var == int(value))
+            elif value and variables is tm.x:
+                tm.penalties.append(MOVE_WEIGHT * (1 - var))
+    tm.minimize()
+
+
+def diff(current: Dict[int, Assignment], assignments: List[Assignment]):
+    """Return ``(added, removed)`` between the current rows and a new solution."""
+    new = {astuple(a) for a in assignments}
+    old = {astuple(a) for a in current.values()}
+    added = [a for a in assignments if astuple(a) not in old]
+    removed = {rid: a for rid, a in current.items() if astuple(a) not in new}
+    return added, removed
+
+
+def apply_changes(
+    problem: Problem, added: List[Assignment], removed: Dict[int, Assignment]
+) -> None:
+    """
+    Write a diff to ``scheduled_classes`` in one transaction.
+
+    A removed meeting paired with an added meeting of the same section is
+    updated in place, keeping its row id and enrollments. Newly inserted
+    meetings inherit the enrollments of their section. Double periods of
+    the changed sections are linked again.
+    """
+    pending: Dict[int, List[Assignment]] = defaultdict(list)
+    for a in added:
+        pending[a.section].append(a)
+    moves, deletes = [], []
+    for rid, old in removed.items():
+        if pending[old.section]:
+            moves.append((rid, pending[old.section].pop()))
+        else:
+            deletes.append(rid)
+    inserts = [a for meetings in pending.values() for a in meetings]
+
+    with connection() as conn:
+        with conn:
+            with conn.cursor() as cur:
+                _resolve_periods(cur, problem)
+                _resolve_sections(cur, problem)
+                if deletes:
+                    cur.execute(
+                        """
+                        UPDATE scheduled_classes
+                        SET is_double_period = false, linked_period_id = NULL
+                        WHERE linked_period_id = ANY(%s)
+                        """,
+                        (deletes,),
+                    )
+                    cur.execute(
+                        "DELETE FROM class_enrollments WHERE scheduled_class_id = ANY(%s)",
+                        (deletes,),
+                    )
+                    cur.execute(
+                        "DELETE FROM scheduled_classes WHERE id = ANY(%s)", (deletes,)
+                    )
+                if moves:
+                    # Clear the periods first so swaps never trip the
+                    # (teacher, period) and (facility, period) constraints.
+                    cur.execute(
+                        "UPDATE scheduled_classes SET time_period_id = NULL WHERE id = ANY(%s)",
+                        ([rid for rid, _ in moves],),
+                    )
+                    execute_values(
+                        cur,
+                        """
+                        UPDATE scheduled_classes sc
+                        SET time_period_id = v.time_period_id,
+                            teacher_id = v.teacher_id,
+                            facility_id = v.facility_id
+                        FROM (VALUES %s) AS v (id, time_period_id, teacher_id, facility_id)
+                        WHERE sc.id = v.id
+                        """,
+                        [
+                            (
+                                rid,
+                                problem.periods[a.period].id,
+                                a.teacher_id,
+                                a.facility_id,
+                            )
+                            for rid, a in moves
+                        ],
+                        template="(%s, %s::int, %s::int, %s::int)",
+                    )
+                if inserts:
+                    rows = execute_values(
+                        cur,
+                        """
+                        INSERT INTO scheduled_classes
+                            (class_section_id, teacher_id, facility_id, time_period_id, semester)
+                        VALUES %s RETURNING id
+                        """,
+                        [
+                            (
+                                problem.sections[a.section].id,
+                                a.teacher_id,
+                                a.facility_id,
+                                problem.periods[a.period].id,
+                                problem.semester,
+                            )
+                            for a in inserts
+                        ],
+                        fetch=True,
+                    )
+                    cur.execute(
+                        """
+                        INSERT INTO class_enrollments (scheduled_class_id, student_id)
+                        SELECT DISTINCT new.id, ce.student_id
+                        FROM scheduled_classes new
+                        JOIN scheduled_classes sc
+                          ON sc.class_section_id = new.class_section_id AND sc.id <> new.id
+                        JOIN class_enrollments ce ON ce.scheduled_class_id = sc.id
+                        WHERE new.id = ANY(%s)
+                        """,
+                        ([row[0] for row in rows],),
+                    )
+                changed = {problem.sections[a.section].id for a in added}
+                changed |= {problem.sections[a.section].id for a in removed.values()}
+                link_double_periods(
+                    cur,
+                    problem,
+                    [s for s in double_period_sections(problem) if s in changed],
+                )
+
+
+def resolve(
+    semester: Optional[str] = None,
+    teacher_ids: Iterable[int] = (),
+    course_ids: Iterable[int] = (),
+    section_ids: Iterable[int] = (),
+    time_limit: float = DEFAULT_TIME_LIMIT,
+    workers: int = DEFAULT_WORKERS,
+    max_hops: int = DEFAULT_MAX_HOPS,
+    write: bool = True,
+) -> IncrementalResult:
+    """
+    Re-solve only the neighbourhood of the changed teachers, courses or
+    sections, warm-started from the current timetable.
+
+    If the neighbourhood cannot be rescheduled with everything else pinned it
+    is widened by the sections sharing students or teachers with it, up to
+    ``max_hops`` times.
+    """
+    problem = load_problem(semester)
+    current = read_schedule(problem)
+    affected = affected_sections(problem, current, teacher_ids, course_ids, section_ids)
+    for hop in range(max_hops + 1):
+        tm = build_model(problem)
+        affected |= invalid_sections(tm, current)
+        pin(tm, current, affected)
+        result = solve_model(tm, time_limit, workers)
+        if result.feasible or hop == max_hops:
+            break
+        affected = expand(problem, affected, current)
+
+    outcome = IncrementalResult(result, affected)
+    if result.feasible:
+        outcome.added, outcome.removed = diff(current, result.assignments)
+        if write and (outcome.added or outcome.removed):
+            apply_changes(problem, outcome.added, outcome.removed)
+    return outcome
@@ -0,0 +1,175 @@
+"""CP-SAT timetable model over feasible (section, period, teacher) triples."""
+
+import math
+from collections import defaultdict
+from typing import Dict, List, Optional, Set, Tuple
+
+from ortools.sat.python import cp_model
+
+from solver.data import Problem, Section
+from solver.feasibility import index_for
+from solver.objectives import Objective
+
+
+def facility_candidates(problem: Problem, section: Section) -> Optional[List[int]]:
+    """
+    Facility ids that can host ``section``, or ``None`` if it needs no facility.
+
+    Only courses with ``requires_specific_facility`` are given a facility; the
+    facility must match ``preferred_facility_type`` (when set) and seat the
+    whole section.
+    """
+    course = problem.courses[section.course_id]
+    if not course.requires_specific_facility:
+        return None
+    return [
+        f.id
+        for f in problem.facilities
+        if (
+            course.preferred_facility_type is None
+            or f.facility_type == course.preferred_facility_type
+        )
+        and (f.capacity or 0) >= section.size
+    ]
+
+
+def max_daily_meetings(section: Section, days: int) -> int:
+    """Upper bound on how often a section meets on a single day."""
+    return max(2, math.ceil(section.periods / max(days, 1)))
+
+
+class TimetableModel:
+    """
+    A CP-SAT model together with the variables needed to read a solution.
+
+    ``x[(section, period, teacher_id)]`` is true when the section (an index
+    into ``problem.sections``) meets in the period (an index into
+    ``problem.periods``) with that teacher. ``rooms[(section, period,
+    facility_id)]`` selects the facility for sections that need one.
+    The objective is the sum of ``penalties`` and the soft constraints of
+    ``objective``.
+    """
+
+    def __init__(self, problem: Problem):
+        self.problem = problem
+        self.model = cp_model.CpModel()
+        self.x: Dict[Tuple[int, int, int], cp_model.IntVar] = {}
+        self.rooms: Dict[Tuple[int, int, int], cp_model.IntVar] = {}
+        self.penalties: List[cp_model.LinearExprT] = []
+        self.objective: Optional[Objective] = None
+
+    def minimize(self) -> None:
+        """(Re)set the objective to ``penalties`` plus the soft constraints."""
+        terms = list(self.penalties)
+        if self.objective is not None:
+            terms += self.objective.terms()
+        if terms:
+            self.model.Minimize(sum(terms))
+        elif self.model.HasObjective():
+            self.model.ClearObjective()
+
+    @property
+    def num_variables(self) -> int:
+        return len(self.model.Proto().variables)
+
+    @property
+    def num_constraints(self) -> int:
+        return len(self.model.Proto().constraints)
+
+
+def build_model(problem: Problem) -> TimetableModel:
+    """Build the hard constraints and the soft-constraint objective."""
+    tm = TimetableModel(problem)
+    model = tm.model
+    index = index_for(problem)
+    by_period_teacher: Dict[Tuple[int, int], list] = defaultdict(list)
+    by_section_period: Dict[Tuple[int, int], list] = defaultdict(list)
+    by_teacher: Dict[int, list] = defaultdict(list)
+
+    for si, section in enumerate(problem.sections):
+        teachers = [t for t in section.teacher_ids if t in problem.teachers]
+        chosen = {}
+        if len(teachers) > 1:
+            chosen = {t: model.NewBoolVar(f"y_s{si}_t{t}") for t in teachers}
+            model.AddExactlyOne(chosen.values())
+
+        section_vars = []
+        for t in teachers:
+            for pi in index.periods_for(t, section.course_id).tolist():
+                var = model.NewBoolVar(f"x_s{si}_p{pi}_t{t}")
+                tm.x[(si, pi, t)] = var
+                by_period_teacher[(pi, t)].append(var)
+                by_section_period[(si, pi)].append(var)
+                by_teacher[t].append(var)
+                section_vars.append(var)
+                if chosen:
+                    model.AddImplication(var, chosen[t])
+        model.Add(sum(section_vars) == section.periods)
+
+        limit = max_daily_meetings(section, len(problem.days))
+        for indexes in problem.days.values():
+            day_vars = [
+                v for pi in indexes for v in by_section_period.get((si, pi), ())
+            ]
+            if len(day_vars) > limit:
+                model.Add(sum(day_vars) <= limit)
+
+    for (si, pi), vars_ in by_section_period.items():
+        if len(vars_) > 1:
+            model.AddAtMostOne(vars_)
+
+    for vars_ in by_period_teacher.values():
+        if len(vars_) > 1:
+            model.AddAtMostOne(vars_)
+
+    for t, vars_ in by_teacher.items():
+        limit = problem.teachers[t].max_periods_per_week
+        if limit is not None and len(vars_) > limit:
+            model.Add(sum(vars_) <= limit)
+
+    _add_student_conflicts(tm, by_section_period)
+    _add_facilities(tm, by_section_period)
+
+    tm.objective = Objective(tm)
+    tm.objective.apply(problem.constraints)
+    return tm
+
+
+def _add_student_conflicts(tm: TimetableModel, by_section_period) -> None:
+    """A student attends at most one section per period."""
+    memberships: Dict[int, List[int]] = defaultdict(list)
+    for si, section in enumerate(tm.problem.sections):
+        for student_id in section.student_ids:
+            memberships[student_id].append(si)
+    cohorts: Set[Tuple[int, ...]] = {
+        tuple(sections) for sections in memberships.values() if len(sections) > 1
+    }
+    for cohort in cohorts:
+        for pi in range(len(tm.problem.periods)):
+            vars_ = [v for si in cohort for v in by_section_period.get((si, pi), ())]
+            if len(vars_) > 1:
+                tm.model.AddAtMostOne(vars_)
+
+
+def _add_facilities(tm: TimetableModel, by_section_period) -> None:
+    """Sections that need a facility get one that fits, without double-booking it."""
+    model = tm.model
+    by_facility_period: Dict[Tuple[int, int], list] = defaultdict(list)
+    for si, section in enumerate(tm.problem.sections):
+        candidates = facility_candidates(tm.problem, section)
+        if candidates is None:
+            continue
+        for pi in range(len(tm.problem.periods)):
+            meets = by_section_period.get((si, pi))
+            if not meets:
+                continue
+            rooms = []
+            for f in candidates:
+                var = model.NewBoolVar(f"r_s{si}_p{pi}_f{f}")
+                tm.rooms[(si, pi, f)] = var
+                by_facility_period[(f, pi)].append(var)
+                rooms.append(var)
+            model.Add(sum(rooms) == sum(meets))
+    for vars_ in by_facility_period.values():
+        if len(vars_) > 1:
+            model.AddAtMostOne(vars_)
@@ -0,0 +1,249 @@
+"""
+Weighted soft constraints of the timetable objective.
+
+Each active ``scheduling_constraints`` row names a ``constraint_type`` and
+carries its options, including an integer ``weight`` (default 1), in
+``constraint_value``. A compiler registered for the type with ``@compiler``
+turns the options into penalty units: linear expressions over the model's
+variables, adding helper variables to the model where needed. The objective
+is the sum of every row's weight times its units.
+
+``Objective`` caches the compiled units of a model by a hash of the row's
+type and options without the weight. Re-applying changed rows to a built
+model only compiles rows whose options changed; a weight change just resets
+the objective::
+
+    tm = build_model(problem)
+    solve_model(tm)
+    tm.objective.apply(load_constraints())  # after editing a weight
+    solve_model(tm)
+
+Built-in types:
+
+``teacher_preferred_periods``
+    Each meeting outside its teacher's ``teachers.preferred_periods``
+    (``{"<day>": [period_number, ...]}``); teachers without preferences are
+    ignored. ``teacher_ids`` limits it to some teachers.
+``elective_periods``
+    Each elective meeting outside ``periods`` (period numbers) or, by
+    default, outside the ``last`` 2 teachable periods of the day.
+``consecutive_periods``
+    Each meeting of a ``requires_consecutive_periods`` course that is not
+    half of a back-to-back pair (``solver.slots``).
+``homeroom_cohesion``
+    Each (homeroom, period) in which some but not all of the homeroom's
+    students are in class.
+
+Types without a row fall back to ``DEFAULT_CONSTRAINTS``; unknown types are
+logged and skipped.
+"""
+
+import hashlib
+import json
+import logging
+from collections import defaultdict
+from typing import Any, Callable, Dict, List, Sequence, Tuple
+
+from db import connection
+from solver.data import CONSTRAINT_SQL, Constraint, blocked_slots
+from solver.slots import slots_for
+
+DEFAULT_CONSTRAINTS = [Constraint(None, "elective_periods", {"last": 2, "weight": 1})]
+
+Compiler = Callable[[Any, Dict[str, Any]], List[Any]]
+COMPILERS: Dict[str, Compiler] = {}
+
+log = logging.getLogger(__name__)
+
+
+def compiler(constraint_type: str) -> Callable[[Compiler], Compiler]:
+    """Register the decorated function as the compiler of ``constraint_type``."""
+
+    def register(function: Compiler) -> Compiler:
+        COMPILERS[constraint_type] = function
+        return function
+
+    return register
+
+
+def load_constraints() -> List[Constraint]:
+    """Read the active ``scheduling_constraints`` rows."""
+    with connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute(CONSTRAINT_SQL)
+            return [Constraint(*row) for row in cur.fetchall()]
+
+
+def options(constraint: Constraint) -> Dict[str, Any]:
+    """The row's options without ``weight``."""
+    value = constraint.constraint_value or {}
+    return {k: v for k, v in value.items() if k != "weight"}
+
+
+def weight(constraint: Constraint) -> int:
+    value = (constraint.constraint_value or {}).get("weight", 1)
+    if value != int(value) or value < 0:
+        raise ValueError(
+            f"Constraint {constraint.id}: weight must be a non-negative integer,"
+            f" got {value!r}"
+        )
+    return int(value)
+
+
+def content_key(constraint: Constraint) -> str:
+    """Hash of the row's type and options, the key of its compiled units."""
+    payload = json.dumps(
+        [constraint.constraint_type, options(constraint)], sort_keys=True, default=str
+    )
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def with_defaults(constraints: Sequence[Constraint]) -> List[Constraint]:
+    """``constraints`` plus the defaults of the types they do not mention."""
+    types = {c.constraint_type for c in constraints}
+    return list(constraints) + [
+        c for c in DEFAULT_CONSTRAINTS if c.constraint_type not in types
+    ]
+
+
+class Objective:
+    """The soft-constraint objective of one ``TimetableModel``."""
+
+    def __init__(self, tm):
+        self.tm = tm
+        self.compiled: Dict[str, List[Any]] = {}
+        self.compilations = 0
+        self._weighted: List[Tuple[int, List[Any]]] = []
+        self._meets = None
+
+    def apply(self, constraints: Sequence[Constraint]) -> None:
+        """Make ``constraints`` (plus defaults) the model's objective."""
+        weighted = []
+        for constraint in with_defaults(constraints):
+            compile_ = COMPILERS.get(constraint.constraint_type)
+            if compile_ is None:
+                log.warning(
+                    "skipping constraint %s of unknown type %r",
+                    constraint.id,
+                    constraint.constraint_type,
+                )
+                continue
+            key = content_key(constraint)
+            units = self.compiled.get(key)
+            if units is None:
+                units = self.compiled[key] = compile_(self, options(constraint))
+                self.compilations += 1
+            factor = weight(constraint)
+            if factor and units:
+                weighted.append((factor, units))
+        self._weighted = weighted
+        self.tm.minimize()
+
+    def terms(self) -> List[Any]:
+        """Weighted penalty terms for ``TimetableModel.minimize``."""
+        return [factor * sum(units) for factor, units in self._weighted]
+
+    @property
+    def meets(self) -> Dict[Tuple[int, int], Any]:
+        """``(section, period) -> expression`` that is 1 when the section meets then."""
+        if self._meets is None:
+            by_slot = defaultdict(list)
+            for (si, pi, _), var in self.tm.x.items():
+                by_slot[si, pi].append(var)
+            self._meets = {slot: sum(vars_) for slot, vars_ in by_slot.items()}
+        return self._meets
+
+
+@compiler("teacher_preferred_periods")
+def _teacher_preferred_periods(objective: Objective, opts: Dict[str, Any]):
+    problem = objective.tm.problem
+    only = set(opts["teacher_ids"]) if opts.get("teacher_ids") else None
+    preferred = {
+        t.id: blocked_slots(t.preferred_periods)
+        for t in problem.teachers.values()
+        if t.preferred_periods and (only is None or t.id in only)
+    }
+    units = []
+    for (si, pi, t), var in objective.tm.x.items():
+        period = problem.periods[pi]
+        if t in preferred and (
+            (period.day_of_week, period.period_number) not in preferred[t]
+        ):
+            units.append(var)
+    return units
+
+
+@compiler("elective_periods")
+def _elective_periods(objective: Objective, opts: Dict[str, Any]):
+    problem = objective.tm.problem
+    if opts.get("periods"):
+        numbers = set(opts["periods"])
+        allowed = {
+            i for i, p in enumerate(problem.periods) if p.period_number in numbers
+        }
+    else:
+        allowed = problem.last_periods(int(opts.get("last", 2)))
+    return [
+        var
+        for (si, pi, _), var in objective.tm.x.items()
+        if problem.courses[problem.sections[si].course_id].is_elective
+        and pi not in allowed
+    ]
+
+
+@compiler("consecutive_periods")
+def _consecutive_periods(objective: Objective, opts: Dict[str, Any]):
+    tm, meets = objective.tm, objective.meets
+    problem = tm.problem
+    pairs = slots_for(problem).pairs
+    units = []
+    for si, section in enumerate(problem.sections):
+        if not problem.courses[section.course_id].requires_consecutive_periods:
+            continue
+        doubles = []
+        by_period = defaultdict(list)
+        for a, b in pairs:
+            if (si, a) in meets and (si, b) in meets:
+                d = tm.model.NewBoolVar(f"double_s{si}_p{a}")
+                tm.model.Add(d <= meets[si, a])
+                tm.model.Add(d <= meets[si, b])
+                by_period[a].append(d)
+                by_period[b].append(d)
+                doubles.append(d)
+        for vars_ in by_period.values():
+            if len(vars_) > 1:
+                tm.model.AddAtMostOne(vars_)  # a meeting is in one double
+        units.append(section.periods - 2 * sum(doubles))
+    return units
+
+
+@compiler("homeroom_cohesion")
+def _homeroom_cohesion(objective: Objective, opts: Dict[str, Any]):
+    tm, meets = objective.tm, objective.meets
+    problem = tm.problem
+    units = []
+    for homeroom, members in sorted(problem.homerooms.items()):
+        shares = [
+            (si, len(members & section.student_ids))
+            for si, section in enumerate(problem.sections)
+        ]
+        shares = [(si, n) for si, n in shares if n]
+        taking = set().union(
+            *(members & problem.sections[si].student_ids for si, _ in shares)
+        )
+        if len(taking) < 2:
+            continue
+        for pi in range(len(problem.periods)):
+            busy = [(n, meets[si, pi]) for si, n in shares if (si, pi) in meets]
+            if not busy:
+                continue
+            # Students attend one section per period, so this counts them.
+            present = sum(n * expr for n, expr in busy)
+            everyone = tm.model.NewBoolVar(f"hr{homeroom}_p{pi}_all")
+            nobody = tm.model.NewBoolVar(f"hr{homeroom}_p{pi}_none")
+            split = tm.model.NewBoolVar(f"hr{homeroom}_p{pi}_split")
+            tm.model.Add(present == len(taking)).OnlyEnforceIf(everyone)
+            tm.model.Add(present == 0).OnlyEnforceIf(nobody)
+            tm.model.AddBoolOr([everyone, nobody, split])
+            units.append(split)
+    return units
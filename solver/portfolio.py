@@ -0,0 +1,343 @@
+"""
+Portfolio solving: several differently seeded solves of the same timetable.
+
+CP-SAT's search is high-variance, so ``run_portfolio`` starts one candidate
+per ``Strategy`` (a random seed plus solver parameter overrides) in a process
+pool. The candidates share the best objective found so far: a candidate whose
+own bound shows it cannot beat that objective stops early, and a proven
+optimum stops everyone (candidates not yet started are ``SKIPPED``). All
+candidates stop at one global deadline. The
+winner is written to ``scheduled_classes``; every candidate's status,
+objective and hard-constraint violation counts are kept for comparison.
+
+Usage: python -m solver.portfolio [--semester S] [--candidates N] [--jobs N]
+                                  [--time-limit N] [--dry-run]
+"""
+
+import argparse
+import math
+import multiprocessing
+import os
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+from ortools.sat.python import cp_model
+
+from solver.data import Problem, load_problem, load_problem_from_config
+from solver.engine import (
+    DEFAULT_TIME_LIMIT,
+    Assignment,
+    SolveResult,
+    extract_assignments,
+    make_solver,
+    write_schedule,
+)
+from solver.feasibility import index_for
+from solver.model import build_model
+from solver.validation import (
+    FACILITY_CLASH,
+    INTERNATIONAL_EDGE,
+    NOT_ALLOWED,
+    STUDENT_CLASH,
+    TEACHER_CLASH,
+    TEACHER_OVERLOAD,
+    clash_groups,
+)
+
+DEFAULT_CANDIDATES = 4
+MISSING_MEETINGS = "section_missing_meetings"
+SKIPPED = "SKIPPED"  # status of a candidate started after a proven optimum
+
+# Parameter sets cycled through by ``strategies``; each changes how CP-SAT
+# searches, so candidates differ by more than their seed.
+PRESETS: List[Dict[str, Any]] = [
+    {},
+    {"linearization_level": 2},
+    {"search_branching": "PORTFOLIO_WITH_QUICK_RESTART_SEARCH"},
+    {"randomize_search": True},
+    {"linearization_level": 0},
+]
+
+
+@dataclass
+class Strategy:
+    """Seed and ``SatParameters`` overrides of one candidate."""
+
+    seed: int
+    parameters: Dict[str, Any] = field(default_factory=dict)
+    workers: int = 1
+
+    @property
+    def label(self) -> str:
+        overrides = ", ".join(f"{k}={v}" for k, v in sorted(self.parameters.items()))
+        return f"seed {self.seed}" + (f" ({overrides})" if overrides else "")
+
+
+@dataclass
+class Candidate:
+    """Outcome of one strategy. Only the winner keeps its assignments."""
+
+    strategy: Strategy
+    result: SolveResult
+    violations: Dict[str, int] = field(default_factory=dict)
+
+
+@dataclass
+class PortfolioResult:
+    candidates: List[Candidate]
+    best: Optional[Candidate] = None
+    written: int = 0
+
+    @property
+    def feasible(self) -> bool:
+        return self.best is not None
+
+
+def strategies(count: int = DEFAULT_CANDIDATES, base_seed: int = 0) -> List[Strategy]:
+    """``count`` strategies with distinct seeds, cycling through ``PRESETS``."""
+    return [
+        Strategy(base_seed + i, dict(PRESETS[i % len(PRESETS)])) for i in range(count)
+    ]
+
+
+def violations(problem: Problem, assignments: List[Assignment]) -> Dict[str, int]:
+    """
+    Count hard-constraint violations of ``assignments`` by kind, using the
+    kinds and clash rule of ``solver.validation``. Works before the schedule
+    is written; solver meetings take place every week.
+    """
+    counts: Counter = Counter()
+    index = index_for(problem)
+    edges = problem.edge_periods()
+    teachers, facilities, periods = [], [], []
+    students, student_periods = [], []
+    meetings: Counter = Counter()
+    load: Counter = Counter()
+    for a in assignments:
+        section = problem.sections[a.section]
+        teachers.append(a.teacher_id)
+        facilities.append(-1 if a.facility_id is None else a.facility_id)
+        periods.append(a.period)
+        students += section.student_ids
+        student_periods += [a.period] * len(section.student_ids)
+        meetings[a.section] += 1
+        load[a.teacher_id] += 1
+        teacher = problem.teachers.get(a.teacher_id)
+        if teacher is not None and teacher.is_international and a.period in edges:
+            counts[INTERNATIONAL_EDGE] += 1
+        elif not index.is_allowed(a.teacher_id, section.course_id, a.period):
+            counts[NOT_ALLOWED] += 1
+    for kind, owner, period in (
+        (TEACHER_CLASH, teachers, periods),
+        (FACILITY_CLASH, facilities, periods),
+        (STUDENT_CLASH, students, student_periods),
+    ):
+        owner = np.array(owner, dtype=np.int64)
+        counts[kind] += len(clash_groups(owner, np.array(period, dtype=np.int64)))
+    for teacher_id, periods in load.items():
+        teacher = problem.teachers.get(teacher_id)
+        limit = teacher.max_periods_per_week if teacher is not None else None
+        if limit is not None and periods > limit:
+            counts[TEACHER_OVERLOAD] += 1
+    counts[MISSING_MEETINGS] = sum(
+        1 for i, s in enumerate(problem.sections) if meetings[i] < s.periods
+    )
+    return {kind: n for kind, n in counts.items() if n}
+
+
+# Shared by the pool's processes (set by ``_init``): the best objective so
+# far, guarded by its own lock, and an event that stops every candidate.
+_best = None
+_stop = None
+
+
+def _init(best, stop) -> None:
+    global _best, _stop
+    _best, _stop = best, stop
+
+
+def _apply(parameters, overrides: Dict[str, Any]) -> None:
+    for name, value in overrides.items():
+        if isinstance(value, str):
+            value = getattr(parameters, value)  # enum values by name
+        setattr(parameters, name, value)
+
+
+class _Share(cp_model.CpSolverSolutionCallback):
+    """Publishes each improving objective and gives up when it cannot win."""
+
+    def __init__(self, solver: cp_model.CpSolver):
+        super().__init__()
+        self.objective = math.inf
+        self.bound = -math.inf
+        solver.best_bound_callback = self.on_bound
+
+    def on_bound(self, bound: float) -> None:
+        self.bound = max(self.bound, bound)
+
+    def on_solution_callback(self) -> None:
+        self.objective = self.ObjectiveValue()
+        self.on_bound(self.BestObjectiveBound())
+        with _best.get_lock():
+            if self.objective < _best.value:
+                _best.value = self.objective
+        if self.beaten():
+            self.StopSearch()
+
+    def beaten(self) -> bool:
+        """Whether another candidate already has a better answer than ours can be."""
+        with _best.get_lock():
+            best = _best.value
+        return self.bound >= best and self.objective > best
+
+
+def _solve(problem: Problem, strategy: Strategy, deadline: float) -> Candidate:
+    start = time.perf_counter()
+    if _stop.is_set():
+        return Candidate(strategy, SolveResult(SKIPPED, None, None, 0.0))
+    tm = build_model(problem)
+    solver = make_solver(max(deadline - time.time(), 0.0), strategy.workers)
+    solver.parameters.random_seed = strategy.seed
+    _apply(solver.parameters, strategy.parameters)
+
+    done = threading.Event()
+    share = _Share(solver)
+
+    def watch():
+        # Other candidates' progress arrives here, not in our callbacks.
+        # StopSearch is a no-op until Solve has started, so keep calling it.
+        while not done.wait(0.05):
+            if _stop.is_set() or share.beaten():
+                solver.StopSearch()
+
+    watcher = threading.Thread(target=watch, daemon=True)
+    watcher.start()
+    try:
+        status = solver.Solve(tm.model, share)
+    finally:
+        done.set()
+        watcher.join()
+    if status == cp_model.OPTIMAL:
+        _stop.set()
+
+    result = SolveResult(
+        solver.StatusName(status), None, None, time.perf_counter() - start
+    )
+    candidate = Candidate(strategy, result)
+    if status in (cp_model.OPTIMAL, cp_model.FEASIBLE):
+        result.objective = solver.ObjectiveValue()
+        result.bound = solver.BestObjectiveBound()
+        result.assignments = extract_assignments(tm, solver)
+        candidate.violations = violations(problem, result.assignments)
+    return candidate
+
+
+def _rank(candidate: Candidate):
+    result = candidate.result
+    return (sum(candidate.violations.values()), result.objective, result.wall_time)
+
+
+def run_portfolio(
+    problem: Problem,
+    candidates: Optional[List[Strategy]] = None,
+    time_limit: float = DEFAULT_TIME_LIMIT,
+    jobs: Optional[int] = None,
+) -> PortfolioResult:
+    """
+    Solve ``problem`` once per strategy across ``jobs`` processes (default:
+    one per candidate, at most the number of cores) and pick the best
+    feasible candidate: fewest violations, then lowest objective.
+    """
+    candidates = candidates if candidates is not None else strategies()
+    jobs = min(jobs or os.cpu_count() or 1, len(candidates)) or 1
+    deadline = time.time() + time_limit
+    context = multiprocessing.get_context()
+    shared = (context.Value("d", math.inf), context.Event())
+    if jobs == 1:
+        _init(*shared)
+        outcomes = [_solve(problem, s, deadline) for s in candidates]
+    else:
+        with ProcessPoolExecutor(jobs, context, _init, shared) as pool:
+            futures = [pool.submit(_solve, problem, s, deadline) for s in candidates]
+            outcomes = [f.result() for f in futures]
+
+    feasible = [c for c in outcomes if c.result.feasible]
+    best = min(feasible, key=_rank) if feasible else None
+    for candidate in outcomes:
+        if candidate is not best:
+            candidate.result.assignments = []
+    if best is None:
+        for candidate in outcomes:
+            candidate.result.diagnostics = problem.diagnose()
+    return PortfolioResult(outcomes, best)
+
+
+def portfolio_schedule(
+    semester: Optional[str] = None,
+    config: Optional[str] = None,
+    candidates: Optional[List[Strategy]] = None,
+    time_limit: float = DEFAULT_TIME_LIMIT,
+    jobs: Optional[int] = None,
+    write: bool = True,
+) -> PortfolioResult:
+    """
+    Like ``solver.schedule`` but with a portfolio of candidates; the winner
+    replaces the semester's ``scheduled_classes``.
+    """
+    if config:
+        problem = load_problem_from_config(config, semester)
+    else:
+        problem = load_problem(semester)
+    outcome = run_portfolio(problem, candidates, time_limit, jobs)
+    if write and outcome.best is not None:
+        outcome.written = write_schedule(problem, outcome.best.result.assignments)
+    return outcome
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m solver.portfolio")
+    parser.add_argument("--semester")
+    parser.add_argument("--config", help="read the problem from a config.yaml file")
+    parser.add_argument("--candidates", type=int, default=DEFAULT_CANDIDATES)
+    parser.add_argument("--seed", type=int, default=0, help="seed of the first one")
+    parser.add_argument("--jobs", type=int, help="worker processes (default: cores)")
+    parser.add_argument("--time-limit", type=float, default=DEFAULT_TIME_LIMIT)
+    parser.add_argument(
+        "--dry-run", action="store_true", help="do not write the result"
+    )
+    args = parser.parse_args(argv)
+
+    outcome = portfolio_schedule(
+        args.semester,
+        config=args.config,
+        candidates=strategies(args.candidates, args.seed),
+        time_limit=args.time_limit,
+        jobs=args.jobs,
+        write=not args.dry_run,
+    )
+    for candidate in outcome.candidates:
+        result = candidate.result
+        marker = "*" if candidate is outcome.best else " "
+        violated = ", ".join(f"{k}={n}" for k, n in candidate.violations.items())
+        print(
+            f"{marker} {candidate.strategy.label}: {result.status}"
+            f" objective {result.objective} (bound {result.bound})"
+            f" in {result.wall_time:.2f}s"
+            + (f"; violations: {violated}" if violated else "")
+        )
+    if outcome.best is None:
+        for issue in outcome.candidates[0].result.diagnostics:
+            print(f"  - {issue}")
+        return 1
+    if outcome.written:
+        print(f"scheduled meetings written: {outcome.written}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
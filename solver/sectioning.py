@@ -0,0 +1,381 @@
+"""
+Assign the students of each course to its sections, keeping homerooms together.
+
+For every course of a semester, the students taking it (``student_courses``)
+are spread over the course's active ``class_sections`` without exceeding
+``max_students``. A small CP-SAT model per course decides how many students
+of each homeroom go to each section, minimising the number of homeroom
+splits. A min-cost flow then picks the students who move, preferring those
+who are free when the section meets. Busy periods come from courses that
+have a single section, since those meetings are the same for every student.
+Courses are independent, so they are solved in parallel processes. The
+result is written to ``class_enrollments`` for every meeting of the chosen
+section, replacing the course's previous enrollments.
+
+Usage: python -m solver.sectioning [--semester S] [--jobs N] [--dry-run]
+"""
+
+import argparse
+import os
+import time
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import Dict, FrozenSet, List, Optional, Set, Tuple
+
+from ortools.graph.python import min_cost_flow
+from ortools.sat.python import cp_model
+from psycopg2.extras import execute_values
+
+from db import connection
+
+# Objective weights: placing a student beats avoiding a clash, which beats
+# keeping a homeroom in one section.
+UNPLACED_WEIGHT = 1000
+CLASH_WEIGHT = 10
+SPLIT_WEIGHT = 1
+COURSE_TIME_LIMIT = 1.0
+
+
+@dataclass
+class CourseSections:
+    """Input for one course."""
+
+    course_id: int
+    sections: List[Tuple[int, int]]  # (class_section_id, max_students)
+    students: List[Tuple[int, Optional[int]]]  # (student_id, homeroom_id)
+    # Sections each student cannot attend without a clash.
+    clashes: Dict[int, FrozenSet[int]] = field(default_factory=dict)
+
+
+@dataclass
+class Sectioning:
+    """Result for one course."""
+
+    course_id: int
+    sections: Dict[int, int] = field(default_factory=dict)  # student -> section
+    splits: int = 0  # extra sections used by homerooms
+    clashes: int = 0  # students placed in a section that meets while busy
+    unplaced: List[int] = field(default_factory=list)
+
+
+def _greedy_counts(problem: CourseSections, groups: List[List[int]]) -> List[List[int]]:
+    """
+    Largest homeroom first, into the fullest section it fits in whole, else
+    spread over the emptiest sections. Hints (and backs up) the model.
+    """
+    remaining = [capacity for _, capacity in problem.sections]
+    counts = [[0] * len(remaining) for _ in groups]
+    for g in sorted(range(len(groups)), key=lambda g: -len(groups[g])):
+        left = len(groups[g])
+        fits = [s for s, room in enumerate(remaining) if room >= left]
+        order = (
+            [min(fits, key=lambda s: remaining[s])]
+            if fits
+            else sorted(range(len(remaining)), key=lambda s: -remaining[s])
+        )
+        for s in order:
+            take = min(left, remaining[s])
+            counts[g][s] += take
+            remaining[s] -= take
+            left -= take
+            if not left:
+                break
+    return counts
+
+
+def _group_counts(
+    problem: CourseSections, groups: List[List[int]], time_limit: float
+) -> List[List[int]]:
+    """CP-SAT: how many students of each homeroom group go to each section."""
+    model = cp_model.CpModel()
+    sections = problem.sections
+    greedy = _greedy_counts(problem, groups)
+    x, used, over = {}, {}, []
+    for g, students in enumerate(groups):
+        for s, (section_id, capacity) in enumerate(sections):
+            bound = min(len(students), capacity)
+            x[g, s] = model.NewIntVar(0, bound, f"x{g}_{s}")
+            used[g, s] = model.NewBoolVar(f"used{g}_{s}")
+            model.Add(x[g, s] <= bound * used[g, s])
+            model.AddHint(x[g, s], greedy[g][s])
+            model.AddHint(used[g, s], greedy[g][s] > 0)
+            free = sum(
+                section_id not in problem.clashes.get(student, ())
+                for student in students
+            )
+            if free < len(students):
+                # At least x - free of the group's students clash in this section.
+                k = model.NewIntVar(0, len(students), f"k{g}_{s}")
+                model.Add(k >= x[g, s] - free)
+                over.append(k)
+        model.Add(sum(x[g, s] for s in range(len(sections))) <= len(students))
+    for s, (_, capacity) in enumerate(sections):
+        model.Add(sum(x[g, s] for g in range(len(groups))) <= capacity)
+
+    placed = sum(x.values())
+    model.Minimize(
+        UNPLACED_WEIGHT * (sum(len(g) for g in groups) - placed)
+        + CLASH_WEIGHT * sum(over)
+        + SPLIT_WEIGHT * sum(used.values())
+    )
+    solver = cp_model.CpSolver()
+    solver.parameters.max_time_in_seconds = time_limit
+    solver.parameters.num_workers = 1  # courses already run in parallel
+    solver.parameters.relative_gap_limit = 0.02
+    if solver.Solve(model) not in (cp_model.OPTIMAL, cp_model.FEASIBLE):
+        return greedy  # out of time before the first solution
+    return [
+        [solver.Value(x[g, s]) for s in range(len(sections))]
+        for g in range(len(groups))
+    ]
+
+
+def _pick_students(
+    problem: CourseSections, students: List[int], counts: List[int], result: Sectioning
+) -> None:
+    """Min-cost flow: fill each section's quota for one group, avoiding clashes."""
+    flow = min_cost_flow.SimpleMinCostFlow()
+    source, sink = 0, 1
+    first_section = 2 + len(students)
+    spare = first_section + len(problem.sections)  # absorbs unplaced students
+    for i, student in enumerate(students):
+        node = 2 + i
+        flow.add_arc_with_capacity_and_unit_cost(source, node, 1, 0)
+        flow.add_arc_with_capacity_and_unit_cost(node, spare, 1, UNPLACED_WEIGHT)
+        for s, (section_id, _) in enumerate(problem.sections):
+            if counts[s]:
+                clash = section_id in problem.clashes.get(student, ())
+                flow.add_arc_with_capacity_and_unit_cost(
+                    node, first_section + s, 1, CLASH_WEIGHT if clash else 0
+                )
+    for s, count in enumerate(counts):
+        if count:
+            flow.add_arc_with_capacity_and_unit_cost(first_section + s, sink, count, 0)
+    flow.add_arc_with_capacity_and_unit_cost(
+        spare, sink, len(students) - sum(counts), 0
+    )
+    flow.set_node_supply(source, len(students))
+    flow.set_node_supply(sink, -len(students))
+    if flow.solve() != flow.OPTIMAL:
+        raise RuntimeError(f"course {problem.course_id}: student flow failed")
+
+    for arc in range(flow.num_arcs()):
+        tail, head = flow.tail(arc), flow.head(arc)
+        if flow.flow(arc) and 2 <= tail < first_section:
+            student = students[tail - 2]
+            if head == spare:
+                result.unplaced.append(student)
+            else:
+                section_id = problem.sections[head - first_section][0]
+                result.sections[student] = section_id
+                if section_id in problem.clashes.get(student, ()):
+                    result.clashes += 1
+
+
+def assign_course(
+    problem: CourseSections, time_limit: float = COURSE_TIME_LIMIT
+) -> Sectioning:
+    """Assign one course's students to its sections."""
+    result = Sectioning(problem.course_id)
+    if not problem.sections:
+        result.unplaced = sorted(student for student, _ in problem.students)
+        return result
+    by_homeroom: Dict[Optional[int], List[int]] = defaultdict(list)
+    for student, homeroom in sorted(problem.students):
+        by_homeroom[homeroom].append(student)
+    # Students without a homeroom have no group to keep together.
+    loose = by_homeroom.pop(None, [])
+    groups = list(by_homeroom.values()) + [[student] for student in loose]
+
+    counts = _group_counts(problem, groups, time_limit)
+    for students, group_counts in zip(groups, counts):
+        _pick_students(problem, students, group_counts, result)
+    result.splits = sum(
+        max(0, sum(1 for c in group_counts if c) - 1)
+        for group_counts in counts[: len(by_homeroom)]
+    )
+    result.unplaced.sort()
+    return result
+
+
+def load_courses(semester: Optional[str] = None) -> List[CourseSections]:
+    """Read the semester's enrolled students, sections and busy periods."""
+    with connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute(
+                """
+                SELECT id, course_id, max_students FROM class_sections
+                WHERE is_active AND semester IS NOT DISTINCT FROM %s
+                ORDER BY id
+                """,
+                (semester,),
+            )
+            section_rows = cur.fetchall()
+            cur.execute(
+                """
+                SELECT sc.course_id, sc.student_id, s.homeroom_id
+                FROM student_courses sc
+                JOIN students s ON s.id = sc.student_id
+                WHERE sc.semester IS NOT DISTINCT FROM %s
+                  AND sc.enrollment_status = 'enrolled'
+                ORDER BY sc.course_id, sc.student_id
+                """,
+                (semester,),
+            )
+            enrollments = cur.fetchall()
+            cur.execute(
+                """
+                SELECT class_section_id, time_period_id FROM scheduled_classes
+                WHERE semester IS NOT DISTINCT FROM %s
+                  AND class_section_id IS NOT NULL AND time_period_id IS NOT NULL
+                """,
+                (semester,),
+            )
+            meetings = cur.fetchall()
+
+    sections: Dict[int, List[Tuple[int, Optional[int]]]] = defaultdict(list)
+    for section_id, course_id, capacity in section_rows:
+        sections[course_id].append((section_id, capacity))
+    periods: Dict[int, Set[int]] = defaultdict(set)
+    for section_id, period_id in meetings:
+        periods[section_id].add(period_id)
+    students: Dict[int, List[Tuple[int, Optional[int]]]] = defaultdict(list)
+    courses_of: Dict[int, List[int]] = defaultdict(list)
+    for course_id, student_id, homeroom_id in enrollments:
+        students[course_id].append((student_id, homeroom_id))
+        courses_of[student_id].append(course_id)
+
+    def busy(student_id: int, course_id: int) -> Set[int]:
+        return {
+            period
+            for other in courses_of[student_id]
+            if other != course_id and len(sections[other]) == 1
+            for period in periods[sections[other][0][0]]
+        }
+
+    problems = []
+    for course_id in sorted(students):
+        enrolled = students[course_id]
+        # A NULL max_students is unlimited, as in solver.validation.
+        capacities = [
+            (section_id, len(enrolled) if capacity is None else capacity)
+            for section_id, capacity in sections[course_id]
+        ]
+        problem = CourseSections(course_id, capacities, enrolled)
+        if len(problem.sections) > 1:
+            for student_id, _ in problem.students:
+                taken = busy(student_id, course_id)
+                clashing = frozenset(
+                    section_id
+                    for section_id, _ in problem.sections
+                    if not taken.isdisjoint(periods[section_id])
+                )
+                if clashing:
+                    problem.clashes[student_id] = clashing
+        problems.append(problem)
+    return problems
+
+
+def assign_students(
+    problems: List[CourseSections],
+    jobs: Optional[int] = None,
+    time_limit: float = COURSE_TIME_LIMIT,
+) -> List[Sectioning]:
+    """Solve every course, across ``jobs`` processes (default: all cores)."""
+    jobs = jobs or os.cpu_count() or 1
+    if jobs == 1 or len(problems) <= 1:
+        return [assign_course(p, time_limit) for p in problems]
+    with ProcessPoolExecutor(max_workers=min(jobs, len(problems))) as pool:
+        return list(
+            pool.map(assign_course, problems, [time_limit] * len(problems), chunksize=4)
+        )
+
+
+def write_enrollments(semester: Optional[str], results: List[Sectioning]) -> int:
+    """
+    Replace the enrollments of the results' courses for ``semester`` in one
+    transaction. Returns the number of ``class_enrollments`` rows written.
+    """
+    course_ids = [r.course_id for r in results]
+    pairs = [
+        (student, section, semester)
+        for r in results
+        for student, section in r.sections.items()
+    ]
+    with connection() as conn:
+        with conn:
+            with conn.cursor() as cur:
+                cur.execute(
+                    """
+                    DELETE FROM class_enrollments ce
+                    USING scheduled_classes sc, class_sections cs
+                    WHERE ce.scheduled_class_id = sc.id
+                      AND cs.id = sc.class_section_id
+                      AND cs.course_id = ANY(%s)
+                      AND sc.semester IS NOT DISTINCT FROM %s
+                    """,
+                    (course_ids, semester),
+                )
+                written = execute_values(
+                    cur,
+                    """
+                    INSERT INTO class_enrollments (scheduled_class_id, student_id)
+                    SELECT sc.id, v.student_id
+                    FROM (VALUES %s) AS v (student_id, class_section_id, semester)
+                    JOIN scheduled_classes sc
+                      ON sc.class_section_id = v.class_section_id
+                     AND sc.semester IS NOT DISTINCT FROM v.semester
+                    RETURNING 1
+                    """,
+                    pairs,
+                    template="(%s::int, %s::int, %s::varchar)",
+                    page_size=5000,
+                    fetch=True,
+                )
+    return len(written)
+
+
+def section_students(
+    semester: Optional[str] = None,
+    jobs: Optional[int] = None,
+    time_limit: float = COURSE_TIME_LIMIT,
+    write: bool = True,
+) -> List[Sectioning]:
+    """Load, solve and (unless ``write`` is false) store the semester's sections."""
+    results = assign_students(load_courses(semester), jobs, time_limit)
+    if write and results:
+        write_enrollments(semester, results)
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m solver.sectioning")
+    parser.add_argument("--semester")
+    parser.add_argument("--jobs", type=int, help="worker processes (default: cores)")
+    parser.add_argument("--time-limit", type=float, default=COURSE_TIME_LIMIT)
+    parser.add_argument(
+        "--dry-run", action="store_true", help="do not write the result"
+    )
+    args = parser.parse_args(argv)
+    start = time.perf_counter()
+    results = section_students(
+        args.semester, args.jobs, args.time_limit, write=not args.dry_run
+    )
+    placed = sum(len(r.sections) for r in results)
+    unplaced = sum(len(r.unplaced) for r in results)
+    print(
+        f"{len(results)} courses, {placed} placements in {time.perf_counter() - start:.2f}s"
+    )
+    print(f"homeroom splits: {sum(r.splits for r in results)}")
+    print(f"clashes: {sum(r.clashes for r in results)}, unplaced: {unplaced}")
+    for r in results:
+        if r.unplaced:
+            print(
+                f"  - course {r.course_id}: {len(r.unplaced)} students without a seat"
+            )
+    return 1 if unplaced else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,156 @@
+"""
+Back-to-back period pairs of the weekly grid, for double periods.
+
+Two teachable periods form a pair when they are on the same day, the second
+is the next teachable period after the first, and no break separates them:
+no non-teachable ``time_periods`` row (lunch, Monday's flag ceremony, ...)
+lies between them and, when both have times, the gap between them is at
+most ``MAX_BREAK_MINUTES``. Without times, their period numbers must be
+consecutive. The last period of a day (Friday ends early) never pairs.
+
+``SlotTable`` computes the pairs once and answers "does ``b`` directly
+follow ``a``?" with an array lookup, by position in the periods list or by
+``time_periods`` id::
+
+    slots = slots_for(problem)
+    slots.next[a]  # position of the period that directly follows a, or -1
+    slots.adjacent_ids(first_ids, second_ids)  # vectorised, by database id
+"""
+
+from collections import defaultdict
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from db import connection
+from models.time_periods import TimePeriod
+from solver.data import (
+    BREAK_PERIOD_SQL,
+    TEACHABLE_PERIOD_TYPES,
+    TIME_PERIOD_SQL,
+    Problem,
+)
+
+# Longest gap between two periods that still counts as back to back.
+MAX_BREAK_MINUTES = 10
+
+
+def _minutes(value) -> int:
+    return value.hour * 60 + value.minute
+
+
+def _timed(*periods: TimePeriod) -> bool:
+    return all(p.start_time is not None and p.end_time is not None for p in periods)
+
+
+def back_to_back(
+    first: TimePeriod, second: TimePeriod, breaks: Sequence[TimePeriod] = ()
+) -> bool:
+    """Whether ``second`` directly follows ``first`` with no break in between."""
+    if first.day_of_week != second.day_of_week:
+        return False
+    if _timed(first, second):
+        gap = _minutes(second.start_time) - _minutes(first.end_time)
+        if not 0 <= gap <= MAX_BREAK_MINUTES:
+            return False
+    elif second.period_number != first.period_number + 1:
+        return False
+    for pause in breaks:
+        if pause.day_of_week != first.day_of_week:
+            continue
+        if first.period_number < pause.period_number < second.period_number:
+            return False
+        if _timed(first, second, pause) and (
+            pause.start_time < second.start_time and pause.end_time > first.end_time
+        ):
+            return False
+    return True
+
+
+class SlotTable:
+    """
+    Valid back-to-back pairs of ``periods`` (the teachable periods, ordered
+    by day and period number, as in ``Problem.periods``). ``next[a]`` and
+    ``previous[b]`` are positions, -1 where there is no partner; ``pairs``
+    lists every ``(a, b)``.
+    """
+
+    def __init__(
+        self, periods: Sequence[TimePeriod], breaks: Sequence[TimePeriod] = ()
+    ):
+        self.periods = list(periods)
+        self.next = np.full(len(self.periods), -1, dtype=np.intp)
+        self.previous = np.full(len(self.periods), -1, dtype=np.intp)
+        by_day: Dict[int, List[int]] = defaultdict(list)
+        for i, period in enumerate(self.periods):
+            by_day[period.day_of_week].append(i)
+        for indexes in by_day.values():
+            indexes.sort(key=lambda i: self.periods[i].period_number)
+            for a, b in zip(indexes, indexes[1:]):
+                if back_to_back(self.periods[a], self.periods[b], breaks):
+                    self.next[a] = b
+                    self.previous[b] = a
+        self.pairs: List[Tuple[int, int]] = [
+            (a, int(b)) for a, b in enumerate(self.next.tolist()) if b >= 0
+        ]
+        # Dense period id -> id of the period that follows (-1 if none).
+        ids = [p.id for p in self.periods if p.id is not None]
+        self._next_id = np.full(max(ids, default=-1) + 1, -1, dtype=np.int64)
+        for a, b in self.pairs:
+            first, second = self.periods[a].id, self.periods[b].id
+            if first is not None and second is not None:
+                self._next_id[first] = second
+
+    def follows(self, a: int, b: int) -> bool:
+        """Whether position ``b`` directly follows position ``a``."""
+        return self.next[a] == b
+
+    def next_ids(self, period_ids) -> np.ndarray:
+        """Id of the period directly following each of ``period_ids``, or -1."""
+        ids = np.asarray(period_ids, dtype=np.int64)
+        result = np.full(ids.shape, -1, dtype=np.int64)
+        known = (ids >= 0) & (ids < len(self._next_id))
+        result[known] = self._next_id[ids[known]]
+        return result
+
+    def adjacent_ids(self, first_ids, second_ids) -> np.ndarray:
+        """Whether each pair of period ids is back to back, in either order."""
+        first = np.asarray(first_ids, dtype=np.int64)
+        second = np.asarray(second_ids, dtype=np.int64)
+        return ((self.next_ids(first) == second) | (self.next_ids(second) == first)) & (
+            first >= 0
+        )
+
+    def link(self, positions: Sequence[int]) -> List[Tuple[int, int]]:
+        """
+        Pair up the meetings of one section (period positions) into as many
+        back-to-back doubles as possible, earliest first.
+        """
+        meeting = set(positions)
+        pairs, used = [], set()
+        for a in sorted(meeting):
+            b = int(self.next[a])
+            if a not in used and b in meeting and b not in used:
+                pairs.append((a, b))
+                used.update((a, b))
+        return pairs
+
+
+def slots_for(problem: Problem) -> SlotTable:
+    """Return the slot table of ``problem``, building it on first use."""
+    slots = getattr(problem, "_slots", None)
+    if slots is None:
+        slots = problem._slots = SlotTable(problem.periods, problem.breaks)
+    return slots
+
+
+def load_slots(period_types: Optional[Sequence[str]] = None) -> SlotTable:
+    """Build the slot table of the database's active ``time_periods``."""
+    types = list(period_types or TEACHABLE_PERIOD_TYPES)
+    with connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute(TIME_PERIOD_SQL, (types,))
+            periods = [TimePeriod(*row) for row in cur.fetchall()]
+            cur.execute(BREAK_PERIOD_SQL, (types,))
+            breaks = [TimePeriod(*row) for row in cur.fetchall()]
+    return SlotTable(periods, breaks)
@@ -0,0 +1,286 @@
+"""
+Compact in-memory timetables for comparing many candidate schedules.
+
+A ``CompactTimetable`` stores one meeting per position in a struct of NumPy
+arrays: the ``scheduled_classes`` row id plus the section, teacher, facility
+and period of the meeting as small integer codes. Codes are assigned by
+``Codebook`` objects shared by every timetable of a ``Universe``, so a
+candidate costs a few bytes per meeting and no Python object per meeting.
+
+Columns are split into pages of ``PAGE_SIZE`` meetings and ``snapshot()``
+is copy-on-write per page: the copy shares every page with its source, and
+a page is duplicated only when one of them first changes it. A candidate
+that moves a handful of meetings therefore costs its page tables (one
+pointer per page) plus the few pages it touched::
+
+    base = CompactTimetable.load("2025A")
+    candidate = base.snapshot()
+    candidate.move(17, period_id=42)
+    base.diff(candidate)  # -> array([17])
+"""
+
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from db import connection
+from solver.data import Problem
+
+MISSING = -1  # code of a NULL teacher, facility or period
+PAGE_SIZE = 256  # meetings per copy-on-write page
+_COLUMNS = ("sections", "teachers", "facilities", "periods")
+
+Row = Tuple[Optional[int], Optional[int], Optional[int], Optional[int], Optional[int]]
+
+
+class Codebook:
+    """Interns database ids as dense codes ``0, 1, 2, ...``; ``None`` is ``MISSING``."""
+
+    __slots__ = ("_ids", "_codes", "_table")
+
+    def __init__(self, ids: Iterable[int] = ()):
+        self._ids: List[int] = []
+        self._codes: Dict[int, int] = {}
+        self._table: Optional[np.ndarray] = None
+        for id_ in ids:
+            self.code(id_)
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    @property
+    def dtype(self) -> np.dtype:
+        """Smallest signed integer type holding every code and ``MISSING``."""
+        return np.min_scalar_type(-max(len(self._ids), 1))
+
+    def code(self, id_: Optional[int]) -> int:
+        if id_ is None:
+            return MISSING
+        code = self._codes.get(id_)
+        if code is None:
+            code = self._codes[id_] = len(self._ids)
+            self._ids.append(id_)
+            self._table = None
+        return code
+
+    def encode(self, ids: Iterable[Optional[int]]) -> np.ndarray:
+        return np.fromiter((self.code(i) for i in ids), dtype=np.int64)
+
+    def decode(self, codes: np.ndarray) -> np.ndarray:
+        """Ids of ``codes`` as an int64 array; ``MISSING`` stays -1."""
+        if self._table is None:
+            self._table = np.array(self._ids + [MISSING], dtype=np.int64)
+        return self._table[codes]  # code -1 picks the trailing MISSING
+
+
+class Universe:
+    """The codebooks shared by the timetables of one semester."""
+
+    __slots__ = ("semester", "sections", "teachers", "facilities", "periods")
+
+    def __init__(self, semester: Optional[str] = None):
+        self.semester = semester
+        self.sections = Codebook()
+        self.teachers = Codebook()
+        self.facilities = Codebook()
+        self.periods = Codebook()
+
+
+class CompactTimetable:
+    """
+    Meetings of one semester as parallel columns of codes (see the module
+    docstring). ``row_ids`` is -1 for meetings not yet written. The column
+    attributes return fresh arrays; change meetings through ``assign`` and
+    ``move``.
+    """
+
+    __slots__ = ("universe", "row_ids", "_pages", "_owned")
+
+    def __init__(
+        self,
+        universe: Universe,
+        row_ids: np.ndarray,
+        sections: np.ndarray,
+        teachers: np.ndarray,
+        facilities: np.ndarray,
+        periods: np.ndarray,
+    ):
+        self.universe = universe
+        self.row_ids = np.asarray(row_ids, dtype=np.int64)
+        self.row_ids.flags.writeable = False  # shared by every snapshot
+        self._pages: Dict[str, List[np.ndarray]] = {}
+        for name, column in zip(_COLUMNS, (sections, teachers, facilities, periods)):
+            column = np.asarray(column, dtype=getattr(universe, name).dtype)
+            self._pages[name] = [
+                column[start : start + PAGE_SIZE].copy()
+                for start in range(0, len(column), PAGE_SIZE)
+            ]
+        # Pages this timetable may write in place, by column.
+        self._owned: Dict[str, set] = {
+            name: set(range(len(pages))) for name, pages in self._pages.items()
+        }
+
+    def __len__(self) -> int:
+        return len(self.row_ids)
+
+    @classmethod
+    def from_rows(
+        cls, rows: Iterable[Row], universe: Optional[Universe] = None
+    ) -> "CompactTimetable":
+        """
+        Build from ``(id, class_section_id, teacher_id, facility_id,
+        time_period_id)`` tuples, the layout of ``to_rows()``.
+        """
+        universe = universe if universe is not None else Universe()
+        columns = list(zip(*rows)) or [()] * 5
+        return cls(
+            universe,
+            np.fromiter((MISSING if r is None else r for r in columns[0]), np.int64),
+            universe.sections.encode(columns[1]),
+            universe.teachers.encode(columns[2]),
+            universe.facilities.encode(columns[3]),
+            universe.periods.encode(columns[4]),
+        )
+
+    @classmethod
+    def load(
+        cls, semester: Optional[str] = None, universe: Optional[Universe] = None
+    ) -> "CompactTimetable":
+        """Read the semester's ``scheduled_classes`` rows, in id order."""
+        with connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute(
+                    """
+                    SELECT id, class_section_id, teacher_id, facility_id,
+                           time_period_id
+                    FROM scheduled_classes
+                    WHERE semester IS NOT DISTINCT FROM %s
+                    ORDER BY id
+                    """,
+                    (semester,),
+                )
+                rows = cur.fetchall()
+        if universe is None:
+            universe = Universe(semester)
+        return cls.from_rows(rows, universe)
+
+    @classmethod
+    def from_assignments(
+        cls, problem: Problem, assignments: Sequence, universe: Universe
+    ) -> "CompactTimetable":
+        """
+        Build from solver ``Assignment``s (indexes into ``problem.sections``
+        and ``problem.periods``, which must have database ids).
+        """
+        if any(s.id is None for s in problem.sections) or any(
+            p.id is None for p in problem.periods
+        ):
+            raise ValueError("Sections and periods need ids; write the schedule first")
+        section_codes = universe.sections.encode(s.id for s in problem.sections)
+        period_codes = universe.periods.encode(p.id for p in problem.periods)
+        sections = np.fromiter((a.section for a in assignments), np.int64)
+        periods = np.fromiter((a.period for a in assignments), np.int64)
+        return cls(
+            universe,
+            np.full(len(sections), MISSING, dtype=np.int64),
+            section_codes[sections],
+            universe.teachers.encode(a.teacher_id for a in assignments),
+            universe.facilities.encode(a.facility_id for a in assignments),
+            period_codes[periods],
+        )
+
+    def column(self, name: str) -> np.ndarray:
+        """The codes of ``name`` (``"sections"``, ``"teachers"``, ...) as one array."""
+        pages = self._pages[name]
+        if not pages:
+            return np.empty(0, dtype=getattr(self.universe, name).dtype)
+        return np.concatenate(pages)
+
+    sections = property(lambda self: self.column("sections"))
+    teachers = property(lambda self: self.column("teachers"))
+    facilities = property(lambda self: self.column("facilities"))
+    periods = property(lambda self: self.column("periods"))
+
+    def ids(self, name: str) -> np.ndarray:
+        """Database ids of column ``name``; -1 where NULL."""
+        return getattr(self.universe, name).decode(self.column(name))
+
+    def to_rows(self) -> Iterator[Row]:
+        """Yield ``(id, class_section_id, teacher_id, facility_id, time_period_id)``."""
+        columns = [self.row_ids] + [self.ids(name) for name in _COLUMNS]
+        for values in zip(*(c.tolist() for c in columns)):
+            yield tuple(None if v == MISSING else v for v in values)
+
+    def snapshot(self) -> "CompactTimetable":
+        """A copy that shares every page until either side changes it."""
+        copy = object.__new__(CompactTimetable)
+        copy.universe = self.universe
+        copy.row_ids = self.row_ids
+        copy._pages = {name: list(pages) for name, pages in self._pages.items()}
+        copy._owned = {name: set() for name in _COLUMNS}
+        self._owned = {name: set() for name in _COLUMNS}
+        return copy
+
+    def assign(self, positions, **ids) -> None:
+        """
+        Set ``sections``, ``teachers``, ``facilities`` and/or ``periods`` (as
+        database ids, ``None`` for NULL) at ``positions``; a scalar id
+        applies to every position.
+        """
+        positions = np.atleast_1d(np.asarray(positions, dtype=np.int64))
+        pages_of = positions // PAGE_SIZE
+        for name, values in ids.items():
+            if name not in _COLUMNS:
+                raise ValueError(f"Unknown timetable column {name!r}")
+            book: Codebook = getattr(self.universe, name)
+            codes = np.broadcast_to(
+                book.encode(values) if np.ndim(values) else book.code(values),
+                positions.shape,
+            )
+            pages, owned = self._pages[name], self._owned[name]
+            for page in np.unique(pages_of).tolist():
+                current = pages[page]
+                dtype = np.promote_types(current.dtype, book.dtype)
+                if page not in owned or dtype != current.dtype:
+                    pages[page] = current = current.astype(dtype)  # a private copy
+                    owned.add(page)
+                here = pages_of == page
+                current[positions[here] - page * PAGE_SIZE] = codes[here]
+
+    def move(
+        self,
+        position: int,
+        period_id: Optional[int] = None,
+        teacher_id: Optional[int] = None,
+        facility_id: Optional[int] = None,
+    ) -> None:
+        """Change the period, teacher and/or facility of one meeting."""
+        changes = {
+            "periods": period_id,
+            "teachers": teacher_id,
+            "facilities": facility_id,
+        }
+        self.assign(position, **{k: v for k, v in changes.items() if v is not None})
+
+    def diff(self, other: "CompactTimetable") -> np.ndarray:
+        """Positions whose meeting differs between two timetables of a universe."""
+        if other.universe is not self.universe or len(other) != len(self):
+            raise ValueError("Timetables are not comparable")
+        changed = np.zeros(len(self), dtype=bool)
+        for name in _COLUMNS:
+            for page, (mine, theirs) in enumerate(
+                zip(self._pages[name], other._pages[name])
+            ):
+                if mine is not theirs:  # shared pages are equal
+                    start = page * PAGE_SIZE
+                    changed[start : start + len(mine)] |= mine != theirs
+        return np.flatnonzero(changed)
+
+    @property
+    def nbytes(self) -> int:
+        """Bytes held by this timetable alone: its page tables and private pages."""
+        total = 0
+        for name, pages in self._pages.items():
+            total += 8 * len(pages)
+            total += sum(pages[page].nbytes for page in self._owned[name])
+        return total
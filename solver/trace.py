@@ -0,0 +1,225 @@
+"""
+Progress and profiling trace of one scheduling run.
+
+``solver.schedule(..., trace=Trace(...))`` records the wall time and peak
+memory of each pipeline stage (``load``, ``feasibility``, ``build``,
+``solve``, ``write``), the model size, and every intermediate solution and
+bound improvement CP-SAT reports while searching. The trace is written as
+JSON and as a Prometheus text exposition file after every stage and, at
+most once per ``flush_interval``, during the search, so a long solve can be
+watched from outside (``python -m solver --trace-json run.json
+--metrics run.prom``).
+
+Peak memory is the process's peak resident set size, which includes the
+solver's native allocations; it only ever grows, so a stage's value is the
+peak reached by the end of that stage.
+"""
+
+import json
+import os
+import resource
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass
+from typing import Dict, List, Optional
+
+from ortools.sat.python import cp_model
+
+PREFIX = "timetable"
+
+
+@dataclass
+class Stage:
+    name: str
+    seconds: float
+    peak_rss_bytes: int
+
+
+@dataclass
+class Progress:
+    seconds: float  # since the solve stage started
+    objective: Optional[float]
+    bound: float
+    kind: str  # "solution" or "bound"
+
+
+def peak_rss() -> int:
+    """Peak resident set size of this process, in bytes."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024  # Linux: KiB
+
+
+def _write_atomically(path: str, text: str) -> None:
+    # Readers (and scrapers) never see a half-written file.
+    tmp = f"{path}.tmp"
+    with open(tmp, "w") as f:
+        f.write(text)
+    os.replace(tmp, path)
+
+
+class _Solutions(cp_model.CpSolverSolutionCallback):
+    def __init__(self, trace: "Trace"):
+        super().__init__()
+        self.trace = trace
+
+    def on_solution_callback(self) -> None:
+        self.trace.record(self.ObjectiveValue(), self.BestObjectiveBound(), "solution")
+
+
+class Trace:
+    """Collects one run's stages, model size and search progress."""
+
+    def __init__(
+        self,
+        semester: Optional[str] = None,
+        json_path: Optional[str] = None,
+        prometheus_path: Optional[str] = None,
+        flush_interval: float = 1.0,
+    ):
+        self.semester = semester
+        self.json_path = json_path
+        self.prometheus_path = prometheus_path
+        self.flush_interval = flush_interval
+        self.started = time.time()
+        self.stages: List[Stage] = []
+        self.current: Optional[str] = None
+        self.model: Dict[str, int] = {}
+        self.progress: List[Progress] = []
+        self.status: Optional[str] = None
+        self.search: Dict[str, float] = {}
+        self._search_start = time.perf_counter()
+        self._flushed = 0.0
+        self._lock = threading.Lock()  # callbacks may come from solver threads
+
+    @contextmanager
+    def stage(self, name: str):
+        """Time the block as stage ``name``; flush the files when it ends."""
+        self.current = name
+        if name == "solve":
+            self._search_start = time.perf_counter()
+        self.flush(force=True)
+        start = time.perf_counter()
+        try:
+            yield self
+        finally:
+            self.stages.append(Stage(name, time.perf_counter() - start, peak_rss()))
+            self.current = None
+            self.flush(force=True)
+
+    def model_size(self, variables: int, constraints: int) -> None:
+        self.model = {"variables": variables, "constraints": constraints}
+
+    def attach(self, solver: cp_model.CpSolver) -> cp_model.CpSolverSolutionCallback:
+        """
+        Record bound improvements of ``solver``; returns the solution
+        callback to pass to ``solver.Solve``.
+        """
+        solver.best_bound_callback = lambda bound: self.record(None, bound, "bound")
+        return _Solutions(self)
+
+    def record(self, objective: Optional[float], bound: float, kind: str) -> None:
+        seconds = time.perf_counter() - self._search_start
+        with self._lock:
+            self.progress.append(Progress(seconds, objective, bound, kind))
+            self.flush()
+
+    def finish(self, solver: cp_model.CpSolver, status: int) -> None:
+        """Keep the final status and search statistics of ``solver``."""
+        self.status = solver.StatusName(status)
+        self.search = {
+            "conflicts": solver.NumConflicts(),
+            "branches": solver.NumBranches(),
+            "deterministic_time": solver.response_proto.deterministic_time,
+        }
+
+    @property
+    def objective(self) -> Optional[float]:
+        solutions = [p.objective for p in self.progress if p.kind == "solution"]
+        return solutions[-1] if solutions else None
+
+    @property
+    def bound(self) -> Optional[float]:
+        return self.progress[-1].bound if self.progress else None
+
+    def to_dict(self) -> dict:
+        return {
+            "semester": self.semester,
+            "started": self.started,
+            "current_stage": self.current,
+            "stages": [asdict(s) for s in self.stages],
+            "model": self.model,
+            "progress": [asdict(p) for p in self.progress],
+            "status": self.status,
+            "search": self.search,
+        }
+
+    def to_prometheus(self) -> str:
+        """The trace's latest values in the Prometheus text format."""
+        labels = f'semester="{self.semester or ""}"'
+        lines = []
+
+        def metric(name, kind, help_, samples):
+            lines.append(f"# HELP {PREFIX}_{name} {help_}")
+            lines.append(f"# TYPE {PREFIX}_{name} {kind}")
+            for extra, value in samples:
+                label = ",".join(filter(None, (labels, extra)))
+                lines.append(f"{PREFIX}_{name}{{{label}}} {value}")
+
+        metric(
+            "stage_seconds",
+            "gauge",
+            "Wall time of each pipeline stage.",
+            [(f'stage="{s.name}"', s.seconds) for s in self.stages],
+        )
+        metric(
+            "stage_peak_rss_bytes",
+            "gauge",
+            "Peak resident memory at the end of each stage.",
+            [(f'stage="{s.name}"', s.peak_rss_bytes) for s in self.stages],
+        )
+        if self.current:
+            metric(
+                "stage_running",
+                "gauge",
+                "1 for the stage in progress.",
+                [(f'stage="{self.current}"', 1)],
+            )
+        metric(
+            "model_size",
+            "gauge",
+            "Variables and constraints of the CP-SAT model.",
+            [(f'kind="{k}"', v) for k, v in self.model.items()],
+        )
+        metric(
+            "solutions_total",
+            "counter",
+            "Improving solutions found by the search.",
+            [("", sum(1 for p in self.progress if p.kind == "solution"))],
+        )
+        for name, help_, value in (
+            ("objective", "Objective of the best solution so far.", self.objective),
+            ("bound", "Best proven objective bound so far.", self.bound),
+        ):
+            if value is not None:
+                metric(name, "gauge", help_, [("", value)])
+        if self.status:
+            metric(
+                "solve_status",
+                "gauge",
+                "Final solver status.",
+                [(f'status="{self.status}"', 1)],
+            )
+        return "\n".join(lines) + "\n"
+
+    def flush(self, force: bool = False) -> None:
+        """Write the output files (throttled unless ``force``)."""
+        now = time.perf_counter()
+        if not force and now - self._flushed < self.flush_interval:
+            return
+        self._flushed = now
+        if self.json_path:
+            _write_atomically(self.json_path, json.dumps(self.to_dict(), indent=2))
+        if self.prometheus_path:
+            _write_atomically(self.prometheus_path, self.to_prometheus())
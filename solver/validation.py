@@ -0,0 +1,332 @@
+"""
+Hard-constraint audit of an existing timetable.
+
+The semester's ``scheduled_classes`` and ``class_enrollments`` are loaded into
+NumPy arrays once and every rule is checked with array operations over
+occupancy counts, so only actual violations are visited in Python.
+
+Rows only clash when their teaching weeks overlap, as in the exclusion
+constraints of ``migrations/003``: an A-week and a B-week row may share a
+teacher, facility or student in the same period.
+
+Usage: python -m solver.validation [--semester S]
+"""
+
+import argparse
+from dataclasses import dataclass, field
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from db import connection
+from solver.feasibility import FeasibilityIndex, load_index
+from solver.slots import SlotTable, load_slots
+
+TEACHER_CLASH = "teacher_double_booked"
+FACILITY_CLASH = "facility_double_booked"
+STUDENT_CLASH = "student_clash"
+TEACHER_OVERLOAD = "teacher_over_limit"
+SECTION_OVERFULL = "section_over_capacity"
+INTERNATIONAL_EDGE = "international_edge_period"
+NOT_ALLOWED = "teacher_not_allowed"
+BROKEN_DOUBLE = "double_period_not_consecutive"
+
+# Bit w - 1 is set for teaching week w (weeks 1 to 53, see week_pattern_weeks).
+ALL_WEEKS = (1 << 53) - 1
+
+
+@dataclass
+class Violation:
+    kind: str
+    row_ids: Tuple[int, ...]  # scheduled_classes ids involved
+    message: str
+
+
+@dataclass
+class Timetable:
+    """
+    Column arrays for one semester. Per-meeting arrays are aligned with
+    ``row_ids``; ``enrollment_rows`` holds positions into them. A missing
+    facility is stored as -1. ``linked_ids`` holds each row's
+    ``linked_period_id`` (-1 when unlinked); ``None`` skips the check.
+    ``weeks`` holds each row's teaching weeks as a bit mask (``ALL_WEEKS``
+    for every week); ``None`` means every row meets every week.
+    """
+
+    row_ids: np.ndarray
+    section_ids: np.ndarray
+    course_ids: np.ndarray
+    teacher_ids: np.ndarray
+    facility_ids: np.ndarray
+    period_ids: np.ndarray
+    enrollment_rows: np.ndarray
+    enrollment_students: np.ndarray
+    section_max: dict = field(default_factory=dict)
+    teacher_max: dict = field(default_factory=dict)
+    international: frozenset = frozenset()
+    linked_ids: Optional[np.ndarray] = None
+    weeks: Optional[np.ndarray] = None
+
+
+def _ints(values) -> np.ndarray:
+    return np.fromiter((-1 if v is None else v for v in values), dtype=np.int64)
+
+
+def load_timetable(semester: Optional[str] = None) -> Timetable:
+    """Read the semester's meetings, enrollments and limits into arrays."""
+    with connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute(
+                """
+                SELECT sc.id, sc.class_section_id, cs.course_id, sc.teacher_id,
+                       sc.facility_id, sc.time_period_id, sc.linked_period_id,
+                       (SELECT coalesce(sum(1::bigint << (w - 1)), 0)::bigint
+                        FROM unnest(sc.weeks) r,
+                             generate_series(lower(r), upper(r) - 1) w)
+                FROM scheduled_classes sc
+                LEFT JOIN class_sections cs ON cs.id = sc.class_section_id
+                WHERE sc.semester IS NOT DISTINCT FROM %s
+                ORDER BY sc.id
+                """,
+                (semester,),
+            )
+            rows = cur.fetchall()
+            cur.execute(
+                """
+                SELECT ce.scheduled_class_id, ce.student_id
+                FROM class_enrollments ce
+                JOIN scheduled_classes sc ON sc.id = ce.scheduled_class_id
+                WHERE sc.semester IS NOT DISTINCT FROM %s
+                """,
+                (semester,),
+            )
+            enrollments = cur.fetchall()
+            cur.execute("SELECT id, max_students FROM class_sections")
+            section_max = dict(cur.fetchall())
+            cur.execute(
+                "SELECT id, max_periods_per_week, is_international FROM teachers"
+            )
+            teachers = cur.fetchall()
+
+    columns = list(zip(*rows)) if rows else [()] * 8
+    row_ids = _ints(columns[0])
+    position = {rid: i for i, rid in enumerate(row_ids.tolist())}
+    return Timetable(
+        row_ids=row_ids,
+        section_ids=_ints(columns[1]),
+        course_ids=_ints(columns[2]),
+        teacher_ids=_ints(columns[3]),
+        facility_ids=_ints(columns[4]),
+        period_ids=_ints(columns[5]),
+        enrollment_rows=np.fromiter(
+            (position[e[0]] for e in enrollments), dtype=np.int64
+        ),
+        enrollment_students=np.fromiter((e[1] for e in enrollments), dtype=np.int64),
+        section_max=section_max,
+        teacher_max={t: limit for t, limit, _ in teachers},
+        international=frozenset(t for t, _, intl in teachers if intl),
+        linked_ids=_ints(columns[6]),
+        weeks=_ints(columns[7]),
+    )
+
+
+def _duplicates(keys: np.ndarray, weeks: Optional[np.ndarray] = None):
+    """
+    Groups of positions whose key occurs more than once (ignores keys < 0).
+    With ``weeks``, a position only stays in its group if its weeks overlap
+    another member's.
+    """
+    valid = np.flatnonzero(keys >= 0)
+    order = valid[np.argsort(keys[valid], kind="stable")]
+    _, starts, counts = np.unique(keys[order], return_index=True, return_counts=True)
+    group = np.repeat(np.arange(len(starts)), counts)
+    keep = counts[group] > 1
+    if weeks is not None:
+        masks = weeks[order]
+        partial = masks != ALL_WEEKS
+        # Groups of rows that all meet every week clash as they are.
+        mixed = np.bincount(group[keep & partial], minlength=len(starts)) > 0
+        rows = np.flatnonzero(keep & mixed[group])
+        if len(rows):
+            bits = np.unpackbits(
+                masks[rows].astype("<i8").view(np.uint8).reshape(-1, 8),
+                axis=1,
+                bitorder="little",
+            )
+            first = np.flatnonzero(np.r_[True, np.diff(group[rows]) != 0])
+            per_week = np.add.reduceat(bits, first, axis=0, dtype=np.int32)
+            segment = np.cumsum(np.r_[False, np.diff(group[rows]) != 0])
+            keep[rows] = ((per_week[segment] > 1) & (bits > 0)).any(axis=1)
+    if not keep.any():
+        return []
+    kept = group[keep]
+    return np.split(order[keep], np.flatnonzero(np.diff(kept)) + 1)
+
+
+def _occupancy_keys(owner: np.ndarray, period: np.ndarray) -> np.ndarray:
+    """Encode (owner, period) cells of an owners × periods matrix; -1 if unset."""
+    _, owner_pos = np.unique(owner, return_inverse=True)
+    _, period_pos = np.unique(period, return_inverse=True)
+    keys = owner_pos.astype(np.int64) * (period_pos.max(initial=0) + 1) + period_pos
+    keys[(owner < 0) | (period < 0)] = -1
+    return keys
+
+
+def clash_groups(
+    owner: np.ndarray, period: np.ndarray, weeks: Optional[np.ndarray] = None
+) -> List[np.ndarray]:
+    """
+    Groups of positions booking the same owner in the same period in
+    overlapping weeks (``weeks`` as in ``Timetable.weeks``).
+    """
+    return _duplicates(_occupancy_keys(owner, period), weeks)
+
+
+def _broken_doubles(tt: Timetable, slots: SlotTable) -> List[Violation]:
+    """Linked rows that are not the same section in back-to-back periods."""
+    rows = np.flatnonzero(tt.linked_ids >= 0)
+    position = {rid: i for i, rid in enumerate(tt.row_ids.tolist())}
+    partners = np.fromiter(
+        (position.get(rid, -1) for rid in tt.linked_ids[rows].tolist()),
+        dtype=np.int64,
+        count=len(rows),
+    )
+    found = partners >= 0
+    ok = np.zeros(len(rows), dtype=bool)
+    ok[found] = (
+        tt.section_ids[rows[found]] == tt.section_ids[partners[found]]
+    ) & slots.adjacent_ids(tt.period_ids[rows[found]], tt.period_ids[partners[found]])
+    violations, seen = [], set()
+    for i, j in zip(rows[~ok].tolist(), partners[~ok].tolist()):
+        pair = tuple(sorted({int(tt.row_ids[i]), int(tt.linked_ids[i])}))
+        if pair not in seen:
+            seen.add(pair)
+            violations.append(
+                Violation(
+                    BROKEN_DOUBLE,
+                    pair,
+                    f"double period {pair[0]}/{pair[1]} is not back to back"
+                    " in one section",
+                )
+            )
+    return violations
+
+
+def validate(
+    tt: Timetable,
+    index: Optional[FeasibilityIndex] = None,
+    slots: Optional[SlotTable] = None,
+) -> List[Violation]:
+    """Check every hard constraint and return the violations found."""
+    violations: List[Violation] = []
+    ids = tt.row_ids
+
+    for owner, kind, label in (
+        (tt.teacher_ids, TEACHER_CLASH, "teacher"),
+        (tt.facility_ids, FACILITY_CLASH, "facility"),
+    ):
+        for group in clash_groups(owner, tt.period_ids, tt.weeks):
+            violations.append(
+                Violation(
+                    kind,
+                    tuple(ids[group].tolist()),
+                    f"{label} {owner[group[0]]} booked {len(group)} times"
+                    f" in period {tt.period_ids[group[0]]}",
+                )
+            )
+
+    student_periods = tt.period_ids[tt.enrollment_rows]
+    student_weeks = tt.weeks[tt.enrollment_rows] if tt.weeks is not None else None
+    for group in clash_groups(tt.enrollment_students, student_periods, student_weeks):
+        rows = tt.enrollment_rows[group]
+        violations.append(
+            Violation(
+                STUDENT_CLASH,
+                tuple(ids[rows].tolist()),
+                f"student {tt.enrollment_students[group[0]]} has {len(group)}"
+                f" classes in period {student_periods[group[0]]}",
+            )
+        )
+
+    teachers, loads = np.unique(tt.teacher_ids[tt.teacher_ids >= 0], return_counts=True)
+    limits = np.array(
+        [tt.teacher_max.get(int(t)) or np.iinfo(np.int64).max for t in teachers],
+        dtype=np.int64,
+    )
+    over = loads > limits
+    for t, load, limit in zip(teachers[over], loads[over], limits[over]):
+        violations.append(
+            Violation(
+                TEACHER_OVERLOAD,
+                tuple(ids[tt.teacher_ids == t].tolist()),
+                f"teacher {t} teaches {load} periods, limit {limit}",
+            )
+        )
+
+    sections = tt.section_ids[tt.enrollment_rows]
+    pairs = np.unique(np.stack([sections, tt.enrollment_students], axis=1), axis=0)
+    section_list, sizes = np.unique(pairs[:, 0], return_counts=True)
+    capacity = np.array(
+        [tt.section_max.get(int(s)) or np.iinfo(np.int64).max for s in section_list],
+        dtype=np.int64,
+    )
+    over = sizes > capacity
+    for s, size, cap in zip(section_list[over], sizes[over], capacity[over]):
+        violations.append(
+            Violation(
+                SECTION_OVERFULL,
+                tuple(ids[tt.section_ids == s].tolist()),
+                f"section {s} has {size} students, maximum {cap}",
+            )
+        )
+
+    index = index if index is not None else load_index()
+    allowed = index.lookup(tt.teacher_ids, tt.course_ids, tt.period_ids)
+    positions = index.period_positions(tt.period_ids)
+    edge = np.zeros(len(positions), dtype=bool)
+    edge[positions >= 0] = index.edges[positions[positions >= 0]]
+    at_edge = edge & np.isin(tt.teacher_ids, list(tt.international))
+    for i in np.flatnonzero(at_edge):
+        violations.append(
+            Violation(
+                INTERNATIONAL_EDGE,
+                (int(ids[i]),),
+                f"international teacher {tt.teacher_ids[i]} in first/last period"
+                f" {tt.period_ids[i]}",
+            )
+        )
+    for i in np.flatnonzero(~allowed & ~at_edge):
+        violations.append(
+            Violation(
+                NOT_ALLOWED,
+                (int(ids[i]),),
+                f"teacher {tt.teacher_ids[i]} may not teach course {tt.course_ids[i]}"
+                f" in period {tt.period_ids[i]}",
+            )
+        )
+
+    if tt.linked_ids is not None and (tt.linked_ids >= 0).any():
+        violations += _broken_doubles(tt, slots if slots is not None else load_slots())
+    return violations
+
+
+def validate_semester(semester: Optional[str] = None) -> List[Violation]:
+    """Load and validate the timetable of ``semester``."""
+    return validate(load_timetable(semester))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m solver.validation")
+    parser.add_argument("--semester")
+    args = parser.parse_args(argv)
+    violations = validate_semester(args.semester)
+    for v in violations:
+        print(
+            f"{v.kind}: {v.message} (scheduled_classes {', '.join(map(str, v.row_ids))})"
+        )
+    print(f"{len(violations)} violations")
+    return 1 if violations else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -1,7 +1,7 @@
 import os
 import sys
 import pytest
-from db import init_db, get_connection
+from db import get_connection, init_db, reset_db
 
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 
@@ -12,14 +12,18 @@ def db_env(monkeypatch):
     monkeypatch.setenv("POSTGRES_PASSWORD", "postgres")
     monkeypatch.setenv("POSTGRES_HOST", "localhost")
     monkeypatch.setenv("POSTGRES_PORT", "5432")
+    # Creates the schema on the first run (or when schema.sql changes);
+    # afterwards only the rows are cleared between tests.
     init_db()
-    # clean tables between tests
+    reset_db()
+
+
+def execute(sql, params=()):
+    """Run one statement on a fresh connection; return its rows, if any."""
     conn = get_connection()
     try:
-        with conn:
-            with conn.cursor() as cur:
-                cur.execute(
-                    "TRUNCATE TABLE students, teachers, courses, time_periods, class_sections, facilities RESTART IDENTITY CASCADE;"
-                )
+        with conn.cursor() as cur:
+            cur.execute(sql, params)
+            return cur.fetchall() if cur.description else None
     finally:
         conn.close()
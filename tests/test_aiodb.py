@@ -0,0 +1,60 @@
+import asyncio
+from datetime import time
+
+from psycopg2.extras import Json
+
+import aiodb
+from db import add_student
+from models.courses import create_course
+from models.teachers import create_teacher
+from models.time_periods import create_time_period
+
+
+def test_async_getters_return_the_same_dataclasses():
+    teacher = create_teacher("Alice", unavailable_periods=Json({"1": [2]}))
+    course = create_course("C1", "Chemistry", 4)
+    period = create_time_period(
+        1, day_of_week=1, start_time=time(8), end_time=time(8, 40)
+    )
+    student = add_student("S1", "Ann", 10)
+
+    async def lookups():
+        try:
+            return await asyncio.gather(
+                aiodb.get_teacher(teacher.id),
+                aiodb.get_course(course.id),
+                aiodb.get_time_period(period.id),
+                aiodb.get_student("S1"),
+                aiodb.get_teacher(10_000),
+                aiodb.get_students(),
+            )
+        finally:
+            await aiodb.close_pool()
+
+    got_teacher, got_course, got_period, got_student, missing, students = asyncio.run(
+        lookups()
+    )
+    assert (got_teacher, got_course, got_period) == (teacher, course, period)
+    assert got_teacher.unavailable_periods == {"1": [2]}
+    assert got_student == student
+    assert missing is None
+    assert students == [student]
+
+
+def test_concurrent_requests_share_one_pool(monkeypatch):
+    monkeypatch.setenv("POSTGRES_POOL_MAX", "3")
+    course = create_course("C1", "Chemistry", 4)
+
+    async def burst():
+        try:
+            results = await asyncio.gather(
+                *(aiodb.get_course(course.id) for _ in range(50))
+            )
+            pool = await aiodb.get_pool()
+            return results, pool.get_max_size()
+        finally:
+            await aiodb.close_pool()
+
+    results, size = asyncio.run(burst())
+    assert results == [course] * 50
+    assert size == 3
@@ -0,0 +1,59 @@
+from psycopg2.extras import Json
+
+from models.class_sections import ClassSection, create_class_sections
+from models.courses import Course, create_courses, get_course
+from models.facilities import Facility, create_facilities, delete_facilities
+from models.teachers import Teacher, create_teachers, get_teacher, update_teachers
+from models.time_periods import (
+    create_time_periods,
+    delete_time_periods,
+    get_time_period,
+    update_time_periods,
+)
+from solver.data import default_week
+
+
+def test_create_week_of_time_periods_in_pages():
+    week = default_week()
+    created = create_time_periods(week, page_size=10)
+    assert len(created) == len(week) == 44
+    assert [(p.day_of_week, p.period_number) for p in created] == [
+        (p.day_of_week, p.period_number) for p in week
+    ]
+    assert get_time_period(created[-1].id) == created[-1]
+
+    ids = [p.id for p in created if p.day_of_week == 5]
+    updated = update_time_periods(ids, is_active=False)
+    assert [p.id for p in updated] == sorted(ids)
+    assert all(not p.is_active for p in updated)
+    assert delete_time_periods(ids + [10_000]) == len(ids)
+    assert get_time_period(ids[0]) is None
+
+
+def test_batch_create_with_json_columns_and_related_rows():
+    teachers = create_teachers(
+        [
+            Teacher(None, "Alice", unavailable_periods={"1": [1]}),
+            Teacher(None, "Bob", departments=["Math"]),
+        ]
+    )
+    assert get_teacher(teachers[0].id).unavailable_periods == {"1": [1]}
+    assert teachers[1].departments == ["Math"]
+
+    updated = update_teachers(
+        [t.id for t in teachers], max_periods_per_week=12, preferred_periods=Json({})
+    )
+    assert [t.max_periods_per_week for t in updated] == [12, 12]
+
+    courses = create_courses(
+        [Course(None, "C1", "Chem", periods_per_week=4, grade_levels={"10": 4})]
+    )
+    assert get_course(courses[0].id).grade_levels == {"10": 4}
+    sections = create_class_sections(
+        ClassSection(None, courses[0].id, name, semester="2025A") for name in ("A", "B")
+    )
+    assert [s.section_name for s in sections] == ["A", "B"]
+
+    labs = create_facilities([Facility(None, "Lab 1", "lab"), Facility(None, "Lab 2")])
+    assert delete_facilities(f.id for f in labs) == 2
+    assert create_facilities([]) == []
@@ -0,0 +1,92 @@
+import json
+import time
+
+import cache
+from cache import ReadThroughCache
+from db import connection
+from models.courses import create_course, get_course, update_course, update_courses
+
+
+def test_lru_and_ttl():
+    now = [0.0]
+    lru = ReadThroughCache("t", maxsize=2, ttl=10, clock=lambda: now[0])
+    loads = []
+
+    def load(key):
+        loads.append(key)
+        return key * 10
+
+    assert [lru.get(k, load) for k in (1, 2, 1, 3, 1, 2)] == [10, 20, 10, 30, 10, 20]
+    # 2 was least recently used when 3 came in.
+    assert loads == [1, 2, 3, 2]
+    now[0] = 11
+    assert lru.get(1, load) == 10 and loads[-1] == 1
+    assert lru.stats() == {
+        "hits": 2,
+        "misses": 5,
+        "evictions": 2,
+        "invalidations": 0,
+        "size": 2,
+    }
+
+
+def test_getter_reads_through_and_update_invalidates():
+    course = create_course("C1", "Chemistry", 4)
+    before = cache.stats()["courses"]
+    assert get_course(course.id) == course
+    assert get_course(course.id) == course
+
+    # A change behind the cache's back is not seen until invalidation ...
+    with connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute("UPDATE courses SET name = 'Chem' WHERE id = %s", (course.id,))
+    assert get_course(course.id).name == "Chemistry"
+    # ... but the module's own update functions invalidate it.
+    update_course(course.id, periods_per_week=5)
+    assert get_course(course.id).name == "Chem"
+    update_courses(iter([course.id]), name="Chemistry A")
+    assert get_course(course.id).name == "Chemistry A"
+
+    after = cache.stats()["courses"]
+    assert after["hits"] - before["hits"] == 2
+    assert after["misses"] - before["misses"] == 3
+
+
+def test_listener_applies_invalidations_from_other_processes():
+    course = create_course("C1", "Chemistry", 4)
+    cache.start_listener(poll_interval=0.05)
+    try:
+        assert get_course(course.id).name == "Chemistry"
+        assert cache.stats()["courses"]["size"] == 1
+        with connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute(
+                    "UPDATE courses SET name = 'Chem' WHERE id = %s", (course.id,)
+                )
+                # What another process's invalidate() sends.
+                cur.execute(
+                    "SELECT pg_notify(%s, %s)",
+                    (cache.CHANNEL, f'{{"table": "courses", "ids": [{course.id}]}}'),
+                )
+        for _ in range(100):
+            if cache.stats()["courses"]["size"] == 0:
+                break
+            time.sleep(0.02)
+        assert get_course(course.id).name == "Chem"
+    finally:
+        cache.stop_listener()
+
+
+def test_large_invalidations_are_split_across_notifications():
+    course = create_course("C1", "Chemistry", 4)
+    ids = [course.id] + list(range(10**9, 10**9 + 2000))
+    cache.start_listener(poll_interval=0.05)
+    try:
+        payloads = cache._listener.payloads("courses", ids)
+        assert len(payloads) > 1
+        assert all(len(p.encode()) <= cache.MAX_PAYLOAD for p in payloads)
+        assert sum(len(json.loads(p)["ids"]) for p in payloads) == len(ids)
+        (updated,) = update_courses(ids, notes="x")
+        assert updated.notes == "x"
+    finally:
+        cache.stop_listener()
@@ -0,0 +1,149 @@
+import json
+
+from openpyxl import Workbook, load_workbook
+from openpyxl.styles import PatternFill
+
+from chi2eng import (
+    Translator,
+    auto_adjust_dimensions,
+    batch,
+    find_workbooks,
+    font_size,
+    line_spacing,
+    load_replacements,
+    main,
+    output_path,
+    padding_inline,
+    stream_workbook,
+    translate,
+    translate_workbook,
+)
+
+
+def _workbook(path):
+    wb = Workbook()
+    ws = wb.active
+    ws.title = "G10"
+    ws["A1"] = "自习不安排"
+    ws["C3"] = "高一 数学 / 赵云飞"
+    ws["C3"].fill = PatternFill("solid", fgColor="FFFF00")
+    ws["B4"] = 5
+    wb.create_sheet("G11")["A1"] = "第一节"
+    wb.save(path)
+
+
+def test_translate_prefers_longest_match():
+    assert translate("自习不安排") == "Study Hr. (No Tchr)"
+    assert translate("自习") == "Study Hr."
+    assert translate("高一 数学 / 赵云飞") == "G10. Math \n Yunfei"
+    assert translate(7) == 7
+
+
+def test_stream_matches_full_load(tmp_path):
+    source = tmp_path / "schedule.xlsx"
+    _workbook(source)
+    translate_workbook(source, tmp_path / "full.xlsx")
+    stream_workbook(source, tmp_path / "stream.xlsx")
+
+    full = load_workbook(tmp_path / "full.xlsx")
+    stream = load_workbook(tmp_path / "stream.xlsx")
+    assert stream.sheetnames == full.sheetnames == ["G10", "G11"]
+    for name in full.sheetnames:
+        assert list(stream[name].values) == list(full[name].values)
+        for column in ("A", "B", "C"):
+            assert (
+                stream[name].column_dimensions[column].width
+                == full[name].column_dimensions[column].width
+            )
+    cell = stream["G10"]["C3"]
+    assert cell.font.name == "Calibri"
+    assert cell.fill.fgColor.rgb.endswith("FFFF00")
+    assert (
+        stream["G10"].row_dimensions[3].height == full["G10"].row_dimensions[3].height
+    )
+
+
+def test_output_path_keeps_directory():
+    assert output_path("exports/g10.xlsx") == "exports/Modified g10.xlsx"
+
+
+def test_dictionary_file_is_cached(tmp_path):
+    dictionary = tmp_path / "names.yaml"
+    dictionary.write_text(
+        '"高一": "G10."\n"王京": " Ms. Wang Jing"\n', encoding="utf-8"
+    )
+    assert load_replacements(str(dictionary)) == {
+        "高一": "G10.",
+        "王京": " Ms. Wang Jing",
+    }
+    cache = tmp_path / "names.yaml.cache"
+    assert cache.exists()
+
+    # The cache is used while the dictionary is unchanged ...
+    cached = json.loads(cache.read_text(encoding="utf-8"))
+    cached["replacements"]["高一"] = "cached"
+    cache.write_text(json.dumps(cached), encoding="utf-8")
+    assert load_replacements(str(dictionary))["高一"] == "cached"
+
+    # ... and rebuilt once it is edited.
+    dictionary.write_text('"高一": "Grade 10"\n', encoding="utf-8")
+    assert load_replacements(str(dictionary)) == {"高一": "Grade 10"}
+
+
+def test_translator_memoizes_repeated_values():
+    translator = Translator({"数学": "Math", "赵云飞": " Yunfei"})
+    for _ in range(100):
+        assert translator("数学 / 赵云飞") == "Math \n Yunfei"
+    info = translator.cache_info()
+    assert (info.misses, info.hits) == (1, 99)
+
+
+def test_batch_translates_directory_and_skips_up_to_date(tmp_path, capsys):
+    for name in ("g10.xlsx", "g11.xlsx"):
+        _workbook(tmp_path / name)
+    (tmp_path / "notes.txt").write_text("not a workbook")
+
+    assert main([str(tmp_path), "--jobs", "2"]) == 0
+    assert sorted(p.name for p in tmp_path.glob("Modified *")) == [
+        "Modified g10.xlsx",
+        "Modified g11.xlsx",
+    ]
+    translated = load_workbook(tmp_path / "Modified g11.xlsx")
+    assert translated["G11"]["A1"].value == "1st"
+
+    # Outputs are not picked up as inputs, and fresh outputs are skipped.
+    assert find_workbooks([str(tmp_path / "*.xlsx")]) == [
+        str(tmp_path / "g10.xlsx"),
+        str(tmp_path / "g11.xlsx"),
+    ]
+    results = batch(find_workbooks([str(tmp_path)]))
+    assert [r.status for r in results] == ["skipped", "skipped"]
+    results = batch([str(tmp_path / "g10.xlsx")], force=True)
+    assert [r.status for r in results] == ["translated"]
+    assert "2 workbooks: 2 translated, 0 skipped, 0 failed" in capsys.readouterr().out
+
+
+def test_dimensions_count_cjk_double_width(capsys):
+    wb = Workbook()
+    ws = wb.active
+    ws["A1"] = "张三"
+    ws["B2"] = "Math\nPhys\nChem"
+    ws["C1"] = "abcdefghijklmnopqrstuvwxyz"
+    ws.merge_cells("C1:D1")
+
+    auto_adjust_dimensions(ws)
+    assert ws.column_dimensions["A"].width == 4 + padding_inline
+    assert ws.column_dimensions["B"].width == 4 + padding_inline
+    assert ws.column_dimensions["D"].width == padding_inline
+    assert ws.row_dimensions[1].height == font_size * line_spacing
+    assert ws.row_dimensions[2].height == 3 * font_size * line_spacing
+
+    auto_adjust_dimensions(ws, wide=False)
+    assert ws.column_dimensions["A"].width == 2 + padding_inline
+    assert capsys.readouterr().out == ""
+
+
+def test_translator_measures_translated_text():
+    translator = Translator({"数学": "Math"})
+    assert translator.measure("数学/张三") == ("Math\n张三", 4, 2)
+    assert translator.measure(None) == (None, 0, 1)
@@ -0,0 +1,58 @@
+import tracemalloc
+
+import numpy as np
+import pytest
+
+from solver.timetable import PAGE_SIZE, CompactTimetable, Universe
+
+ROWS = [
+    (1, 10, 100, None, 1000),
+    (2, 10, 100, 7, 1001),
+    (3, 11, None, 7, None),
+]
+
+
+def test_rows_round_trip_through_codes():
+    tt = CompactTimetable.from_rows(ROWS)
+    assert list(tt.to_rows()) == ROWS
+    assert tt.sections.tolist() == [0, 0, 1]
+    assert tt.teachers.dtype == np.int8
+    assert tt.ids("facilities").tolist() == [-1, 7, 7]
+
+
+def test_snapshots_copy_pages_on_write():
+    base = CompactTimetable.from_rows(ROWS)
+    candidate = base.snapshot()
+    candidate.move(0, period_id=1001, facility_id=8)
+    candidate.assign([1, 2], teachers=None)
+    assert list(base.to_rows()) == ROWS
+    assert list(candidate.to_rows()) == [
+        (1, 10, 100, 8, 1001),
+        (2, 10, None, 7, 1001),
+        (3, 11, None, 7, None),
+    ]
+    assert base.diff(candidate).tolist() == [0, 1]
+    base.move(2, period_id=1000)  # the source copies before writing too
+    assert candidate.periods.tolist()[2] == -1
+    with pytest.raises(ValueError):
+        candidate.assign(0, rooms=3)
+
+
+def test_ten_thousand_candidates_stay_small():
+    meetings = 20 * PAGE_SIZE
+    rows = [(i + 1, i // 4, i % 300, i % 40, i % 45) for i in range(meetings)]
+    base = CompactTimetable.from_rows(rows, Universe("2025A"))
+    rng = np.random.default_rng(0)
+    tracemalloc.start()
+    try:
+        candidates = []
+        for _ in range(10_000):
+            candidate = base.snapshot()
+            candidate.move(int(rng.integers(meetings)), period_id=int(rng.integers(45)))
+            candidates.append(candidate)
+        used = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+    # A full copy of the columns would be 10,000 x 5 bytes x 5,120 meetings.
+    assert used < 32 * 1024 * 1024
+    assert all(len(base.diff(c)) <= 1 for c in candidates[:100])
@@ -0,0 +1,54 @@
+import numpy as np
+from psycopg2.extras import Json
+
+from db import get_connection
+from models.courses import create_course
+from models.teachers import create_teacher, update_teacher
+from models.time_periods import create_time_period
+from solver.feasibility import load_index
+
+
+def _seed():
+    periods = [create_time_period(n, day_of_week=1) for n in range(1, 5)]
+    intl = create_teacher("Alice", is_international=True)
+    local = create_teacher("Bob")
+    math = create_course("MATH", "Math", 3)
+    art = create_course("ART", "Art", 2)
+    conn = get_connection()
+    try:
+        with conn.cursor() as cur:
+            cur.execute(
+                "INSERT INTO teacher_courses (teacher_id, course_id) VALUES (%s, %s), (%s, %s)",
+                (intl.id, math.id, local.id, art.id),
+            )
+    finally:
+        conn.close()
+    return periods, intl, local, math, art
+
+
+def test_index_encodes_qualifications_and_availability():
+    periods, intl, local, math, art = _seed()
+    update_teacher(local.id, unavailable_periods=Json({"1": [2]}))
+    index = load_index()
+
+    assert index.periods_for(intl.id, math.id).tolist() == [1, 2]
+    assert index.periods_for(local.id, art.id).tolist() == [0, 2, 3]
+    assert index.periods_for(intl.id, art.id).tolist() == []
+
+    allowed = index.lookup(
+        np.array([intl.id, intl.id, local.id, 999]),
+        np.array([math.id, math.id, art.id, art.id]),
+        np.array([periods[0].id, periods[1].id, periods[1].id, periods[0].id]),
+    )
+    assert allowed.tolist() == [False, True, False, False]
+
+
+def test_index_is_cached_until_tables_change():
+    _, intl, _, _, _ = _seed()
+    index = load_index()
+    assert load_index() is index
+
+    update_teacher(intl.id, is_international=False)
+    rebuilt = load_index()
+    assert rebuilt is not index
+    assert rebuilt.allowed.sum() == index.allowed.sum() + 2
@@ -0,0 +1,83 @@
+from psycopg2.extras import Json
+
+from conftest import execute
+from models.courses import create_course, get_course, update_course
+from models.facilities import create_facility
+from models.teachers import create_teacher, update_teacher
+from models.time_periods import create_time_period
+from solver import schedule
+from solver.incremental import resolve
+
+
+def _seed():
+    for day in (1, 2, 3):
+        for number in range(1, 5):
+            create_time_period(number, day_of_week=day)
+    teachers = [create_teacher(name) for name in ("Alice", "Bob", "Carol")]
+    for i, teacher in enumerate(teachers):
+        course = create_course(f"C{i}", f"Course {i}", 3)
+        execute(
+            "INSERT INTO teacher_courses (teacher_id, course_id) VALUES (%s, %s)",
+            (teacher.id, course.id),
+        )
+        execute(
+            "INSERT INTO class_sections (course_id, section_name, semester) VALUES (%s, 'A', 'T1')",
+            (course.id,),
+        )
+    return teachers
+
+
+def _timetable():
+    return {row[0]: row[1:] for row in execute("""
+            SELECT sc.id, sc.teacher_id, tp.day_of_week, tp.period_number
+            FROM scheduled_classes sc JOIN time_periods tp ON tp.id = sc.time_period_id
+            """)}
+
+
+def test_resolve_moves_only_the_changed_teacher():
+    alice, bob, carol = _seed()
+    assert schedule("T1", time_limit=10, workers=2).feasible
+    before = _timetable()
+    blocked = sorted((d, p) for t, d, p in before.values() if t == alice.id)[0]
+    update_teacher(alice.id, unavailable_periods=Json({str(blocked[0]): [blocked[1]]}))
+
+    outcome = resolve("T1", teacher_ids=[alice.id], time_limit=10, workers=2)
+    assert outcome.result.feasible
+    assert len(outcome.added) == len(outcome.removed) == 1
+
+    after = _timetable()
+    assert set(after) == set(before)  # moved in place, row ids kept
+    assert (alice.id, *blocked) not in after.values()
+    for rid, row in before.items():
+        if row[0] != alice.id:
+            assert after[rid] == row
+
+
+def test_resolve_without_changes_is_a_no_op():
+    _seed()
+    assert schedule("T1", time_limit=10, workers=2).feasible
+    before = _timetable()
+    outcome = resolve("T1", time_limit=10, workers=2)
+    assert outcome.result.feasible
+    assert not outcome.added and not outcome.removed
+    assert _timetable() == before
+
+
+def test_resolve_adds_rooms_when_a_course_starts_needing_one():
+    _seed()
+    assert schedule("T1", time_limit=10, workers=2).feasible
+    lab = create_facility("Lab", "lab")
+    course = execute("SELECT id FROM courses WHERE code = 'C0'")[0][0]
+    update_course(course, requires_specific_facility=True)
+    assert get_course(course).requires_specific_facility
+
+    # The course is not named: its unroomed meetings must be found invalid.
+    outcome = resolve("T1", max_hops=0, time_limit=10, workers=2)
+    assert outcome.result.feasible
+    rooms = execute(
+        "SELECT DISTINCT sc.facility_id FROM scheduled_classes sc"
+        " JOIN class_sections cs ON cs.id = sc.class_section_id"
+        " WHERE cs.course_id = %s",
+        (course,),
+    )
+    assert rooms == [(lab.id,)]
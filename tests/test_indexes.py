@@ -0,0 +1,72 @@
+import json
+
+import pytest
+
+from db import connection
+
+# (query, parameters, index the plan must use). Sequential scans are disabled
+# so that the empty test tables still show which index the planner can use.
+QUERIES = [
+    (
+        "SELECT teacher_id, facility_id FROM scheduled_classes"
+        " WHERE semester = %s AND time_period_id = %s",
+        ("2025A", 3),
+        "idx_scheduled_classes_semester_period",
+    ),
+    (
+        "SELECT id FROM scheduled_classes"
+        " WHERE semester = %s AND time_period_id = %s AND teacher_id = %s",
+        ("2025A", 3, 7),
+        None,  # any index will do for the clash lookups
+    ),
+    (
+        "SELECT id FROM scheduled_classes"
+        " WHERE facility_id = %s AND time_period_id = %s AND semester = %s",
+        (2, 3, "2025A"),
+        None,
+    ),
+    (
+        "SELECT id FROM teachers WHERE departments @> %s::jsonb",
+        (json.dumps(["Maths"]),),
+        "idx_teachers_departments",
+    ),
+    (
+        "SELECT id FROM courses WHERE grade_levels @> %s::jsonb",
+        (json.dumps({"10": 4}),),
+        "idx_courses_grade_levels",
+    ),
+    (
+        "SELECT id FROM class_sections WHERE is_active AND semester = %s",
+        ("2025A",),
+        "idx_class_sections_active",
+    ),
+    (
+        "SELECT id FROM time_periods WHERE is_active AND day_of_week = %s",
+        (1,),
+        "idx_time_periods_active",
+    ),
+]
+
+
+def _indexes_used(sql, params):
+    with connection() as conn:
+        with conn:
+            with conn.cursor() as cur:
+                cur.execute("SET LOCAL enable_seqscan = off")
+                cur.execute("EXPLAIN (FORMAT JSON) " + sql, params)
+                plan = cur.fetchone()[0]
+    found, nodes = set(), [plan[0]["Plan"]]
+    while nodes:
+        node = nodes.pop()
+        if "Index Name" in node:
+            found.add(node["Index Name"])
+        nodes.extend(node.get("Plans", []))
+    return found
+
+
+@pytest.mark.parametrize("sql, params, index", QUERIES)
+def test_scheduler_queries_use_an_index(sql, params, index):
+    used = _indexes_used(sql, params)
+    assert used, f"sequential scan for: {sql}"
+    if index is not None:
+        assert index in used
@@ -0,0 +1,49 @@
+import psycopg2
+import pytest
+
+from db import get_connection
+from load_config import build_rows, load_config, load_rows
+from models.courses import create_course, get_course
+
+
+def _count(table):
+    conn = get_connection()
+    try:
+        with conn.cursor() as cur:
+            cur.execute(f"SELECT count(*) FROM {table}")
+            return cur.fetchone()[0]
+    finally:
+        conn.close()
+
+
+def test_load_config_seeds_every_table():
+    counts = load_config("config.yaml", semester="2025A")
+    assert counts["teachers"] == 19
+    assert counts["students"] == 25
+    assert counts["student_courses"] == _count("student_courses") > 0
+
+    course = get_course(4)
+    assert course.code == "C004"
+    assert course.grade_levels == {"11": 9}
+    assert course.periods_per_week == 6
+
+    # Sequences continue after the explicitly loaded ids.
+    assert create_course("NEW", "New Course", 1).id == 27
+
+
+def test_load_config_replace_reloads_from_scratch():
+    load_config("config.yaml")
+    counts = load_config("config.yaml", replace=True)
+    assert _count("students") == counts["students"] == 25
+
+
+def test_load_rows_is_all_or_nothing():
+    rows = build_rows(
+        {
+            "teachers": [{"id": 1, "name": "Alice"}],
+            "courses": [{"id": 1, "name": "Math", "teacher_id": 99}],
+        }
+    )
+    with pytest.raises(psycopg2.IntegrityError):
+        load_rows(rows)
+    assert _count("teachers") == 0
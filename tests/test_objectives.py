@@ -0,0 +1,101 @@
+from datetime import time
+
+from psycopg2.extras import Json
+
+from conftest import execute
+from models.courses import create_course
+from models.teachers import create_teacher
+from models.time_periods import create_time_period
+from solver import build_model, load_problem, solve
+from solver.data import Constraint
+
+# Day 1: periods 1-2 before lunch, 3-4 after it.
+TIMES = [(time(8, 0), time(8, 40)), (time(8, 50), time(9, 30))]
+TIMES += [(time(13, 30), time(14, 10)), (time(14, 20), time(15, 0))]
+
+
+def _seed(courses, constraints=()):
+    """``courses`` maps a code to (create_course kwargs, student ids)."""
+    for number, (start, end) in enumerate(TIMES, start=1):
+        create_time_period(number, 1, start_time=start, end_time=end)
+    execute("INSERT INTO homerooms (name) VALUES ('10A')")
+    for sid in ("S1", "S2"):
+        execute(
+            "INSERT INTO students (student_id, name, grade_level, homeroom_id)"
+            " SELECT %s, %s, 10, id FROM homerooms",
+            (sid, sid),
+        )
+    ids = {}
+    for code, (kwargs, students) in courses.items():
+        teacher = create_teacher(f"Teacher {code}", **kwargs.pop("teacher", {}))
+        course = create_course(code, code.title(), 2, **kwargs)
+        ids[code] = course.id
+        execute(
+            "INSERT INTO teacher_courses (teacher_id, course_id) VALUES (%s, %s)",
+            (teacher.id, course.id),
+        )
+        execute(
+            "INSERT INTO student_courses (student_id, course_id, semester)"
+            " SELECT id, %s, '2025A' FROM students WHERE student_id = ANY(%s)",
+            (course.id, list(students)),
+        )
+    for constraint_type, value in constraints:
+        execute(
+            "INSERT INTO scheduling_constraints (constraint_type, constraint_value)"
+            " VALUES (%s, %s)",
+            (constraint_type, Json(value)),
+        )
+    return ids
+
+
+def _numbers(problem, result, course_id):
+    return sorted(
+        problem.periods[a.period].period_number
+        for a in result.assignments
+        if problem.sections[a.section].course_id == course_id
+    )
+
+
+def test_preferred_periods_and_doubles():
+    ids = _seed(
+        {
+            "ART": ({"teacher": {"preferred_periods": Json({"1": [1, 4]})}}, ["S1"]),
+            "LAB": ({"requires_consecutive_periods": True}, ["S2"]),
+        },
+        [
+            ("teacher_preferred_periods", {"weight": 3}),
+            ("consecutive_periods", {"weight": 2}),
+        ],
+    )
+    problem = load_problem("2025A")
+    result = solve(problem, time_limit=10, workers=2)
+    assert result.objective == 0
+    assert _numbers(problem, result, ids["ART"]) == [1, 4]
+    # Periods 2 and 3 are adjacent numbers but lunch separates them.
+    assert _numbers(problem, result, ids["LAB"]) in ([1, 2], [3, 4])
+
+
+def test_homeroom_cohesion_aligns_classmates():
+    ids = _seed(
+        {"MATH": ({}, ["S1"]), "ART": ({}, ["S2"])},
+        [("homeroom_cohesion", {"weight": 1})],
+    )
+    problem = load_problem("2025A")
+    result = solve(problem, time_limit=10, workers=2)
+    assert result.objective == 0
+    assert _numbers(problem, result, ids["MATH"]) == _numbers(
+        problem, result, ids["ART"]
+    )
+
+
+def test_weight_changes_reuse_compiled_terms():
+    _seed({"ART": ({"is_elective": True}, ["S1"])})
+    tm = build_model(load_problem("2025A"))
+    assert tm.objective.compilations == 1  # the default elective preference
+    tm.objective.apply([Constraint(1, "elective_periods", {"last": 2, "weight": 5})])
+    assert tm.objective.compilations == 1
+    assert [factor for factor, _ in tm.objective._weighted] == [5]
+    tm.objective.apply([Constraint(1, "elective_periods", {"periods": [1]})])
+    assert tm.objective.compilations == 2
+    tm.objective.apply([Constraint(2, "no_such_type", {})])
+    assert tm.objective.compilations == 2
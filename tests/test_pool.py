@@ -0,0 +1,63 @@
+import threading
+
+import pytest
+from psycopg2.pool import PoolError
+
+from db import ConnectionPool, connection, get_pool
+
+
+def test_connection_reuses_pooled_connection():
+    with connection() as first:
+        pass
+    with connection() as second:
+        pass
+    assert first is second
+    assert not second.closed
+
+
+def test_pool_replaces_broken_connection():
+    pool = ConnectionPool(minconn=1, maxconn=1)
+    try:
+        with pool.connection() as conn:
+            conn.close()
+        with pool.connection() as replacement:
+            with replacement.cursor() as cur:
+                cur.execute("SELECT 1")
+                assert cur.fetchone() == (1,)
+        assert replacement is not conn
+        assert pool.connects == 2
+    finally:
+        pool.closeall()
+
+
+def test_pool_rolls_back_abandoned_transaction():
+    pool = ConnectionPool(minconn=0, maxconn=1)
+    try:
+        with pool.connection() as conn:
+            conn.autocommit = False
+            with conn.cursor() as cur:
+                cur.execute("INSERT INTO teachers (name) VALUES ('Ghost')")
+        with pool.connection() as conn:
+            assert conn.autocommit
+            with conn.cursor() as cur:
+                cur.execute("SELECT count(*) FROM teachers")
+                assert cur.fetchone() == (0,)
+    finally:
+        pool.closeall()
+
+
+def test_pool_blocks_until_timeout_when_exhausted():
+    pool = ConnectionPool(minconn=0, maxconn=1, timeout=0.05)
+    try:
+        held = pool.getconn()
+        with pytest.raises(PoolError):
+            pool.getconn()
+        threading.Timer(0.01, pool.putconn, (held,)).start()
+        pool.timeout = 5
+        assert pool.getconn() is held
+    finally:
+        pool.closeall()
+
+
+def test_process_pool_is_shared():
+    assert get_pool() is get_pool()
@@ -0,0 +1,94 @@
+import multiprocessing
+
+from ortools.sat.python import cp_model
+
+from conftest import execute
+from models.courses import create_course
+from models.teachers import create_teacher
+from models.time_periods import create_time_period
+from solver import load_problem, portfolio
+from solver.engine import Assignment
+from solver.portfolio import (
+    MISSING_MEETINGS,
+    SKIPPED,
+    portfolio_schedule,
+    strategies,
+    violations,
+)
+from solver.validation import TEACHER_CLASH
+
+
+def _seed():
+    for day in (1, 2):
+        for number in range(1, 5):
+            create_time_period(number, day_of_week=day)
+    teacher = create_teacher("Alice")
+    for code, periods in (("MATH", 3), ("ENG", 2)):
+        course = create_course(code, code.title(), periods)
+        execute(
+            "INSERT INTO teacher_courses (teacher_id, course_id) VALUES (%s, %s)",
+            (teacher.id, course.id),
+        )
+    execute(
+        "INSERT INTO students (student_id, name, grade_level) VALUES ('S1', 'S1', 10)"
+    )
+    execute("""
+        INSERT INTO student_courses (student_id, course_id, semester)
+        SELECT s.id, c.id, '2025A' FROM students s CROSS JOIN courses c
+        """)
+    return teacher
+
+
+def test_strategies_differ_by_seed_and_parameters():
+    portfolio = strategies(6, base_seed=10)
+    assert [s.seed for s in portfolio] == list(range(10, 16))
+    assert portfolio[0].parameters == portfolio[5].parameters == {}
+    assert portfolio[1].label == "seed 11 (linearization_level=2)"
+
+
+def test_violations_counts_by_kind():
+    teacher = _seed()
+    problem = load_problem("2025A")
+    # Both sections in period 0 with the same teacher; both are short.
+    clash = [Assignment(0, 0, teacher.id), Assignment(1, 0, teacher.id)]
+    assert violations(problem, clash) == {
+        TEACHER_CLASH: 1,
+        "student_clash": 1,
+        MISSING_MEETINGS: 2,
+    }
+
+
+def test_portfolio_writes_the_best_candidate():
+    _seed()
+    outcome = portfolio_schedule(
+        "2025A", candidates=strategies(3), time_limit=10, jobs=2
+    )
+    assert len(outcome.candidates) == 3
+    assert outcome.best is not None and not outcome.best.violations
+    assert outcome.written == 5
+    assert all(
+        not c.result.assignments for c in outcome.candidates if c is not outcome.best
+    )
+    rows = execute("SELECT count(*) FROM scheduled_classes WHERE semester = '2025A'")
+    assert rows[0][0] == 5
+
+
+def test_proven_optimum_skips_later_candidates():
+    _seed()
+    outcome = portfolio_schedule(
+        "2025A", candidates=strategies(3), time_limit=30, jobs=1, write=False
+    )
+    statuses = [c.result.status for c in outcome.candidates]
+    assert statuses == ["OPTIMAL", SKIPPED, SKIPPED]
+    assert outcome.best is outcome.candidates[0]
+
+
+def test_candidate_is_beaten_by_another_candidates_objective():
+    portfolio._init(multiprocessing.Value("d", 10.0), multiprocessing.Event())
+    share = portfolio._Share(cp_model.CpSolver())
+    share.on_bound(4.0)
+    assert not share.beaten()
+    share.on_bound(10.0)  # cannot get below the shared best of 10
+    assert share.beaten()
+    share.objective = 10.0  # unless it is the candidate that found it
+    assert not share.beaten()
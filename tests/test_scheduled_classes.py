@@ -0,0 +1,87 @@
+import psycopg2
+import pytest
+
+from db import connection
+from models.class_sections import create_class_section
+from models.courses import create_course
+from models.facilities import create_facility
+from models.scheduled_classes import ScheduledClass, create_scheduled_classes
+from models.teachers import create_teacher
+from models.time_periods import create_time_period
+
+
+@pytest.fixture
+def refs():
+    section = create_class_section(create_course("MATH", "Maths", 2).id, "A").id
+    teachers = [create_teacher(name).id for name in ("Alice", "Bob")]
+    labs = [create_facility(name).id for name in ("Lab 1", "Lab 2")]
+    periods = [create_time_period(n, 1).id for n in (1, 2)]
+    return section, teachers, labs, periods
+
+
+def _meeting(refs, teacher, lab, period, weeks="all", semester="2025A"):
+    section, teachers, labs, periods = refs
+    return ScheduledClass(
+        None,
+        section,
+        teachers[teacher],
+        labs[lab],
+        periods[period],
+        week_pattern=weeks,
+        semester=semester,
+    )
+
+
+def _insert(meeting):
+    with connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute(
+                "INSERT INTO scheduled_classes (class_section_id, teacher_id,"
+                " facility_id, time_period_id, week_pattern, semester)"
+                " VALUES (%s, %s, %s, %s, %s, %s)",
+                (
+                    meeting.class_section_id,
+                    meeting.teacher_id,
+                    meeting.facility_id,
+                    meeting.time_period_id,
+                    meeting.week_pattern,
+                    meeting.semester,
+                ),
+            )
+
+
+def test_database_rejects_clashes_unless_weeks_are_disjoint(refs):
+    _insert(_meeting(refs, 0, 0, 0, weeks="A"))
+    _insert(_meeting(refs, 0, 0, 0, weeks="B"))  # alternate weeks share the slot
+    _insert(_meeting(refs, 0, 0, 0, semester="2025B"))
+    with pytest.raises(psycopg2.errors.ExclusionViolation):
+        _insert(_meeting(refs, 0, 1, 0, weeks="3-5"))  # teacher, week 3 is odd
+    with pytest.raises(psycopg2.errors.ExclusionViolation):
+        _insert(_meeting(refs, 1, 0, 0, weeks="2, 10"))  # facility, even weeks
+    with pytest.raises(psycopg2.errors.CheckViolation):
+        _insert(_meeting(refs, 1, 1, 1, weeks="fortnightly"))
+
+
+def test_bulk_insert_reports_every_rejected_row(refs):
+    _insert(_meeting(refs, 0, 0, 0))
+    report = create_scheduled_classes(
+        [
+            _meeting(refs, 0, 1, 0),  # teacher clash with the existing row
+            _meeting(refs, 1, 1, 1),
+            _meeting(refs, 1, 1, 1, weeks="1-4"),  # clashes with the row above
+            _meeting(refs, 1, 0, 0),  # facility clash with the existing row
+            _meeting(refs, 0, 0, 1),
+        ],
+        page_size=2,
+    )
+    assert [(m.teacher_id, m.time_period_id) for m in report.created] == [
+        (refs[1][1], refs[3][1]),
+        (refs[1][0], refs[3][1]),
+    ]
+    assert [r.index for r in report.rejected] == [0, 2, 3]
+    assert report.rejected[0].teacher_clashes == (1,)
+    assert report.rejected[0].facility_clashes == ()
+    second = report.created[0].id
+    assert report.rejected[1].teacher_clashes == (second,)
+    assert report.rejected[1].facility_clashes == (second,)
+    assert report.rejected[2].facility_clashes == (1,)
@@ -0,0 +1,50 @@
+import psycopg2
+import pytest
+
+import db
+from db import connection, init_db, reset_db
+
+
+def _scalar(sql):
+    with connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute(sql)
+            return cur.fetchone()[0]
+
+
+def test_init_db_is_skipped_while_schema_is_unchanged():
+    with connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute("INSERT INTO homerooms (name, grade_level) VALUES ('G10', 10)")
+    assert init_db() is False
+    assert _scalar("SELECT count(*) FROM homerooms") == 1
+
+    assert init_db(force=True) is True
+    assert _scalar("SELECT count(*) FROM homerooms") == 0
+    assert init_db() is False
+
+
+def test_schema_errors_are_raised_and_rolled_back(tmp_path, monkeypatch):
+    broken = tmp_path / "schema.sql"
+    broken.write_text(
+        "CREATE TABLE public.extra (id integer);\nCREATE TABLE public.broken (;\n"
+    )
+    monkeypatch.setattr(db, "SCHEMA_PATH", str(broken))
+    with pytest.raises(psycopg2.Error):
+        init_db()
+    # The failed bootstrap left the previous schema untouched.
+    assert _scalar("SELECT to_regclass('public.extra')") is None
+    assert _scalar("SELECT to_regclass('public.students') IS NOT NULL")
+
+
+def test_reset_db_empties_tables_and_restarts_ids():
+    with connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute("INSERT INTO homerooms (name, grade_level) VALUES ('G10', 10)")
+            cur.execute(
+                "INSERT INTO students (student_id, name, grade_level, homeroom_id)"
+                " VALUES ('S1', 'Ann', 10, 1)"
+            )
+    reset_db()
+    assert _scalar("SELECT count(*) FROM homerooms") == 0
+    assert _scalar("INSERT INTO homerooms (name) VALUES ('G11') RETURNING id") == 1
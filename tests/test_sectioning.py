@@ -0,0 +1,107 @@
+from db import connection
+from models.class_sections import create_class_section
+from models.courses import create_course
+from models.time_periods import create_time_period
+from solver.sectioning import (
+    CourseSections,
+    assign_course,
+    load_courses,
+    section_students,
+)
+
+
+def test_homerooms_stay_together_when_they_fit():
+    # Two homerooms of 10 and 12, two sections of 12: no split needed.
+    students = [(i, 1) for i in range(10)] + [(100 + i, 2) for i in range(12)]
+    result = assign_course(CourseSections(7, [(1, 12), (2, 12)], students))
+    assert result.splits == 0 and not result.unplaced
+    assert len({result.sections[i] for i in range(10)}) == 1
+    assert len({result.sections[100 + i] for i in range(12)}) == 1
+
+
+def test_capacity_splits_once_and_avoids_clashes():
+    # 20 students of one homeroom, sections of 12: one split is unavoidable.
+    # Student 0 clashes with section 1, so it must land in section 2.
+    students = [(i, 1) for i in range(20)] + [(50, None)]
+    problem = CourseSections(7, [(1, 12), (2, 12)], students, {0: frozenset({1})})
+    result = assign_course(problem)
+    assert result.splits == 1 and result.clashes == 0
+    assert result.sections[0] == 2
+    assert len(result.sections) == 21
+    full = CourseSections(7, [(1, 12)], students)
+    assert len(assign_course(full).unplaced) == 9
+
+
+def test_enrollments_written_for_every_meeting():
+    course = create_course("ENG", "English", 2).id
+    sections = [
+        create_class_section(course, name, 2, semester="2025A").id
+        for name in ("A", "B")
+    ]
+    periods = [create_time_period(n, 1).id for n in (1, 2)]
+    with connection() as conn:
+        with conn:
+            with conn.cursor() as cur:
+                cur.execute("INSERT INTO homerooms (name) VALUES ('10A') RETURNING id")
+                homeroom = cur.fetchone()[0]
+                students = []
+                for n in range(4):
+                    cur.execute(
+                        "INSERT INTO students (student_id, name, homeroom_id)"
+                        " VALUES (%s, %s, %s) RETURNING id",
+                        (f"S{n}", f"Student {n}", homeroom if n < 2 else None),
+                    )
+                    students.append(cur.fetchone()[0])
+                    cur.execute(
+                        "INSERT INTO student_courses (student_id, course_id, semester)"
+                        " VALUES (%s, %s, '2025A')",
+                        (students[-1], course),
+                    )
+                # Section A meets twice, section B once.
+                for section, period in zip(
+                    sections + sections[:1], periods + periods[1:]
+                ):
+                    cur.execute(
+                        "INSERT INTO scheduled_classes"
+                        " (class_section_id, time_period_id, semester)"
+                        " VALUES (%s, %s, '2025A')",
+                        (section, period),
+                    )
+
+    (result,) = section_students("2025A", jobs=1)
+    assert not result.unplaced and result.splits == 0
+    assert result.sections[students[0]] == result.sections[students[1]]
+    per_section = {s: 2 if s == sections[0] else 1 for s in sections}
+    expected = sum(per_section[s] for s in result.sections.values())
+    with connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute("SELECT count(*) FROM class_enrollments")
+            assert cur.fetchone()[0] == expected
+    section_students("2025A", jobs=1)  # rerunning replaces, not duplicates
+    with connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute("SELECT count(*) FROM class_enrollments")
+            assert cur.fetchone()[0] == expected
+
+
+def test_null_capacity_is_unlimited():
+    course = create_course("ART", "Art", 1).id
+    section = create_class_section(course, "A", None, semester="2025A").id
+    with connection() as conn:
+        with conn:
+            with conn.cursor() as cur:
+                for n in range(3):
+                    cur.execute(
+                        "INSERT INTO students (student_id, name)"
+                        " VALUES (%s, %s) RETURNING id",
+                        (f"S{n}", f"Student {n}"),
+                    )
+                    cur.execute(
+                        "INSERT INTO student_courses (student_id, course_id, semester)"
+                        " VALUES (%s, %s, '2025A')",
+                        (cur.fetchone()[0], course),
+                    )
+    (problem,) = load_courses("2025A")
+    assert problem.sections == [(section, 3)]
+    result = assign_course(problem)
+    assert not result.unplaced and set(result.sections.values()) == {section}
@@ -0,0 +1,79 @@
+from dataclasses import replace
+from datetime import time
+
+from db import get_connection
+from models.courses import create_course
+from models.teachers import create_teacher
+from models.time_periods import TimePeriod, create_time_period
+from solver import schedule
+from solver.data import default_week
+from solver.slots import SlotTable, load_slots
+from solver.validation import validate_semester
+
+
+def test_pairs_skip_breaks_and_day_ends():
+    periods = [replace(p, id=i + 1) for i, p in enumerate(default_week())]
+    ceremony = TimePeriod(None, 0, 1, "ceremony", time(8, 40), time(8, 50))
+    slots = SlotTable(periods, [ceremony])
+    numbers = {
+        (periods[a].day_of_week, periods[a].period_number, periods[b].period_number)
+        for a, b in slots.pairs
+    }
+    # Lunch (after 4) and the 20-minute break (after 7) split every day.
+    assert sorted((n, m) for day, n, m in numbers if day == 2) == [
+        (1, 2),
+        (2, 3),
+        (3, 4),
+        (5, 6),
+        (6, 7),
+        (8, 9),
+    ]
+    assert (1, 1, 2) not in numbers  # Monday's flag ceremony
+    assert not any(day == 5 and m == 9 for day, _, m in numbers)  # Friday ends early
+    assert len(slots.pairs) == 6 * 3 + 5 + 5
+    a, b = slots.pairs[0]
+    assert slots.follows(a, b) and not slots.follows(b, a)
+    first, second = periods[a].id, periods[b].id
+    assert slots.adjacent_ids([first, second, first], [second, first, 99]).tolist() == [
+        True,
+        True,
+        False,
+    ]
+
+
+def test_schedule_links_double_periods():
+    for number in (1, 2, 4, 5):
+        create_time_period(number, 1)
+    create_time_period(3, 1, period_type="lunch")
+    teacher = create_teacher("Alice")
+    course = create_course("LAB", "Lab", 2, requires_consecutive_periods=True)
+    conn = get_connection()
+    try:
+        with conn.cursor() as cur:
+            cur.execute(
+                "INSERT INTO teacher_courses (teacher_id, course_id) VALUES (%s, %s)",
+                (teacher.id, course.id),
+            )
+            cur.execute(
+                "INSERT INTO scheduling_constraints (constraint_type, constraint_value)"
+                """ VALUES ('consecutive_periods', '{"weight": 5}')"""
+            )
+            cur.execute(
+                "INSERT INTO students (student_id, name) VALUES ('S1', 'S1') RETURNING id"
+            )
+            cur.execute(
+                "INSERT INTO student_courses (student_id, course_id, semester)"
+                " VALUES (%s, %s, '2025A')",
+                (cur.fetchone()[0], course.id),
+            )
+        assert len(load_slots().pairs) == 2  # 1-2 and 4-5, not across lunch
+        assert schedule("2025A", time_limit=10, workers=2).objective == 0
+        with conn.cursor() as cur:
+            cur.execute(
+                "SELECT id, is_double_period, linked_period_id FROM scheduled_classes"
+            )
+            (a, double_a, link_a), (b, double_b, link_b) = sorted(cur.fetchall())
+            assert double_a and double_b and (link_a, link_b) == (b, a)
+            assert validate_semester("2025A") == []
+    finally:
+        conn.close()
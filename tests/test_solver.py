@@ -0,0 +1,100 @@
+from collections import Counter
+
+from conftest import execute
+from models.courses import create_course
+from models.facilities import create_facility
+from models.teachers import create_teacher
+from models.time_periods import create_time_period
+from solver import load_problem, schedule, solve
+from solver.data import problem_from_config
+
+
+def _seed():
+    for day in (1, 2):
+        for number in range(1, 5):
+            create_time_period(number, day_of_week=day)
+    intl = create_teacher("Alice", is_international=True)
+    local = create_teacher("Bob")
+    math = create_course("MATH", "Math", 3)
+    art = create_course("ART", "Art", 2, is_elective=True)
+    chem = create_course(
+        "CHEM",
+        "Chemistry",
+        2,
+        preferred_facility_type="lab",
+        requires_specific_facility=True,
+    )
+    lab = create_facility("Lab 1", facility_type="lab")
+    for teacher, course in ((intl, math), (local, art), (local, chem)):
+        execute(
+            "INSERT INTO teacher_courses (teacher_id, course_id) VALUES (%s, %s)",
+            (teacher.id, course.id),
+        )
+    for sid in ("S1", "S2"):
+        execute(
+            "INSERT INTO students (student_id, name, grade_level) VALUES (%s, %s, 10)",
+            (sid, sid),
+        )
+    execute("""
+        INSERT INTO student_courses (student_id, course_id, semester)
+        SELECT s.id, c.id, '2025A' FROM students s CROSS JOIN courses c
+        """)
+    return intl, art, chem, lab
+
+
+def test_schedule_writes_feasible_timetable():
+    intl, art, chem, lab = _seed()
+    result = schedule("2025A", time_limit=10, workers=2)
+    assert result.feasible
+
+    rows = execute("""
+        SELECT sc.teacher_id, sc.facility_id, cs.course_id, tp.period_number
+        FROM scheduled_classes sc
+        JOIN class_sections cs ON cs.id = sc.class_section_id
+        JOIN time_periods tp ON tp.id = sc.time_period_id
+        WHERE sc.semester = '2025A'
+        """)
+    assert len(rows) == 3 + 2 + 2
+    # No first or last period for the international teacher.
+    assert all(p not in (1, 4) for t, _, _, p in rows if t == intl.id)
+    # Chemistry is always in the lab.
+    assert all(f == lab.id for _, f, c, _ in rows if c == chem.id)
+    # Electives land in the last two periods when possible.
+    assert all(p >= 3 for _, _, c, p in rows if c == art.id)
+    assert result.objective == 0
+
+    # The sections created on the first run are reused on the next one.
+    problem = load_problem("2025A")
+    assert all(s.id is not None for s in problem.sections)
+
+
+def test_student_conflicts_are_respected():
+    _seed()
+    problem = load_problem("2025A")
+    result = solve(problem, time_limit=10, workers=2)
+    busy = Counter(a.period for a in result.assignments)
+    assert max(busy.values()) == 1
+
+
+def test_problem_from_config_builds_grade_sections():
+    config = {
+        "teachers": [{"id": 1, "name": "Alice"}],
+        "students": [
+            {"id": 1, "name": "A", "grade": 10, "homeroom_teacher": 1},
+            {"id": 2, "name": "B", "grade": 11, "homeroom_teacher": 1},
+        ],
+        "courses": [{"id": 1, "name": "Chemistry", "teacher_id": 1}],
+        "course_requirements": {
+            10: [{"course_id": 1, "periods_per_week": 2}],
+            11: [{"course_id": 1, "periods_per_week": 9}],
+        },
+    }
+    problem = problem_from_config(config)
+    assert [(s.name, s.periods, s.teacher_ids) for s in problem.sections] == [
+        ("G10", 2, (1,)),
+        ("G11", 9, (1,)),
+    ]
+    assert len(problem.periods) == 44
+    result = solve(problem, time_limit=10, workers=2)
+    assert result.feasible
+    assert len(result.assignments) == 11
@@ -0,0 +1,51 @@
+import pytest
+
+import db
+from db import add_student, connection, get_student, init_db, update_student
+from models.courses import create_course, update_course, update_courses
+
+
+def _prepared_statements():
+    with connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute("SELECT name FROM pg_prepared_statements")
+            return {row[0] for row in cur.fetchall()}
+
+
+def test_statements_are_prepared_once_per_connection():
+    add_student("S1", "Ann", 10)
+    name = db._statement(
+        "SELECT id, student_id, name, grade_level FROM students WHERE student_id=%s"
+    )[0]
+    for _ in range(3):
+        assert get_student("S1")[1:] == ("S1", "Ann", 10)
+    assert name in _prepared_statements()
+    assert update_student("S1", grade_level=11)[3] == 11
+    assert update_student("S1", name="Bea", grade_level=12)[2:] == ("Bea", 12)
+    assert get_student("missing") is None
+
+
+def test_schema_rebuild_drops_prepared_statements():
+    add_student("S1", "Ann", 10)
+    assert get_student("S1") is not None
+    init_db(force=True)
+    assert get_student("S1") is None
+    with connection() as conn:
+        assert db._prepared[conn][0] == db._schema_generation
+
+
+def test_plain_sql_when_disabled(monkeypatch):
+    monkeypatch.setattr(db, "PREPARE_STATEMENTS", False)
+    add_student("S1", "Ann", 10)
+    assert get_student("S1")[1:] == ("S1", "Ann", 10)
+
+
+def test_updates_reject_unknown_columns():
+    course = create_course("MATH101", "Mathematics", 5)
+    with pytest.raises(ValueError, match="Cannot update 'name=name; --'"):
+        update_course(course.id, **{"name=name; --": "x"})
+    with pytest.raises(ValueError, match="Cannot update 'id'"):
+        update_courses([course.id], id=7)
+    with pytest.raises(ValueError, match="No fields"):
+        update_course(course.id)
+    assert update_course(course.id, notes="ok", name="Maths").name == "Maths"
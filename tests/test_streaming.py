@@ -0,0 +1,74 @@
+import pytest
+
+from db import connection, get_pool, iter_students, students_page
+from models.batch import insert_many
+from models.courses import Course, courses_page, create_courses, iter_courses
+
+
+def _seed_students(count):
+    insert_many(
+        "students",
+        ("student_id", "name", "grade_level"),
+        [(f"S{i:03d}", f"Student {i}", 10 + i % 3) for i in range(1, count + 1)],
+        ("id",),
+    )
+
+
+def test_iter_students_streams_in_id_order_with_filters():
+    _seed_students(25)
+    rows = list(iter_students(itersize=4))
+    assert [r[0] for r in rows] == list(range(1, 26))
+    assert rows[0][1:] == ("S001", "Student 1", 11)
+
+    grade_12 = list(iter_students(grade_level=12, itersize=3))
+    assert [r[0] for r in grade_12] == [2, 5, 8, 11, 14, 17, 20, 23]
+    assert list(iter_students(grade_level=[10, 11], homeroom_id=99)) == []
+
+    # Abandoning a stream returns its connection to the pool.
+    stream = iter_students(itersize=2)
+    next(stream)
+    stream.close()
+    pool = get_pool()
+    assert pool._size == len(pool._idle)
+
+
+def test_students_filter_by_enrollment_status():
+    _seed_students(6)
+    with connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute(
+                "UPDATE students SET enrollment_status = 'withdrawn' WHERE id IN (2, 5)"
+            )
+    assert [r[0] for r in iter_students(enrollment_status="withdrawn")] == [2, 5]
+    active = students_page(limit=10, enrollment_status="active")
+    assert [r[0] for r in active] == [1, 3, 4, 6]
+    assert students_page(enrollment_status=["withdrawn"], grade_level=11) == []
+
+
+def test_keyset_pages_cover_every_row_once():
+    _seed_students(25)
+    seen, after = [], None
+    while True:
+        page = students_page(after_id=after, limit=10, grade_level=[10, 11])
+        if not page:
+            break
+        seen.extend(r[0] for r in page)
+        after = page[-1][0]
+    assert seen == [i for i in range(1, 26) if i % 3 != 2]
+
+
+def test_model_listing_functions():
+    create_courses(
+        Course(None, f"C{i}", f"Course {i}", department="Sci" if i % 2 else "Art")
+        for i in range(1, 8)
+    )
+    assert [c.code for c in iter_courses(department="Art", itersize=2)] == [
+        "C2",
+        "C4",
+        "C6",
+    ]
+    first = courses_page(limit=3)
+    assert [c.id for c in first] == [1, 2, 3]
+    assert [c.id for c in courses_page(after_id=first[-1].id, limit=3)] == [4, 5, 6]
+    with pytest.raises(ValueError):
+        list(iter_courses(**{"1=1; --": 1}))
@@ -0,0 +1,110 @@
+import timetables
+from db import add_student, connection
+from models.class_sections import create_class_section
+from models.courses import create_course
+from models.facilities import create_facility
+from models.teachers import create_teacher
+from models.time_periods import create_time_period
+
+
+def _seed():
+    """Two periods on Monday and one on Tuesday; Alice teaches MATH in Lab."""
+    mon1 = create_time_period(1, 1).id
+    mon2 = create_time_period(2, 1).id
+    create_time_period(1, 2)
+    teacher = create_teacher("Alice").id
+    lab = create_facility("Lab").id
+    section = create_class_section(create_course("MATH", "Maths", 2).id, "A")
+    student = add_student("S1", "Ann", 10)[0]
+    with connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute(
+                "INSERT INTO scheduled_classes"
+                " (class_section_id, teacher_id, facility_id, time_period_id, semester)"
+                " VALUES (%s, %s, %s, %s, '2025A'), (%s, %s, NULL, %s, '2025A')"
+                " RETURNING id",
+                (section.id, teacher, lab, mon1, section.id, teacher, mon2),
+            )
+            classes = [row[0] for row in cur.fetchall()]
+            cur.execute(
+                "INSERT INTO class_enrollments (scheduled_class_id, student_id)"
+                " VALUES (%s, %s)",
+                (classes[0], student),
+            )
+    return teacher, student, classes, mon2
+
+
+def _queued():
+    with connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute("SELECT count(*) FROM timetable_refresh_queue")
+            return cur.fetchone()[0]
+
+
+def test_grids_are_day_by_period():
+    teacher, student, classes, _ = _seed()
+    grid = timetables.teacher_timetable("2025A", teacher)
+    assert len(grid) == timetables.DAYS and all(len(day) == 2 for day in grid)
+    assert grid[0][0] == [
+        {
+            "id": classes[0],
+            "course": "MATH",
+            "section": "A",
+            "teacher": "Alice",
+            "facility": "Lab",
+            "weeks": "all",
+        }
+    ]
+    assert "facility" not in grid[0][1][0]
+    assert grid[1] == [None, None]
+
+    student_grid = timetables.student_timetable("2025A", student)
+    assert [[bool(cell) for cell in day] for day in student_grid[:2]] == [
+        [True, False],
+        [False, False],
+    ]
+    assert timetables.teacher_timetable("2025B", teacher) is None
+
+
+def test_changes_refresh_only_the_touched_keys():
+    teacher, student, classes, mon2 = _seed()
+    assert timetables.refresh() == 2  # one teacher and one student key
+    assert _queued() == 0
+
+    with connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute(
+                "UPDATE class_enrollments SET scheduled_class_id = %s", (classes[1],)
+            )
+    assert _queued() == 1
+    assert timetables.student_timetable("2025A", student)[0] == [
+        None,
+        [
+            {
+                "id": classes[1],
+                "course": "MATH",
+                "section": "A",
+                "teacher": "Alice",
+                "weeks": "all",
+            }
+        ],
+    ]
+
+    with connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute("DELETE FROM class_enrollments")
+            cur.execute("DELETE FROM scheduled_classes")
+    assert timetables.refresh() == 2
+    assert timetables.teacher_timetable("2025A", teacher) is None
+    assert timetables.student_timetable("2025A", student) is None
+
+
+def test_rebuild_recomputes_from_scratch():
+    teacher, _, _, _ = _seed()
+    timetables.refresh()
+    with connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute("UPDATE teachers SET name = 'Alicia'")  # not tracked
+    assert timetables.rebuild("2025A") == 2
+    grid = timetables.teacher_timetable("2025A", teacher)
+    assert grid[0][0][0]["teacher"] == "Alicia"
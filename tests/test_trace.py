@@ -0,0 +1,97 @@
+import json
+import resource
+import sys
+
+import pytest
+
+from db import get_connection
+from models.courses import create_course
+from models.teachers import create_teacher
+from models.time_periods import create_time_period
+from solver import schedule
+from solver.__main__ import main
+from solver.trace import Progress, Stage, Trace, peak_rss
+
+
+def _seed():
+    for number in range(1, 5):
+        create_time_period(number, day_of_week=1)
+    teacher = create_teacher("Alice")
+    course = create_course("ART", "Art", 2, is_elective=True)
+    conn = get_connection()
+    try:
+        with conn.cursor() as cur:
+            cur.execute(
+                "INSERT INTO teacher_courses (teacher_id, course_id) VALUES (%s, %s)",
+                (teacher.id, course.id),
+            )
+            cur.execute(
+                "INSERT INTO students (student_id, name, grade_level)"
+                " VALUES ('S1', 'S1', 10) RETURNING id"
+            )
+            cur.execute(
+                "INSERT INTO student_courses (student_id, course_id, semester)"
+                " VALUES (%s, %s, '2025A')",
+                (cur.fetchone()[0], course.id),
+            )
+    finally:
+        conn.close()
+
+
+def test_schedule_records_stages_and_progress(tmp_path):
+    _seed()
+    trace = Trace("2025A", tmp_path / "run.json", tmp_path / "run.prom")
+    result = schedule("2025A", time_limit=10, workers=2, trace=trace)
+    assert result.feasible
+
+    data = json.loads((tmp_path / "run.json").read_text())
+    assert [s["name"] for s in data["stages"]] == [
+        "load",
+        "feasibility",
+        "build",
+        "solve",
+        "write",
+    ]
+    assert all(s["peak_rss_bytes"] > 0 for s in data["stages"])
+    assert data["model"]["variables"] > 0 and data["model"]["constraints"] > 0
+    assert data["status"] == "OPTIMAL" and data["current_stage"] is None
+    solutions = [p for p in data["progress"] if p["kind"] == "solution"]
+    assert solutions and solutions[-1]["objective"] == result.objective
+
+    metrics = (tmp_path / "run.prom").read_text()
+    assert 'timetable_stage_seconds{semester="2025A",stage="solve"}' in metrics
+    assert 'timetable_solve_status{semester="2025A",status="OPTIMAL"} 1' in metrics
+
+
+def test_prometheus_text_reports_latest_values():
+    trace = Trace("2025A")
+    trace.stages.append(Stage("load", 0.5, 1024))
+    trace.model_size(10, 4)
+    trace.progress += [
+        Progress(1.0, 7.0, 2.0, "solution"),
+        Progress(2.0, None, 3.0, "bound"),
+    ]
+    trace.current = "solve"
+    lines = trace.to_prometheus().splitlines()
+    assert "# TYPE timetable_stage_seconds gauge" in lines
+    assert 'timetable_stage_seconds{semester="2025A",stage="load"} 0.5' in lines
+    assert 'timetable_model_size{semester="2025A",kind="variables"} 10' in lines
+    assert 'timetable_stage_running{semester="2025A",stage="solve"} 1' in lines
+    assert 'timetable_solutions_total{semester="2025A"} 1' in lines
+    assert 'timetable_objective{semester="2025A"} 7.0' in lines
+    assert 'timetable_bound{semester="2025A"} 3.0' in lines
+
+
+def test_peak_rss_is_in_bytes_on_every_platform(monkeypatch):
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    monkeypatch.setattr(sys, "platform", "linux")
+    assert peak_rss() >= usage.ru_maxrss * 1024
+    monkeypatch.setattr(sys, "platform", "darwin")
+    assert usage.ru_maxrss <= peak_rss() < usage.ru_maxrss * 1024
+
+
+def test_incremental_runs_reject_trace_outputs(tmp_path, capsys):
+    with pytest.raises(SystemExit) as exit_:
+        main(["--teacher", "1", "--metrics", str(tmp_path / "run.prom")])
+    assert exit_.value.code == 2
+    assert "cannot be combined" in capsys.readouterr().err
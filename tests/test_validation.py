@@ -0,0 +1,155 @@
+import numpy as np
+
+from db import get_connection
+from models.courses import create_course
+from models.scheduled_classes import ScheduledClass, create_scheduled_classes
+from models.teachers import Teacher, create_teacher
+from models.time_periods import TimePeriod, create_time_period
+from solver import schedule
+from solver.feasibility import FeasibilityIndex
+from solver.slots import SlotTable
+from solver.validation import (
+    ALL_WEEKS,
+    BROKEN_DOUBLE,
+    FACILITY_CLASH,
+    INTERNATIONAL_EDGE,
+    NOT_ALLOWED,
+    SECTION_OVERFULL,
+    STUDENT_CLASH,
+    TEACHER_CLASH,
+    TEACHER_OVERLOAD,
+    Timetable,
+    clash_groups,
+    load_timetable,
+    validate,
+    validate_semester,
+)
+
+
+def _index():
+    periods = [TimePeriod(100 + n, n, 1) for n in range(1, 5)]
+    teachers = [Teacher(1, "Alice", is_international=True), Teacher(2, "Bob")]
+    return FeasibilityIndex.build(teachers, [10, 20], [(1, 10), (2, 20)], periods)
+
+
+def _timetable(**overrides):
+    columns = dict(
+        row_ids=np.array([1, 2, 3]),
+        section_ids=np.array([5, 6, 6]),
+        course_ids=np.array([10, 20, 20]),
+        teacher_ids=np.array([1, 2, 2]),
+        facility_ids=np.array([-1, 7, 7]),
+        period_ids=np.array([102, 102, 103]),
+        enrollment_rows=np.array([0, 1, 2]),
+        enrollment_students=np.array([50, 51, 51]),
+        section_max={5: 24, 6: 24},
+        teacher_max={1: 24, 2: 24},
+        international=frozenset({1}),
+    )
+    columns.update(overrides)
+    return Timetable(**columns)
+
+
+def test_valid_timetable_has_no_violations():
+    assert validate(_timetable(), _index()) == []
+
+
+def test_every_hard_constraint_is_reported_with_row_ids():
+    tt = _timetable(
+        teacher_ids=np.array([2, 2, 1]),
+        facility_ids=np.array([7, 7, -1]),
+        period_ids=np.array([102, 102, 104]),
+        enrollment_rows=np.array([0, 1, 1]),
+        enrollment_students=np.array([50, 50, 51]),
+        section_max={5: 24, 6: 1},
+        teacher_max={1: 24, 2: 1},
+    )
+    found = {(v.kind, v.row_ids) for v in validate(tt, _index())}
+    assert (TEACHER_CLASH, (1, 2)) in found
+    assert (FACILITY_CLASH, (1, 2)) in found
+    assert (STUDENT_CLASH, (1, 2)) in found
+    assert (TEACHER_OVERLOAD, (1, 2)) in found
+    assert (SECTION_OVERFULL, (2, 3)) in found
+    assert (INTERNATIONAL_EDGE, (3,)) in found
+    assert (NOT_ALLOWED, (1,)) in found
+
+
+def test_linked_double_periods_must_be_back_to_back():
+    slots = SlotTable([TimePeriod(100 + n, n, 1) for n in range(1, 5)])
+    linked = _timetable(linked_ids=np.array([-1, 3, 2]))
+    assert validate(linked, _index(), slots) == []
+    broken = _timetable(linked_ids=np.array([2, 1, -1]))
+    found = [(v.kind, v.row_ids) for v in validate(broken, _index(), slots)]
+    assert found == [(BROKEN_DOUBLE, (1, 2))]
+
+
+def test_solver_output_validates_clean():
+    for number in range(1, 5):
+        create_time_period(number, day_of_week=1)
+    teacher = create_teacher("Alice", is_international=True)
+    course = create_course("MATH", "Math", 2)
+    conn = get_connection()
+    try:
+        with conn.cursor() as cur:
+            cur.execute(
+                "INSERT INTO teacher_courses (teacher_id, course_id) VALUES (%s, %s)",
+                (teacher.id, course.id),
+            )
+            cur.execute(
+                "INSERT INTO class_sections (course_id, section_name, semester)"
+                " VALUES (%s, 'A', '2025A')",
+                (course.id,),
+            )
+    finally:
+        conn.close()
+    assert schedule("2025A", time_limit=10, workers=2).feasible
+    assert validate_semester("2025A") == []
+
+
+def test_alternating_weeks_share_a_slot():
+    period = create_time_period(2, day_of_week=1)
+    teacher = create_teacher("Alice")
+    course = create_course("MATH", "Math", 1)
+    conn = get_connection()
+    try:
+        with conn.cursor() as cur:
+            cur.execute(
+                "INSERT INTO teacher_courses (teacher_id, course_id) VALUES (%s, %s)",
+                (teacher.id, course.id),
+            )
+            cur.execute(
+                "INSERT INTO class_sections (course_id, section_name, semester)"
+                " VALUES (%s, 'A', '2025A') RETURNING id",
+                (course.id,),
+            )
+            section_id = cur.fetchone()[0]
+    finally:
+        conn.close()
+    rows = [
+        ScheduledClass(
+            None, section_id, teacher.id, None, period.id, pattern, semester="2025A"
+        )
+        for pattern in ("A", "B")
+    ]
+    assert not create_scheduled_classes(rows).rejected
+    tt = load_timetable("2025A")
+    odd, even = (sum(1 << (w - 1) for w in range(first, 54, 2)) for first in (1, 2))
+    assert tt.weeks.tolist() == [odd, even]
+    assert validate(tt) == []
+    every_week = tt.weeks.copy()
+    every_week[1] = ALL_WEEKS
+    found = [v.kind for v in validate(Timetable(**{**vars(tt), "weeks": every_week}))]
+    assert found == [TEACHER_CLASH]
+
+
+def test_clash_groups_keep_only_rows_with_overlapping_weeks():
+    odd, even = (sum(1 << (w - 1) for w in range(first, 54, 2)) for first in (1, 2))
+    owner = np.array([1, 1, 2, 2, 2, 3, 3])
+    period = np.array([5, 5, 5, 5, 5, 5, 5])
+    weeks = np.array([odd, even, odd, even, ALL_WEEKS, ALL_WEEKS, ALL_WEEKS])
+    assert [g.tolist() for g in clash_groups(owner, period, weeks)] == [
+        [2, 3, 4],
+        [5, 6],
+    ]
+    weeks[1] = even | 1  # also week 1
+    assert [g.tolist() for g in clash_groups(owner, period, weeks)][0] == [0, 1]
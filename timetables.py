@@ -0,0 +1,189 @@
+"""
+Materialized teacher and student timetables.
+
+``teacher_timetables`` and ``student_timetables`` (see
+``migrations/001_timetable_views.sql``) hold one day × period grid per
+(semester, owner). Triggers on ``scheduled_classes`` and ``class_enrollments``
+queue the keys a change touches, and ``refresh()`` rebuilds just those grids.
+The getters refresh their own key first, so they never return a stale grid:
+
+    import timetables
+
+    grid = timetables.teacher_timetable("2025A", 4)
+    grid[0][2]  # Monday, period 3: None or a list of classes
+
+A class is a dict with ``id`` (scheduled_classes id), ``course``, ``section``,
+``teacher``, ``facility`` and ``weeks``; missing values are left out. The
+grids copy course, teacher and facility names, so call ``rebuild()`` after
+renaming those or changing ``time_periods``.
+"""
+
+from typing import Any, Dict, List, Optional
+
+from db import connection
+
+DAYS = 5
+TEACHER = "t"
+STUDENT = "s"
+
+Grid = List[List[Optional[List[Dict[str, Any]]]]]
+
+# Per owner kind: target table, its owner column and the join from a queued
+# (semester, owner_id) key to that owner's scheduled_classes rows.
+_OWNERS = {
+    TEACHER: (
+        "teacher_timetables",
+        "teacher_id",
+        "JOIN scheduled_classes sc"
+        " ON sc.semester = k.semester AND sc.teacher_id = k.owner_id",
+    ),
+    STUDENT: (
+        "student_timetables",
+        "student_id",
+        "JOIN class_enrollments ce ON ce.student_id = k.owner_id"
+        " JOIN scheduled_classes sc"
+        " ON sc.id = ce.scheduled_class_id AND sc.semester = k.semester",
+    ),
+}
+
+_REFRESH_SQL = """
+    WITH claimed AS (
+        DELETE FROM timetable_refresh_queue
+        WHERE owner = %(owner)s {key_filter}
+        RETURNING semester, owner_id
+    ),
+    cells AS (
+        SELECT k.semester, k.owner_id, tp.day_of_week AS day,
+               tp.period_number AS period,
+               jsonb_agg(jsonb_strip_nulls(jsonb_build_object(
+                   'id', sc.id, 'course', c.code, 'section', cs.section_name,
+                   'teacher', t.name, 'facility', f.name, 'weeks', sc.week_pattern
+               )) ORDER BY sc.id) AS classes
+        FROM claimed k
+        {source}
+        JOIN time_periods tp ON tp.id = sc.time_period_id
+        LEFT JOIN class_sections cs ON cs.id = sc.class_section_id
+        LEFT JOIN courses c ON c.id = cs.course_id
+        LEFT JOIN teachers t ON t.id = sc.teacher_id
+        LEFT JOIN facilities f ON f.id = sc.facility_id
+        GROUP BY 1, 2, 3, 4
+    ),
+    days AS (
+        SELECT k.semester, k.owner_id, d.day,
+               jsonb_agg(cells.classes ORDER BY p.period) AS periods
+        FROM (SELECT DISTINCT semester, owner_id FROM cells) k
+        CROSS JOIN generate_series(1, {days}) AS d(day)
+        CROSS JOIN generate_series(
+            1, (SELECT max(period_number) FROM time_periods)) AS p(period)
+        LEFT JOIN cells ON cells.semester = k.semester
+            AND cells.owner_id = k.owner_id
+            AND cells.day = d.day AND cells.period = p.period
+        GROUP BY 1, 2, 3
+    ),
+    grids AS (
+        SELECT semester, owner_id, jsonb_agg(periods ORDER BY day) AS grid
+        FROM days GROUP BY 1, 2
+    ),
+    emptied AS (
+        DELETE FROM {table} tt USING claimed k
+        WHERE tt.semester = k.semester AND tt.{column} = k.owner_id
+          AND NOT EXISTS (
+              SELECT 1 FROM grids g
+              WHERE g.semester = k.semester AND g.owner_id = k.owner_id)
+        RETURNING 1
+    ),
+    written AS (
+        INSERT INTO {table} (semester, {column}, grid)
+        SELECT semester, owner_id, grid FROM grids
+        ON CONFLICT (semester, {column})
+        DO UPDATE SET grid = EXCLUDED.grid, refreshed_at = now()
+        RETURNING 1
+    )
+    SELECT count(*) FROM claimed
+"""
+
+
+def _refresh_sql(owner: str, one_key: bool) -> str:
+    table, column, source = _OWNERS[owner]
+    key_filter = (
+        "AND semester = %(semester)s AND owner_id = %(owner_id)s" if one_key else ""
+    )
+    return _REFRESH_SQL.format(
+        table=table, column=column, source=source, key_filter=key_filter, days=DAYS
+    )
+
+
+_REFRESH_ALL = {owner: _refresh_sql(owner, False) for owner in _OWNERS}
+_REFRESH_ONE = {owner: _refresh_sql(owner, True) for owner in _OWNERS}
+
+
+def refresh() -> int:
+    """Rebuild every queued grid in one transaction; returns the number of keys."""
+    refreshed = 0
+    with connection() as conn:
+        with conn:
+            with conn.cursor() as cur:
+                for owner in _OWNERS:
+                    cur.execute(_REFRESH_ALL[owner], {"owner": owner})
+                    refreshed += cur.fetchone()[0]
+    return refreshed
+
+
+def rebuild(semester: Optional[str] = None) -> int:
+    """Queue every key of ``semester`` (or of all semesters) and refresh them."""
+    with connection() as conn:
+        with conn:
+            with conn.cursor() as cur:
+                cur.execute(
+                    """
+                    INSERT INTO timetable_refresh_queue
+                    SELECT * FROM (
+                        SELECT %(teacher)s, semester, teacher_id
+                        FROM scheduled_classes
+                        WHERE teacher_id IS NOT NULL AND semester IS NOT NULL
+                        UNION
+                        SELECT %(student)s, sc.semester, ce.student_id
+                        FROM class_enrollments ce
+                        JOIN scheduled_classes sc ON sc.id = ce.scheduled_class_id
+                        WHERE ce.student_id IS NOT NULL AND sc.semester IS NOT NULL
+                        UNION
+                        SELECT %(teacher)s, semester, teacher_id
+                        FROM teacher_timetables
+                        UNION
+                        SELECT %(student)s, semester, student_id
+                        FROM student_timetables
+                    ) AS keys (owner, semester, owner_id)
+                    WHERE %(semester)s::text IS NULL OR semester = %(semester)s
+                    ON CONFLICT DO NOTHING
+                    """,
+                    {"teacher": TEACHER, "student": STUDENT, "semester": semester},
+                )
+    return refresh()
+
+
+def _timetable(owner: str, semester: str, owner_id: int) -> Optional[Grid]:
+    table, column, _ = _OWNERS[owner]
+    params = {"owner": owner, "semester": semester, "owner_id": owner_id}
+    with connection() as conn:
+        with conn:
+            with conn.cursor() as cur:
+                # Usually the queue holds nothing for the key and this is a
+                # primary-key probe followed by a primary-key lookup.
+                cur.execute(_REFRESH_ONE[owner], params)
+                cur.execute(
+                    f"SELECT grid FROM {table}"
+                    f" WHERE semester = %(semester)s AND {column} = %(owner_id)s",
+                    params,
+                )
+                row = cur.fetchone()
+    return row[0] if row else None
+
+
+def teacher_timetable(semester: str, teacher_id: int) -> Optional[Grid]:
+    """The teacher's grid for ``semester`` (days × periods), or ``None``."""
+    return _timetable(TEACHER, semester, teacher_id)
+
+
+def student_timetable(semester: str, student_id: int) -> Optional[Grid]:
+    """The student's grid for ``semester`` (days × periods), or ``None``."""
+    return _timetable(STUDENT, semester, student_id)